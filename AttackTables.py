@@ -0,0 +1,90 @@
+from typing import Dict, Tuple
+
+KNIGHT_OFFSETS = ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+KING_OFFSETS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+AXIS_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class AttackTables:
+    """
+    Precomputed move geometry of a board layout
+
+    Squares are numbered row by row (``y * width + x``) and every table entry is a bitboard
+    (a python int holding one bit per square). Holes ('XX' squares) are never targeted and
+    cut the sliding rays, so the tables depend on both the board shape and the hole mask.
+
+    Tables are built once per layout and shared through ``AttackTables.get``.
+    """
+
+    CACHE: Dict[Tuple[Tuple[int, int], int], "AttackTables"] = {}
+
+    def __init__(self, shape: Tuple[int, int], holes: int = 0):
+        height, width = shape
+        self.height: int = height
+        self.width: int = width
+        self.holes: int = holes
+
+        size = height * width
+
+        #   Leapers
+        self.knight: list[int] = [self._leaps(sq, KNIGHT_OFFSETS) for sq in range(size)]
+        self.king: list[int] = [self._leaps(sq, KING_OFFSETS) for sq in range(size)]
+
+        #   Pawns always move towards increasing rows
+        self.pawn_push: list[int] = [self._leaps(sq, ((1, 0),)) for sq in range(size)]
+        self.pawn_captures: list[int] = [self._leaps(sq, ((1, -1), (1, 1))) for sq in range(size)]
+
+        #   Sliders
+        self.rays: dict[tuple[int, int], list[int]] = {}
+        self.between_diagonal: dict[tuple[int, int], int] = {}
+        self.between_axis: dict[tuple[int, int], int] = {}
+
+        for directions, between in (
+            (DIAGONAL_DIRECTIONS, self.between_diagonal),
+            (AXIS_DIRECTIONS, self.between_axis),
+        ):
+            for direction in directions:
+                rays = []
+                for sq in range(size):
+                    ray = 0
+                    for end in self._walk(sq, direction):
+                        between[(sq, end)] = ray
+                        ray |= 1 << end
+                    rays.append(ray)
+                self.rays[direction] = rays
+
+    @staticmethod
+    def get(shape: Tuple[int, int], holes: int = 0) -> "AttackTables":
+        """
+        Get the tables of a board layout, building them on first use
+
+        :param shape: The ``(height, width)`` of the board
+        :param holes: Bitboard of the 'XX' squares of the board
+        :return: The shared tables of this layout
+        """
+        tables = AttackTables.CACHE.get((shape, holes))
+        if tables is None:
+            tables = AttackTables(shape, holes)
+            AttackTables.CACHE[(shape, holes)] = tables
+        return tables
+
+    def _on_board(self, y: int, x: int) -> bool:
+        return 0 <= y < self.height and 0 <= x < self.width and not self.holes >> (y * self.width + x) & 1
+
+    def _leaps(self, sq: int, offsets) -> int:
+        y, x = divmod(sq, self.width)
+        targets = 0
+        for dy, dx in offsets:
+            if self._on_board(y + dy, x + dx):
+                targets |= 1 << ((y + dy) * self.width + x + dx)
+        return targets
+
+    def _walk(self, sq: int, direction: tuple[int, int]):
+        """Iterate over the squares of a ray, stopping at the edge of the board or at a hole"""
+        y, x = divmod(sq, self.width)
+        dy, dx = direction
+        y, x = y + dy, x + dx
+        while self._on_board(y, x):
+            yield y * self.width + x
+            y, x = y + dy, x + dx
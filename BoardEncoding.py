@@ -0,0 +1,142 @@
+#   Compact board encoding
+#
+#   A board is an ``np.int8`` array with one cell per square:
+#
+#   - ``EMPTY`` (0) for an empty square
+#   - ``HOLE`` (-1) for a square which is not part of the board ('XX' in board files)
+#   - ``color_index << 3 | type_code`` for a piece, where ``type_code`` is 1 to 6 for
+#     ``PIECE_TYPES`` (pawn, knight, bishop, rook, queen, king) and ``color_index`` the index
+#     of the piece's color in ``COLORS``
+#
+#   so that ``cells > 0`` selects the pieces, ``cells & 7`` gives their types and ``cells >> 3`` their colors.
+#
+#   The legacy representation, a 2D array of strings such as "pw", "" or "XX",
+#   is converted to and from this encoding with ``encode_board`` and ``decode_board``.
+
+from typing import Any, NamedTuple, Optional
+
+import numpy as np
+
+EMPTY = 0
+HOLE = -1
+
+PIECE_TYPES = "pnbrqk"
+COLORS = "wbry"
+
+#   Piece string -> code
+CODES: dict[str, int] = {"": EMPTY, "XX": HOLE, "X": HOLE}
+for _color_index, _color in enumerate(COLORS):
+    for _type_index, _piece_type in enumerate(PIECE_TYPES):
+        CODES[_piece_type + _color] = _color_index << 3 | (_type_index + 1)
+
+#   Code -> piece string, indexed by the code itself (HOLE wraps around to the last entry)
+NAMES = np.full(len(COLORS) << 3, "", dtype="<U2")
+for _name, _code in CODES.items():
+    if _code > 0:
+        NAMES[_code] = _name
+NAMES[HOLE] = "XX"
+
+
+def piece_code(piece_type: str, color: str) -> int:
+    """Get the code of a piece"""
+    return CODES[piece_type + color]
+
+
+def piece_type(code: int) -> str:
+    """Get the type of the piece of the given code"""
+    return PIECE_TYPES[(code & 7) - 1]
+
+
+def piece_color(code: int) -> str:
+    """Get the color of the piece of the given code"""
+    return COLORS[code >> 3]
+
+
+def encode_board(board) -> np.ndarray:
+    """
+    Encode a board
+
+    :param board: The board, as an array of ``Piece`` objects or piece strings. Already encoded boards are returned as is
+    :return: The ``np.int8`` encoded board
+    """
+    if isinstance(board, np.ndarray) and board.dtype == np.int8:
+        return board
+
+    board = np.asarray(board, dtype=object)
+    cells = np.empty(board.shape, dtype=np.int8)
+    flat = cells.reshape(-1)
+    for i, cell in enumerate(board.flat):
+        if cell is None:
+            cell = ""
+        elif type(cell) is not str:
+            cell = cell.string()
+        flat[i] = CODES[cell]
+
+    return cells
+
+
+def decode_board(cells: np.ndarray) -> np.ndarray:
+    """
+    Build the legacy string representation of an encoded board
+
+    :param cells: The ``np.int8`` encoded board
+    :return: An array of piece strings (``"pw"``, ``""`` for empty squares, ``"XX"`` for holes)
+    """
+    return NAMES[cells]
+
+
+#   Reversible moves
+#
+#   Searching bots can play moves on an encoded board in place and take them back,
+#   instead of copying the whole board for every node:
+#
+#       delta = make_move(cells, ((1, 0), (2, 0)))
+#       score = evaluate(cells)
+#       unmake_move(cells, delta)
+
+class Delta(NamedTuple):
+    """Changes made to a board by a move, enough to take it back"""
+
+    start: tuple[int, int]
+    end: tuple[int, int]
+    #   Codes of the moved piece, of the captured one (EMPTY if none) and of the piece left on ``end``,
+    #   which differs from ``moved`` on promotion
+    moved: int
+    captured: int
+    placed: int
+    #   Piece sprites, only set by BoardManager.make_move
+    piece: Any = None
+    captured_piece: Any = None
+
+
+def make_move(cells: np.ndarray, move, promotion: Optional[str] = None) -> Delta:
+    """
+    Play a move on an encoded board, in place
+
+    The move is not checked, see ``ChessRules.move_is_valid``
+
+    :param cells: The encoded board
+    :param move: The move ``((start_y, start_x), (end_y, end_x))``
+    :param promotion: Type the moved piece is promoted to, if any
+    :return: The changes made, to give back to ``unmake_move``
+    """
+    start, end = move
+    start, end = (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+    moved = int(cells[start])
+    captured = int(cells[end])
+    placed = moved if promotion is None else piece_code(promotion, piece_color(moved))
+
+    cells[end] = placed
+    cells[start] = EMPTY
+    return Delta(start, end, moved, captured, placed)
+
+
+def unmake_move(cells: np.ndarray, delta: Delta):
+    """
+    Take back a move played with ``make_move``
+
+    :param cells: The encoded board, as left by the move
+    :param delta: The changes made by the move
+    """
+    cells[delta.start] = delta.moved
+    cells[delta.end] = delta.captured
@@ -0,0 +1,142 @@
+#
+#   Board files
+#
+#   Reading of the board files of Data/maps, without any dependency on the GUI.
+#
+#   Two formats are supported:
+#
+#   - Board description (.brd): the player sequence on a line, then the board layout, one row per line
+#     with comma-separated tiles. A tile is described with the piece type (k, q, n, b, r, p) followed by
+#     its color (w, b, r, y), ``--`` for an empty tile and ``XX`` for a hole in the board:
+#
+#         0w01b2
+#         rw,nw,bw,kw,qw,bw,nw,rw
+#         pw,pw,pw,pw,pw,pw,pw,pw
+#         --,--,--,--,--,--,--,--
+#         ...
+#
+#   - FEN (.fen): a single line describing the board layout in FEN
+#     (https://en.wikipedia.org/wiki/Forsyth%E2%80%93Edwards_Notation)
+#
+
+import os
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+
+BOARD_DIRECTORY = os.path.join(os.path.abspath(os.path.dirname(__file__)), "Data", "maps")
+
+
+def find_board_file(name: str) -> str:
+    """
+    Get the path of a board file
+    :param name: A path, or the name of a board of Data/maps
+    :return: The path of the board file
+    """
+    if os.path.isfile(name):
+        return name
+    return os.path.join(BOARD_DIRECTORY, name)
+
+
+def read_board_file(path: str) -> Optional[Tuple[str, np.ndarray]]:
+    """
+    Read a board file (see the top of this file for the supported formats)
+
+    :param path: The path to the board file. Can either be a .brd or .fen file
+    :return: The player sequence and the board as an array of piece strings, or ``None`` if the file is invalid
+    """
+    if path.strip() == "":
+        return None
+
+    if not os.path.exists(path):
+        print(f"File '{path}' not found")
+        return None
+
+    if not os.path.isfile(path):
+        print(f"'{path}' is not a file")
+        return None
+
+    ext = os.path.splitext(path)[1]
+
+    if ext not in (".brd", ".fen"):
+        print(f"Unsupported extension '{ext}'")
+        return None
+
+    with open(path, "r") as f:
+        data = f.read()
+
+    if ext == ".brd":
+        lines = data.split("\n")
+        rows = [
+            line.replace('--', '').strip().split(",")
+            for line in lines[1:]
+        ]
+        rows = list(filter(lambda r: len(r) != 0, rows))
+        if len(rows) == 0:
+            print("Board must have at least one row")
+            return None
+
+        width = len(rows[0])
+
+        #   check lines length equals
+        for row in rows:
+            if len(row) != width:
+                print("All rows must have the same width")
+                return None
+
+        return lines[0], np.array(rows, dtype='O')
+
+    elif ext == ".fen":
+        parts = data.strip().split(" ")
+        if len(parts) == 0:
+            print("FEN must at least contain the board state")
+            return None
+
+        board_desc = parts[0]
+        rows_desc = board_desc.split("/")
+        if len(rows_desc) == 0:
+            print("Board must have at least one row")
+            return None
+
+        rows = []
+
+        # Match before a letter or between a letter and a digit, or at the start/end of the string
+        # (allows for bigger board with spaces >= 10)
+        regexp = r"^|(?=\D)|(?<=\D)(?=\d)|$"
+        for row_desc in rows_desc:
+            matches = list(re.finditer(regexp, row_desc))
+            row = []
+            for i in range(len(matches) - 1):
+                m1 = matches[i]
+                m2 = matches[i + 1]
+                part = row_desc[m1.start():m2.start()]
+                if part.isnumeric():
+                    row += [""] * int(part)
+                else:
+                    color = "w" if part.isupper() else "b"
+                    piece = part.lower()
+                    if piece not in ("p", "r", "n", "b", "k", "q"):
+                        print(f"Invalid piece '{part}'")
+                        return None
+                    row.append(piece + color)
+            rows.append(row)
+
+        width = len(rows[0])
+        # Check lines length equals
+        for row in rows:
+            if len(row) != width:
+                print("All rows must have the same width")
+                return None
+
+        next_player = parts[1] if len(parts) > 1 else "w"
+        if next_player not in ("w", "b"):
+            print(f"Invalid player '{next_player}'")
+            return None
+
+        player_order = "0w01b2" if next_player == "w" else "0b01w2"
+        board = np.array(rows, dtype='O')
+        if next_player == "w":
+            board = np.rot90(board, 2)
+        return player_order, board
+    return None
@@ -1,46 +1,60 @@
 import os
-import re
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 import numpy as np
 
+from BoardEncoding import EMPTY, Delta, decode_board, encode_board, make_move, piece_type, unmake_move
+from BoardFile import BOARD_DIRECTORY, read_board_file
 from PieceManager import PieceManager
+from Zobrist import ZobristKeys
 
 
 class BoardManager:
-    BOARD_DIRECTORY = os.path.join(os.path.abspath(os.path.dirname(__file__)), "Data", "maps")
+    BOARD_DIRECTORY = BOARD_DIRECTORY
     DEFAULT_BOARD = os.path.join(BOARD_DIRECTORY, "default.brd")
 
     def __init__(self):
+        #   Encoded board (see BoardEncoding), the reference state of the game
+        self.cells: np.ndarray = np.array([], dtype=np.int8)
+        #   Piece sprites displayed on each square ('' if empty, 'XX' for holes)
         self.board: np.array = np.array([], dtype='O')
+        self._string_board: Optional[np.ndarray] = None
         self.path: Optional[str] = None
         self.player_order: str = "0w01b2"
         self.available_colors: list[str] = []
         self.pieces = []
+        self.piece_index: Dict[str, Dict[str, Set[Tuple[int, int]]]] = {}
+        self.zobrist: Optional[ZobristKeys] = None
+        self.board_key: int = 0
+        #   Moves played in the game, and moves taken back which can be replayed
+        self.history: List[Delta] = []
+        self.undone: List[Delta] = []
+        #   Identifier of the current line of play, changed when a board is loaded or moves are taken back
+        #   or replayed, so that bots keeping state between turns know they have to start over
+        self.game_id: int = 0
         self.load_file(self.DEFAULT_BOARD)
 
-    @staticmethod
-    def get_string_board(board):
-        res = []
-        for r in board:
-            line = []
-            for c in r:
-                if type(c) is str:
-                    line.append(c)
-                else:
-                    line.append(c.string())
-            res.append(line)
-        return res
+    @property
+    def string_board(self) -> np.ndarray:
+        """Legacy view of the board as an array of piece strings, built when first needed after each move"""
+        if self._string_board is None:
+            self._string_board = decode_board(self.cells)
+        return self._string_board
 
     def post_load(self):
         """
         Callback called after loading a board
 
-        Builds a list of available player colors used on the board
+        Encodes the board, builds its piece sprites, a list of available player colors used on the board,
+        the index of the squares occupied by each color and piece type and the Zobrist key of the position
         """
 
+        self.cells = encode_board(self.board)
+        self._string_board = None
+
         new_board = np.empty_like(self.board, dtype=object)
         self.pieces = []
+        self.piece_index = {}
 
         self.available_colors = []
         for y in range(self.board.shape[0]):
@@ -52,6 +66,8 @@ class BoardManager:
                 piece_type, color = self.board[y, x]
                 if color not in self.available_colors:
                     self.available_colors.append(color)
+                    self.piece_index[color] = {t: set() for t in PieceManager.PIECES}
+                self.piece_index[color][piece_type].add((y, x))
 
                 piece = PieceManager.get_piece(color, piece_type)
                 new_board[y, x] = piece
@@ -59,6 +75,146 @@ class BoardManager:
                 self.pieces.append(piece)
 
         self.board = new_board
+        self.zobrist = ZobristKeys.get(self.cells.shape)
+        self.board_key = self.zobrist.hash_board(self.cells)
+        self.history = []
+        self.undone = []
+        self.game_id += 1
+
+    def apply_move(self, start: Tuple[int, int], end: Tuple[int, int], promotion: Optional[str] = None):
+        """
+        Play a move of the game, recording it in the history
+
+        The move is not checked, see ``ChessRules.move_is_valid``
+
+        :param start: Coordinates of the moved piece
+        :param end: Destination of the piece
+        :param promotion: Type the moved piece is promoted to, if any
+        :return: The captured piece, or ``""`` if the destination was empty
+        """
+        delta = self.make_move((start, end), promotion)
+        self.history.append(delta)
+        self.undone = []
+        return delta.captured_piece
+
+    def undo(self) -> Optional[Delta]:
+        """
+        Take back the last move of the game
+        :return: The changes made by the move, or ``None`` if no move was played
+        """
+        if len(self.history) == 0:
+            return None
+
+        delta = self.history.pop()
+        self.unmake_move(delta)
+        self.undone.append(delta)
+        self.game_id += 1
+        return delta
+
+    def redo(self) -> Optional[Delta]:
+        """
+        Play again the last move taken back
+        :return: The changes made by the move, or ``None`` if no move was taken back
+        """
+        if len(self.undone) == 0:
+            return None
+
+        delta = self.undone.pop()
+        promotion = None if delta.placed == delta.moved else piece_type(delta.placed)
+        delta = self.make_move((delta.start, delta.end), promotion)
+        self.history.append(delta)
+        self.game_id += 1
+        return delta
+
+    def make_move(self, move, promotion: Optional[str] = None) -> Delta:
+        """
+        Move a piece on the board, keeping the sprites, piece index and position key up to date
+
+        The move is not checked and not recorded in the history, see ``apply_move``
+
+        :param move: The move ``((start_y, start_x), (end_y, end_x))``
+        :param promotion: Type the moved piece is promoted to, if any
+        :return: The changes made, to give back to ``unmake_move``
+        """
+        delta = make_move(self.cells, move, promotion)
+        start, end = delta.start, delta.end
+        piece = self.board[start]
+        captured = self.board[end]
+
+        self.board[end] = piece
+        self.board[start] = ""
+
+        width = self.cells.shape[1]
+        start_sq = start[0] * width + start[1]
+        end_sq = end[0] * width + end[1]
+        keys = self.zobrist.piece_keys
+
+        squares = self.piece_index[piece.color]
+        squares[piece.type].remove(start)
+        self.board_key ^= keys[delta.moved][start_sq]
+
+        if delta.captured != EMPTY:
+            self.piece_index[captured.color][captured.type].discard(end)
+            self.board_key ^= keys[delta.captured][end_sq]
+            self.pieces = [p for p in self.pieces if p is not captured]
+
+        if promotion is not None:
+            PieceManager.upgrade_piece(piece, promotion)
+        squares[piece.type].add(end)
+        self.board_key ^= keys[delta.placed][end_sq]
+
+        self._string_board = None
+
+        return delta._replace(piece=piece, captured_piece=captured)
+
+    def unmake_move(self, delta: Delta):
+        """
+        Take back a move played with ``make_move``
+        :param delta: The changes made by the move
+        """
+        unmake_move(self.cells, delta)
+        start, end = delta.start, delta.end
+        piece = delta.piece
+        captured = delta.captured_piece
+
+        self.board[start] = piece
+        self.board[end] = captured
+
+        width = self.cells.shape[1]
+        start_sq = start[0] * width + start[1]
+        end_sq = end[0] * width + end[1]
+        keys = self.zobrist.piece_keys
+
+        squares = self.piece_index[piece.color]
+        squares[piece.type].remove(end)
+        self.board_key ^= keys[delta.placed][end_sq]
+
+        if delta.placed != delta.moved:
+            PieceManager.upgrade_piece(piece, piece_type(delta.moved))
+        squares[piece.type].add(start)
+        self.board_key ^= keys[delta.moved][start_sq]
+
+        if delta.captured != EMPTY:
+            self.piece_index[captured.color][captured.type].add(end)
+            self.board_key ^= keys[delta.captured][end_sq]
+            self.pieces.append(captured)
+
+        self._string_board = None
+
+    def position_key(self, turn: int) -> int:
+        """
+        Get the Zobrist key of the current position
+        :param turn: Index of the player to move in the player sequence
+        :return: The position key
+        """
+        return self.board_key ^ self.zobrist.side_keys[turn]
+
+    def has_king(self, color: str) -> bool:
+        """
+        Check whether a player still has a king on the board
+        :param color: The player's color
+        """
+        return color in self.piece_index and len(self.piece_index[color]["k"]) > 0
 
     def load_file(self, path: str) -> bool:
         """
@@ -109,107 +265,14 @@ class BoardManager:
         :param path: The path to the board file. Can either be a .brd or .fen file
         :return: ``True`` if successful, `False` otherwise
         """
-        if path.strip() == "":
-            return False
-
-        if not os.path.exists(path):
-            print(f"File '{path}' not found")
-            return False
-
-        if not os.path.isfile(path):
-            print(f"'{path}' is not a file")
-            return False
-
-        ext = os.path.splitext(path)[1]
-
-        if ext not in (".brd", ".fen"):
-            print(f"Unsupported extension '{ext}'")
+        loaded = read_board_file(path)
+        if loaded is None:
             return False
 
-        with open(path, "r") as f:
-            data = f.read()
-
-        if ext == ".brd":
-            lines = data.split("\n")
-            rows = [
-                line.replace('--', '').strip().split(",")
-                for line in lines[1:]
-            ]
-            rows = list(filter(lambda r: len(r) != 0, rows))
-            if len(rows) == 0:
-                print("Board must have at least one row")
-                return False
-
-            width = len(rows[0])
-
-            #   check lines length equals
-            for row in rows:
-                if len(row) != width:
-                    print("All rows must have the same width")
-                    return False
-
-            self.player_order = lines[0]
-            self.board = np.array(rows, dtype='O')
-            self.path = path
-            self.post_load()
-            return True
-
-        elif ext == ".fen":
-            parts = data.strip().split(" ")
-            if len(parts) == 0:
-                print("FEN must at least contain the board state")
-                return False
-
-            board_desc = parts[0]
-            rows_desc = board_desc.split("/")
-            if len(rows_desc) == 0:
-                print("Board must have at least one row")
-                return False
-
-            rows = []
-
-            # Match before a letter or between a letter and a digit, or at the start/end of the string
-            # (allows for bigger board with spaces >= 10)
-            regexp = r"^|(?=\D)|(?<=\D)(?=\d)|$"
-            for row_desc in rows_desc:
-                matches = list(re.finditer(regexp, row_desc))
-                row = []
-                for i in range(len(matches) - 1):
-                    m1 = matches[i]
-                    m2 = matches[i + 1]
-                    part = row_desc[m1.start():m2.start()]
-                    if part.isnumeric():
-                        row += [""] * int(part)
-                    else:
-                        color = "w" if part.isupper() else "b"
-                        piece = part.lower()
-                        if piece not in ("p", "r", "n", "b", "k", "q"):
-                            print(f"Invalid piece '{part}'")
-                            return False
-                        row.append(piece + color)
-                rows.append(row)
-
-            width = len(rows[0])
-            # Check lines length equals
-            for row in rows:
-                if len(row) != width:
-                    print("All rows must have the same width")
-                    return False
-
-            next_player = parts[1] if len(parts) > 1 else "w"
-            if next_player not in ("w", "b"):
-                print(f"Invalid player '{next_player}'")
-                return False
-
-            self.player_order = "0w01b2" if next_player == "w" else "0b01w2"
-            board = np.array(rows, dtype='O')
-            if next_player == "w":
-                board = np.rot90(board, 2)
-            self.board = board
-            self.path = path
-            self.post_load()
-            return True
-        return False
+        self.player_order, self.board = loaded
+        self.path = path
+        self.post_load()
+        return True
 
     def reload(self):
         """Reload the board from the last imported file, if any"""
@@ -220,11 +283,12 @@ class BoardManager:
         """Get the current board position as a FEN string"""
         fen = ""
         rows = []
-        for y in range(self.board.shape[0]):
+        board = self.string_board
+        for y in range(board.shape[0]):
             row = ""
             count = 0
-            for x in range(self.board.shape[1]):
-                piece = self.board[y, x]
+            for x in range(board.shape[1]):
+                piece = board[y, x]
                 if piece == "":
                     count += 1
                 else:
@@ -232,8 +296,7 @@ class BoardManager:
                         row += str(count)
                         count = 0
 
-                    type_ = piece.type
-                    col = piece.color
+                    type_, col = piece
 
                     if col == "w":
                         type_ = type_.upper()
@@ -254,16 +317,17 @@ class BoardManager:
 
         :param path: The path where to save the board
         """
+        board = self.string_board
         with open(path, "w") as file:
             file.write(self.player_order)
-            for y in range(self.board.shape[0]):
+            for y in range(board.shape[0]):
                 line = []
-                for x in range(self.board.shape[1]):
-                    piece = self.board[y, x]
+                for x in range(board.shape[1]):
+                    piece = board[y, x]
                     if piece == "":
                         line.append("--")
                         continue;
 
-                    line.append(piece.string())
+                    line.append(str(piece))
 
                 file.write("\n" + ",".join(line))
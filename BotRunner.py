@@ -0,0 +1,547 @@
+#
+#   Out-of-process bot execution
+#
+#   Each player's bot runs in its own worker process, started once and reused from turn to turn.
+#   The bot function and its arguments are sent to the worker over a pipe and the chosen move comes
+#   back the same way, so a bot gets a full core without holding the GUI's GIL, and a bot overrunning
+#   its time can be killed without leaving the arena in an inconsistent state.
+#
+#   The board itself is not sent over the pipe: it is written once per turn in a BoardChannel
+#   (a block of shared memory) and the worker hands the bot a read-only NumPy view of it. A move
+#   comes back as four packed integers. ``python BotRunner.py`` measures the hand-off overhead.
+#
+#   Session bots (see Bots/ChessBotList.py) live in their worker for the whole game: the worker
+#   keeps the session between turns, forwards it the other players' moves and lets it ponder
+#   whenever it has nothing else to do.
+#
+#   Workers can be given resource limits (see Sandbox.py): a bot going over them is reported with
+#   a ``"limit"`` result instead of a move. A worker maps its board channel on start-up, before its
+#   memory limit applies: mapping it over the limit would fail, and SharedMemory then destroys the
+#   block for everyone. A worker handed another channel is started again.
+#
+#   Nothing here depends on Qt: the GUI watches ``BotWorker.fileno()`` to know when a move is ready
+#   (see ParallelPlayer.ProcessTurn).
+#
+
+import importlib
+import multiprocessing
+import pickle
+import signal
+import struct
+import time
+import traceback
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+import Sandbox
+from BoardEncoding import decode_board
+from Bots.ChessBotList import ChessBotSession, is_session_bot, run_bot
+from Sandbox import ResourceLimits
+
+#   Messages sent by the workers, as raw bytes: a one byte kind followed by its payload
+READY = b"r"
+MOVE = b"m"
+PICKLED = b"p"
+#   Best move reported so far by the bot of the current turn, same payload as MOVE
+BEST = b"b"
+#   CPU time and peak memory of the bot of the current turn, sent just before its result
+USAGE = b"u"
+
+#   Payload of a MOVE message: start_y, start_x, end_y, end_x
+MOVE_FORMAT = struct.Struct("<4i")
+
+#   Payload of a USAGE message: CPU seconds, peak resident memory in bytes
+USAGE_FORMAT = struct.Struct("<dq")
+
+#   Header of a BoardChannel: height and width of the board, followed by its cells
+HEADER_FORMAT = struct.Struct("<2i")
+
+
+class BoardChannel:
+    """
+    Shared memory block holding the board of the current turn
+
+    Written by the arena at the start of each turn and read in place by the workers.
+    """
+
+    DEFAULT_CAPACITY = 256
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """
+        :param capacity: Maximum number of squares of the boards written in the channel
+        """
+        self.capacity: int = capacity
+        self.memory = shared_memory.SharedMemory(create=True, size=HEADER_FORMAT.size + capacity)
+        self.name: str = self.memory.name
+
+    def fits(self, board: np.ndarray) -> bool:
+        return board.size <= self.capacity
+
+    def write(self, board: np.ndarray):
+        """
+        Write the board of the turn
+        :param board: The encoded board, as seen by the player to move
+        """
+        HEADER_FORMAT.pack_into(self.memory.buf, 0, *board.shape)
+        np.ndarray(board.shape, dtype=np.int8, buffer=self.memory.buf, offset=HEADER_FORMAT.size)[...] = board
+
+    def close(self):
+        """Release and destroy the shared memory block"""
+        self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def read_board(memory: shared_memory.SharedMemory) -> np.ndarray:
+    """
+    Get the board written in a channel, without copying it
+    :param memory: The channel's shared memory, as attached by the worker
+    :return: A read-only view of the encoded board
+    """
+    height, width = HEADER_FORMAT.unpack_from(memory.buf, 0)
+    board = np.ndarray((height, width), dtype=np.int8, buffer=memory.buf, offset=HEADER_FORMAT.size)
+    board.flags.writeable = False
+    return board
+
+
+def _pack_move(move) -> bytes:
+    """Pack a move as four integers, or pickle it if it does not have the expected form"""
+    try:
+        (start_y, start_x), (end_y, end_x) = move
+        return MOVE + MOVE_FORMAT.pack(int(start_y), int(start_x), int(end_y), int(end_x))
+    except (TypeError, ValueError, struct.error):
+        return PICKLED + pickle.dumps(("move", move))
+
+
+def _import_modules(modules: Iterable[str]):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            traceback.print_exc()
+
+
+def _serve(connection: Connection, preload: Tuple[str, ...], limits: Optional[ResourceLimits] = None,
+           channel_name: Optional[str] = None):
+    """Main loop of a worker process: run the bot for each turn received, until the pipe is closed"""
+    _import_modules(preload)
+
+    #   Mapped before the memory limit applies, never after (see the top of the file)
+    channel: Optional[shared_memory.SharedMemory] = None
+    if channel_name is not None:
+        try:
+            channel = shared_memory.SharedMemory(name=channel_name)
+        except OSError:
+            traceback.print_exc()
+
+    within_limit = Sandbox.apply_memory_limit(limits)
+    connection.send_bytes(READY)
+
+    #   Session bot run by this worker, and the game it plays
+    session: Optional[ChessBotSession] = None
+    session_game = None
+    pondering = False
+
+    def report_best(move):
+        try:
+            (start_y, start_x), (end_y, end_x) = move
+            connection.send_bytes(BEST + MOVE_FORMAT.pack(int(start_y), int(start_x), int(end_y), int(end_x)))
+        except (TypeError, ValueError, struct.error):
+            pass
+
+    def start_session(bot, game, player_sequence, board):
+        nonlocal session, session_game
+        session = bot()
+        session_game = game
+        session.player_sequence = player_sequence
+        session.board = board
+        session.new_game(player_sequence, board)
+
+    while True:
+        #   Ponder until the next request comes
+        if pondering and not connection.poll():
+            try:
+                pondering = bool(session.ponder())
+            except Exception:
+                traceback.print_exc()
+                pondering = False
+            continue
+
+        try:
+            request = connection.recv()
+        except (EOFError, OSError):
+            return
+
+        kind = request[0]
+        if kind == "load":
+            _import_modules(request[1])
+            connection.send_bytes(READY)
+            continue
+
+        try:
+            if kind == "new_game":
+                _, bot, game, player_sequence, board = request
+                start_session(bot, game, player_sequence, board)
+                pondering = True
+                continue
+
+            if kind == "opponent_move":
+                _, game, move, board = request
+                if session is not None and session_game == game:
+                    session.board = board
+                    session.on_opponent_move(move)
+                    pondering = True
+                continue
+
+            if kind == "turn":
+                _, func, game, turn_channel, player_sequence, time_budget, encoded, kwargs = request
+                deadline = time.monotonic() + time_budget
+                if not within_limit:
+                    connection.send_bytes(PICKLED + pickle.dumps(("limit", limits.start_breach())))
+                    continue
+                if channel is None or turn_channel != channel_name:
+                    if limits is not None and limits.memory_mb is not None:
+                        reply = ("limit", f"could not map the board within its memory limit of {limits.memory_mb} MB")
+                    else:
+                        reply = ("error", f"could not map the board channel {turn_channel}")
+                    connection.send_bytes(PICKLED + pickle.dumps(reply))
+                    continue
+                board = read_board(channel)
+                if not encoded:
+                    board = decode_board(board)
+
+                cpu_start = time.process_time()
+                Sandbox.reset_peak_rss()
+                Sandbox.start_cpu_limit(limits)
+                if is_session_bot(func):
+                    #   Sessions keep the board after the turn, when the channel is written again
+                    if encoded:
+                        board = board.copy()
+                    if type(session) is not func or session_game != game:
+                        start_session(func, game, player_sequence, board)
+                    session.board = board
+                    session.clock = kwargs.get("clock")
+                    session.report_best = report_best
+                    reply = _pack_move(session.think(deadline))
+                    pondering = True
+                else:
+                    reply = _pack_move(run_bot(func, report_best, player_sequence, board, time_budget, **kwargs))
+                connection.send_bytes(USAGE + USAGE_FORMAT.pack(time.process_time() - cpu_start, Sandbox.peak_rss()))
+            else:
+                _, func, args, kwargs = request
+                reply = PICKLED + pickle.dumps(("move", func(*args, **kwargs)))
+        except MemoryError:
+            #   The session may be left half updated
+            session = None
+            pondering = False
+            if kind in ("new_game", "opponent_move"):
+                traceback.print_exc()
+                continue
+            if limits is None or limits.memory_mb is None:
+                reply = PICKLED + pickle.dumps(("error", traceback.format_exc()))
+            else:
+                reply = PICKLED + pickle.dumps(("limit", limits.memory_breach()))
+        except Exception:
+            if kind in ("new_game", "opponent_move"):
+                traceback.print_exc()
+                continue
+            reply = PICKLED + pickle.dumps(("error", traceback.format_exc()))
+        if kind == "turn":
+            Sandbox.end_cpu_limit(limits)
+
+        connection.send_bytes(reply)
+
+
+def can_run_in_worker(func: Callable) -> bool:
+    """
+    Check whether a bot function can be sent to a worker process
+
+    Functions are sent by reference (module and name), so lambdas, closures
+    and functions defined in the main script have to run in a thread instead.
+    """
+    try:
+        pickle.dumps(func)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return False
+    return True
+
+
+class BotWorker:
+    """
+    Warm worker process running a bot, one turn at a time
+
+    The process is started on creation, so that it has finished importing NumPy and the bots
+    by the time its first turn comes, and is started again right away whenever it is killed.
+    """
+
+    CONTEXT = multiprocessing.get_context("spawn")
+
+    def __init__(self, name: str = "bot-worker", preload: Iterable[str] = (), limits: Optional[ResourceLimits] = None,
+                 channel: Optional[BoardChannel] = None):
+        """
+        :param name: Name of the worker process
+        :param preload: Modules imported by the worker on start-up, typically the modules of the bots
+        :param limits: Resource limits of the bots run by the worker, ``None`` for no limits
+        :param channel: The channel the boards of the turns are written in, mapped by the worker on start-up
+        """
+        self.name: str = name
+        self.preload: Tuple[str, ...] = tuple(preload)
+        self.limits: Optional[ResourceLimits] = limits
+        self.channel_name: Optional[str] = None if channel is None else channel.name
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.connection: Optional[Connection] = None
+        self.busy: bool = False
+        self.ready: bool = False
+        #   Number of READY messages to receive before the worker is ready: one on start-up, one per ``load``
+        self.loading: int = 0
+        #   Last move reported by the bot of the current turn (see Bots/ChessBotList.run_bot)
+        self.best_move: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = None
+        #   CPU time used by the bot of the current turn, once it has returned
+        self.cpu_time: Optional[float] = None
+        #   Peak resident memory of the worker during the current turn, in bytes, once the bot has returned
+        self.peak_rss: Optional[int] = None
+        #   Result of the current turn, once received
+        self.reply: Optional[bytes] = None
+        self.start()
+
+    def start(self):
+        """Start the worker process, if not running"""
+        if self.is_alive():
+            return
+
+        self.connection, child = self.CONTEXT.Pipe()
+        self.process = self.CONTEXT.Process(
+            target=_serve, args=(child, self.preload, self.limits, self.channel_name), name=self.name, daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.busy = False
+        self.ready = False
+        self.loading = 1
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def fileno(self) -> int:
+        """File descriptor of the pipe, readable when a result is ready"""
+        return self.connection.fileno()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the worker has started up (imported its modules)
+        :param timeout: Maximum time to wait in seconds, ``None`` to wait as long as needed
+        :return: ``True`` if the worker is ready
+        """
+        try:
+            while not self.ready and self.connection.poll(timeout):
+                self._receive()
+        except (EOFError, OSError):
+            self.ready = False
+        return self.ready
+
+    def load(self, modules: Iterable[str]):
+        """
+        Import more modules in the worker, typically the module of a bot selected after it has started
+        (see Bots/ChessBotList.get_chess_bot). The worker is not ready again until they are imported.
+        :param modules: The modules, those already imported are skipped
+        """
+        modules = tuple(module for module in dict.fromkeys(modules) if module not in self.preload)
+        if len(modules) == 0:
+            return
+        self.preload += modules
+        if self.is_alive():
+            self.connection.send(("load", modules))
+            self.loading += 1
+            self.ready = False
+
+    def _send(self, request: tuple):
+        """Send a request once the worker is ready, so that its start-up time is not taken from the bot's budget"""
+        self.start()
+        if not self.wait_ready():
+            self.kill()
+            self.wait_ready()
+        self.connection.send(request)
+        self.busy = True
+        self.best_move = None
+        self.cpu_time = None
+        self.peak_rss = None
+        self.reply = None
+
+    def submit(self, func: Callable, *args, **kwargs):
+        """
+        Start a turn: call ``func(*args, **kwargs)`` in the worker, sending every argument over the pipe
+        :param func: The bot function, see ``can_run_in_worker``
+        """
+        self._send(("call", func, args, kwargs))
+
+    def use_channel(self, channel: BoardChannel):
+        """
+        Hand the boards over in another channel, starting the worker again if it mapped another one
+        :param channel: The channel the boards of the turns are written in
+        """
+        if channel.name == self.channel_name:
+            return
+        self.channel_name = channel.name
+        if self.process is not None:
+            self.kill()
+
+    def submit_turn(self, channel: BoardChannel, func: Callable, player_sequence: str, time_budget: float,
+                    encoded: bool = False, game: int = 0, **kwargs):
+        """
+        Start a turn: call ``func(player_sequence, board, time_budget, **kwargs)`` in the worker,
+        with the board currently written in the channel
+
+        For a session bot, the worker's session thinks instead, after being created if it plays another game.
+
+        :param channel: The channel holding the board of the turn
+        :param func: The bot function (see ``can_run_in_worker``) or session class
+        :param player_sequence: The full player sequence, starting with the player to move
+        :param time_budget: Time allowed for the turn, in seconds
+        :param encoded: If ``True``, the bot gets the encoded board, else an array of piece strings
+        :param game: Identifier of the game, a session is kept as long as it does not change
+        """
+        self.use_channel(channel)
+        self._send(("turn", func, game, channel.name, player_sequence, time_budget, encoded, kwargs))
+
+    def new_game(self, bot, game: int, player_sequence: str, board: np.ndarray):
+        """
+        Start the session of a session bot, which can then ponder until its first turn
+        :param bot: The session class
+        :param game: Identifier of the game
+        :param player_sequence: The full player sequence, starting with the bot's player
+        :param board: The board, in the orientation of the bot's player
+        """
+        self.start()
+        self.connection.send(("new_game", bot, game, player_sequence, board))
+
+    def opponent_move(self, game: int, move, board: np.ndarray):
+        """
+        Tell the worker's session about another player's move
+        :param game: Identifier of the game, the move is ignored if the session plays another one
+        :param move: The move, in the orientation of the session's player
+        :param board: The board after the move, in the orientation of the session's player
+        """
+        if self.is_alive():
+            self.connection.send(("opponent_move", game, move, board))
+
+    def _receive(self):
+        """Read a message of the worker, keeping the reported moves aside from the result"""
+        message = self.connection.recv_bytes()
+        if message == READY:
+            self.loading -= 1
+            self.ready = self.loading == 0
+        elif message[:1] == BEST:
+            start_y, start_x, end_y, end_x = MOVE_FORMAT.unpack(message[1:])
+            self.best_move = (start_y, start_x), (end_y, end_x)
+        elif message[:1] == USAGE:
+            self.cpu_time, self.peak_rss = USAGE_FORMAT.unpack(message[1:])
+        else:
+            self.reply = message
+
+    def poll(self) -> bool:
+        """
+        Check whether the result of the current turn is ready (or the worker died),
+        reading the moves reported in the meantime
+        """
+        if not self.busy:
+            return False
+        try:
+            while self.reply is None and self.connection.poll():
+                self._receive()
+        except (EOFError, OSError):
+            return True
+        return self.reply is not None or not self.is_alive()
+
+    def result(self) -> Tuple[str, Any]:
+        """
+        Get the result of the current turn, waiting for it if needed
+        :return: ``("move", move)`` if the bot returned, ``("error", message)`` if it raised or its process died,
+            ``("limit", reason)`` if it went over its resource limits
+        """
+        try:
+            while self.reply is None:
+                self._receive()
+        except (EOFError, OSError):
+            return self._exit_result()
+
+        reply, self.reply = self.reply, None
+        self.busy = False
+        if reply[:1] == MOVE:
+            start_y, start_x, end_y, end_x = MOVE_FORMAT.unpack(reply[1:])
+            return "move", ((start_y, start_x), (end_y, end_x))
+        result = pickle.loads(reply[1:])
+        if result[0] == "limit":
+            #   Out of memory, the process may not be in a state to play again
+            self.kill()
+        return result
+
+    def _exit_result(self) -> Tuple[str, Any]:
+        """Result of a turn during which the worker process died, telling a CPU limit from a crash"""
+        self.process.join(1.0)
+        exitcode = self.process.exitcode
+        self.kill()
+        cpu_limited = self.limits is not None and self.limits.cpu_seconds is not None
+        if cpu_limited and exitcode == -getattr(signal, "SIGXCPU", 0):
+            return "limit", self.limits.cpu_breach()
+        if exitcode == -signal.SIGKILL:
+            return "error", f"{self.name} was killed during its turn (out of memory?)"
+        return "error", f"{self.name} exited during its turn"
+
+    def kill(self):
+        """Kill the worker, even in the middle of a turn, and start a fresh one"""
+        self.close()
+        self.start()
+
+    def close(self):
+        """Kill the worker without restarting it"""
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+            self.process.close()
+            self.process = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        self.busy = False
+        self.reply = None
+
+
+def _idle_bot(player_sequence, board, time_budget, **kwargs):
+    return (0, 0), (0, 0)
+
+
+if __name__ == "__main__":
+    #   Per-turn hand-off overhead: round trip of a bot doing nothing, with the board sent over the pipe
+    #   or through a shared memory channel
+    worker = BotWorker("bot-worker-benchmark")
+    worker.wait_ready()
+    turns = 2000
+
+    for size in (8, 64):
+        board = np.zeros((size, size), dtype=np.int8)
+        channel = BoardChannel(board.size)
+        worker.use_channel(channel)
+        worker.wait_ready()
+
+        def pickled_turn():
+            worker.submit(_idle_bot, "0w0", decode_board(board), 1.0)
+
+        def shared_turn():
+            channel.write(board)
+            worker.submit_turn(channel, _idle_bot, "0w0", 1.0)
+
+        for name, turn in (("pickled board", pickled_turn), ("shared memory", shared_turn)):
+            start = time.perf_counter()
+            for _ in range(turns):
+                turn()
+                worker.result()
+            elapsed = time.perf_counter() - start
+            print(f"{size}x{size} {name}: {elapsed / turns * 1e6:.0f} us per turn")
+
+        channel.close()
+    worker.close()
@@ -1,9 +1,278 @@
+import ast
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+
 
 CHESS_BOT_LIST = {}
 
-def register_chess_bot(name, function):
+#   Bots receiving the board as an np.int8 array (see BoardEncoding.py) instead of an array of strings
+ENCODED_BOARD_BOTS = set()
+
+#   Module of each bot found by discover_chess_bots, imported or not
+BOT_MODULES = {}
+
+#   Modules being imported by get_chess_bot, innermost last
+_IMPORTING = []
+
+def register_chess_bot(name, function, encoded_board=False):
     global CHESS_BOT_LIST
-    if name in CHESS_BOT_LIST:
-        register_chess_bot(name+"_", function)
-    else:
-        CHESS_BOT_LIST[name] = function
\ No newline at end of file
+    #   Names found by discover_chess_bots belong to their module, even before it is imported. The module registering
+    #   a function defined elsewhere (e.g. ``register_chess_bot("Mine", chess_bot)``) is the one get_chess_bot imports
+    owners = (None, getattr(function, "__module__", None), *_IMPORTING[-1:])
+    while name in CHESS_BOT_LIST or BOT_MODULES.get(name) not in owners:
+        name += "_"
+
+    CHESS_BOT_LIST[name] = function
+    if encoded_board:
+        ENCODED_BOARD_BOTS.add(name)
+
+
+#   Lazy loading
+#
+#   Importing every module of the Bots package on start-up pays for the imports of bots which may never
+#   play. Instead, discover_chess_bots reads the names of the bots from the source of the modules, without
+#   running them, and get_chess_bot imports the module of a bot when it is first selected. The names read
+#   are cached in __pycache__/bot_manifest.json, along with the modification time and size of each module,
+#   so that only the modules changed since the last start are read again.
+#
+#   A module is imported right away if the names of its bots cannot be read from its source, that is if it
+#   does not call register_chess_bot with a literal name (e.g. ``register_chess_bot(f"Bot{depth}", ...)``).
+
+MANIFEST_FILE = "bot_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _scan_bot_module(path):
+    """
+    Read the names of the bots registered by a module, without importing it
+    :param path: Path of the module
+    :return: The names in the order they are registered, or None if the module has to be run to know them
+    """
+    try:
+        with open(path, "rb") as file:
+            tree = ast.parse(file.read(), path)
+    except (OSError, SyntaxError, ValueError):
+        #   Imported right away, so that the error shows up on start-up
+        return None
+
+    calls = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and any(
+            alias.name == "register_chess_bot" and alias.asname not in (None, "register_chess_bot") for alias in node.names
+        ):
+            return None
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        called = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+        if called != "register_chess_bot":
+            continue
+        if not node.args or not isinstance(node.args[0], ast.Constant) or not isinstance(node.args[0].value, str):
+            return None
+        calls.append((node.lineno, node.col_offset, node.args[0].value))
+
+    return [name for _, _, name in sorted(calls)]
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("modules", {})
+
+
+def _write_manifest(path, modules):
+    """Write the manifest atomically, leaving it out if the package is read-only"""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, "w") as file:
+            json.dump({"version": MANIFEST_VERSION, "modules": modules}, file, indent=1)
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def discover_chess_bots():
+    """
+    Find the bots of the Bots package without importing their modules (see get_chess_bot)
+    :return: The names of every bot, imported or not
+    """
+    package = __name__.rpartition(".")[0]
+    directory = os.path.dirname(os.path.abspath(__file__))
+    manifest_path = os.path.join(directory, "__pycache__", MANIFEST_FILE)
+
+    cached = _read_manifest(manifest_path)
+    modules = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".py") or file_name in ("__init__.py", "ChessBotList.py"):
+            continue
+        path = os.path.join(directory, file_name)
+        stat = os.stat(path)
+        entry = cached.get(file_name)
+        if entry is None or entry.get("mtime_ns") != stat.st_mtime_ns or entry.get("size") != stat.st_size:
+            entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "bots": _scan_bot_module(path)}
+        modules[file_name] = entry
+    if modules != cached:
+        _write_manifest(manifest_path, modules)
+
+    discovered = set(BOT_MODULES.values())
+    for file_name, entry in modules.items():
+        module = f"{package}.{file_name[:-3]}" if package else file_name[:-3]
+        if module in sys.modules or module in discovered:
+            continue
+        if entry["bots"] is None:
+            importlib.import_module(module)
+            continue
+        for name in entry["bots"]:
+            #   Same names as if the modules were imported in this order (see register_chess_bot)
+            while name in CHESS_BOT_LIST or name in BOT_MODULES:
+                name += "_"
+            BOT_MODULES[name] = module
+
+    return chess_bot_names()
+
+
+def chess_bot_names():
+    """Get the names of every bot, imported or not"""
+    return list(dict.fromkeys([*BOT_MODULES, *CHESS_BOT_LIST]))
+
+
+def get_chess_bot(name):
+    """
+    Get a bot, importing its module if it has not been yet
+    :param name: Name of the bot
+    :return: The bot function or session class
+    :raises KeyError: If there is no such bot
+    """
+    if name not in CHESS_BOT_LIST and name in BOT_MODULES:
+        _IMPORTING.append(BOT_MODULES[name])
+        try:
+            importlib.import_module(BOT_MODULES[name])
+        finally:
+            _IMPORTING.pop()
+    return CHESS_BOT_LIST[name]
+
+
+#   Anytime moves
+#
+#   A bot overrunning its time budget is stopped and loses its turn, unless it has published a move
+#   before. Bots get a ``report_best(move)`` callback in their kwargs to publish the best move found
+#   so far, the last one reported is played if the bot is stopped. A bot can also be written as a
+#   generator yielding better and better moves, each yielded move being reported:
+#
+#       def my_bot(player_sequence, board, time_budget, **kwargs):
+#           for depth in itertools.count(1):
+#               yield search(board, depth)      # played if the next depth does not finish in time
+
+def run_bot(bot, report_best, player_sequence, board, time_budget, **kwargs):
+    """
+    Run a bot function for one turn
+
+    :param bot: The bot function, possibly a generator function
+    :param report_best: Callback receiving the moves published by the bot
+    :return: The move returned by the bot, or the last one it yielded
+    """
+    move = bot(player_sequence, board, time_budget, report_best=report_best, **kwargs)
+    if not inspect.isgenerator(move):
+        return move
+
+    best = (0, 0), (0, 0)
+    try:
+        while True:
+            best = next(move)
+            report_best(best)
+    except StopIteration as stop:
+        return best if stop.value is None else stop.value
+
+
+#   Session bots
+#
+#   Instead of a function, a bot can be registered as a subclass of ChessBotSession. One instance is kept
+#   alive for the whole game in the player's worker process, so it can keep its search tree and caches
+#   from one turn to the next, and think during the other players' turns (pondering):
+#
+#       class MySession(ChessBotSession):
+#           def new_game(self, player_sequence, board):
+#               self.tree = {}
+#
+#           def think(self, deadline):
+#               ...                             # search self.board until time.monotonic() reaches deadline
+#               return (x1, y1), (x2, y2)
+#
+#           def ponder(self):
+#               ...                             # a short slice of work, e.g. one more node of the search
+#               return True                     # False when there is nothing left to do
+#
+#       register_chess_bot("MyBot", MySession)
+#
+#   The boards and moves given to a session are always in the orientation of its own player.
+
+class ChessBotSession:
+    def __init__(self):
+        #   The player sequence starting with this bot's player, and the current board
+        #   (kept up to date before every hook is called)
+        self.player_sequence = ""
+        self.board = None
+        #   State of the game clock on the current turn (see ChessClock.state), None without time control
+        self.clock = None
+
+    def new_game(self, player_sequence, board):
+        """Called when a game starts (or restarts from another position)"""
+        pass
+
+    def on_opponent_move(self, move):
+        """Called after another player has moved, ``self.board`` already shows the move"""
+        pass
+
+    def think(self, deadline):
+        """
+        Choose the move to play on ``self.board``
+        :param deadline: ``time.monotonic()`` value at which the move must have been returned
+        :return: The move ``((start_y, start_x), (end_y, end_x))``
+        """
+        raise NotImplementedError
+
+    def report_best(self, move):
+        """
+        Publish the best move found so far by ``think``, played if it does not return in time
+        (replaced by the runner of the session)
+        """
+        pass
+
+    def ponder(self):
+        """
+        Do a short slice of work while the other players are thinking, called repeatedly until it returns
+        ``False`` or something happens in the game. It must return quickly so as not to delay the bot's turn.
+        :return: ``True`` if there is more to do
+        """
+        return False
+
+    @classmethod
+    def play(cls, player_sequence, board, time_budget, report_best=None, **kwargs):
+        """Play a single turn with a fresh session, for runners keeping no state between turns"""
+        deadline = time.monotonic() + time_budget
+
+        session = cls()
+        session.player_sequence = player_sequence
+        session.board = board
+        session.clock = kwargs.get("clock")
+        if report_best is not None:
+            session.report_best = report_best
+        session.new_game(player_sequence, board)
+        return session.think(deadline)
+
+
+def is_session_bot(bot):
+    return isinstance(bot, type) and issubclass(bot, ChessBotSession)
\ No newline at end of file
@@ -0,0 +1,110 @@
+#
+#   Fixed-size transposition table shared by search bots
+#
+#   Positions are identified by their Zobrist key (see Zobrist.py at the root of the project):
+#
+#       from Zobrist import ZobristKeys
+#       from Bots.TranspositionTable import TranspositionTable
+#
+#       keys = ZobristKeys.get(board.shape)
+#       table = TranspositionTable()
+#
+#       key = keys.hash_board(board)
+#       entry = table.probe(key)
+#       if entry is None or entry.depth < depth:
+#           score, move = search(...)
+#           table.store(key, depth, score, TranspositionTable.EXACT, move)
+#
+#   The table is a set of preallocated NumPy arrays: its memory use never grows, and
+#   a new entry replaces the stored one when it comes from a newer search (see new_search)
+#   or was searched at least as deep.
+#
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    score: float
+    flag: int
+    move: Optional[tuple[tuple[int, int], tuple[int, int]]]
+
+
+class TranspositionTable:
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self, size: int = 1 << 20):
+        """
+        :param size: Number of entries, rounded up to a power of two
+        """
+        size = 1 << max(0, size - 1).bit_length()
+        self.mask = size - 1
+        self.generation = 1
+
+        self.keys = np.zeros(size, dtype=np.uint64)
+        self.scores = np.zeros(size, dtype=np.float64)
+        self.depths = np.zeros(size, dtype=np.int16)
+        self.flags = np.zeros(size, dtype=np.int8)
+        self.generations = np.zeros(size, dtype=np.uint8)
+        self.moves = np.full((size, 4), -1, dtype=np.int16)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def new_search(self):
+        """Start a new search: entries of previous searches become replaceable"""
+        self.generation = self.generation % 255 + 1
+
+    def clear(self):
+        """Remove every entry"""
+        self.generations[:] = 0
+        self.moves[:] = -1
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        Look up a position
+        :param key: The position's key
+        :return: The stored entry, or ``None`` if the position is not in the table
+        """
+        i = key & self.mask
+        if self.generations[i] == 0 or self.keys[i] != key:
+            return None
+
+        sy, sx, ey, ex = self.moves[i].tolist()
+        move = None if sy < 0 else ((sy, sx), (ey, ex))
+        return TTEntry(int(self.depths[i]), float(self.scores[i]), int(self.flags[i]), move)
+
+    def store(self, key: int, depth: int, score: float, flag: int = EXACT, move=None) -> bool:
+        """
+        Store a search result, following the replacement policy
+        :param key: The position's key
+        :param depth: Depth the position was searched to
+        :param score: Score of the position
+        :param flag: ``EXACT``, ``LOWER`` (fail high) or ``UPPER`` (fail low)
+        :param move: Best move found, if any
+        :return: ``True`` if the entry was stored, ``False`` if a more valuable entry was kept
+        """
+        i = key & self.mask
+        same_position = self.generations[i] != 0 and self.keys[i] == key
+        if not same_position and self.generations[i] == self.generation and depth < self.depths[i]:
+            return False
+
+        self.keys[i] = key
+        self.scores[i] = score
+        self.depths[i] = depth
+        self.flags[i] = flag
+        self.generations[i] = self.generation
+        if move is not None:
+            (sy, sx), (ey, ex) = move
+            self.moves[i] = (sy, sx, ey, ex)
+        elif not same_position:
+            self.moves[i] = -1
+        return True
+
+    def usage(self) -> float:
+        """Fraction of the entries used by the current search"""
+        return float(np.count_nonzero(self.generations == self.generation)) / len(self)
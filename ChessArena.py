@@ -25,7 +25,8 @@ from PieceManager import PieceManager
 
 from Tournament import TournamentWindow
 
-from Bots import *
+#   Bot modules are only imported once their bot is selected
+discover_chess_bots()
 
 
 #   Wrap up for QApplication
@@ -39,6 +40,7 @@ class ChessApp(QtWidgets.QApplication):
         arena.start()
 
         self.exec()
+        arena.game_manager.close_workers()
 
 
 #   Main window to handle the chess board
@@ -229,8 +231,8 @@ class ChessArena(Ui_MainWindow, QMainWindow):
             player = BotWidget(color)
 
             bot_selector = player.playerBot
-            for name in CHESS_BOT_LIST:
-                bot_selector.addItem(name, CHESS_BOT_LIST[name])
+            for name in chess_bot_names():
+                bot_selector.addItem(name)
             bot_selector.setCurrentIndex(0)
             if i != 0:
                 sep = QtWidgets.QFrame()
@@ -332,6 +334,25 @@ class ChessArena(Ui_MainWindow, QMainWindow):
         """
         self.statusbar.showMessage(message, duration)
 
+    def restore_piece(self, piece: Piece, square: tuple[int, int]):
+        """
+        Show again a piece removed with ``remove_piece``
+        :param piece: The piece
+        :param square: Coordinates of the piece on the board
+        """
+        piece.explode_timer.stop()
+        for fragment_item, _ in piece.fragmentItems:
+            self.chess_scene.removeItem(fragment_item)
+        piece.fragmentItems = []
+
+        piece.setPos(
+            QtCore.QPointF(
+                self.white_square.size().width() * square[1],
+                self.white_square.size().height() * square[0],
+            )
+        )
+        piece.show()
+
     def push_move_to_history(self, move: str, player: str):
         """
         Add a move to the history
@@ -346,3 +367,9 @@ class ChessArena(Ui_MainWindow, QMainWindow):
         tab.setItem(tab.rowCount() - 1, 1, QTableWidgetItem(move))
         tab.setItem(tab.rowCount() - 1, 2, QTableWidgetItem(player))
         tab.resizeColumnsToContents()
+
+    def pop_move_from_history(self):
+        """Remove the last move from the history"""
+        tab = self.movesList
+        if tab.rowCount() > 0:
+            tab.removeRow(tab.rowCount() - 1)
@@ -0,0 +1,182 @@
+#
+#   Game clocks
+#
+#   Instead of a flat budget per move, a game can be played with a time control: every player
+#   starts with a base time, which runs down while it is thinking, and gets an increment after each
+#   move (Fischer) or a delay at the start of each move during which its clock does not run.
+#   Unused time is kept for the next moves, and a player running out of time loses the game.
+#
+#   Time controls are written as in tournament files:
+#
+#       tournament:
+#         time_control: { base: 300, increment: 2, delay: 0, cpu_time: true }
+#
+#   With ``cpu_time``, bots are charged the CPU time of their worker rather than the wall-clock
+#   time of their turn, so that the work of the GUI or of other processes is not taken from them.
+#
+
+from dataclasses import dataclass
+from typing import List, NamedTuple, Optional
+
+
+@dataclass
+class TimeControl:
+    #   Time of each player at the start of the game, increment added after each move and delay
+    #   before the clock starts running on each move, in seconds
+    base: float
+    increment: float = 0.0
+    delay: float = 0.0
+    #   Charge bots with the CPU time of their turn instead of its wall-clock time
+    cpu_time: bool = False
+
+    #   Number of moves the remaining time is expected to last, used to suggest a budget per move
+    MOVES_TO_GO = 30
+
+    def export(self):
+        raw: dict = {}
+        raw["base"] = self.base
+        raw["increment"] = self.increment
+        raw["delay"] = self.delay
+        raw["cpu_time"] = self.cpu_time
+
+        return raw
+
+    @staticmethod
+    def from_dict(raw: Optional[dict]) -> Optional["TimeControl"]:
+        """
+        Read a time control from a tournament file
+        :param raw: The ``time_control`` entry, if any
+        :return: The time control, or ``None`` if ``raw`` is empty (flat budgets per move)
+        """
+        if not raw:
+            return None
+
+        return TimeControl(
+            float(raw["base"]),
+            float(raw.get("increment", 0.0)),
+            float(raw.get("delay", 0.0)),
+            bool(raw.get("cpu_time", False)),
+        )
+
+    @staticmethod
+    def parse(text: str, delay: float = 0.0, cpu_time: bool = False) -> "TimeControl":
+        """
+        Read a time control written as ``base[+increment]``, in seconds (e.g. ``"300+2"``)
+        :param text: The time control
+        :param delay: Delay of each move
+        :param cpu_time: Charge bots with their CPU time
+        :return: The time control
+        """
+        base, _, increment = text.partition("+")
+        return TimeControl(float(base), float(increment or 0.0), delay, cpu_time)
+
+    def describe(self) -> str:
+        """Short description, e.g. ``"5:00+2"``"""
+        text = format_time(self.base)
+        if self.increment:
+            text += f"+{self.increment:g}"
+        if self.delay:
+            text += f" d{self.delay:g}"
+        return text
+
+
+class ClockMove(NamedTuple):
+    """Time of a player before and after one of its moves, enough to take it back"""
+
+    player: int
+    before: float
+    after: float
+
+
+def format_time(seconds: float) -> str:
+    """Format a clock time as ``m:ss.s``"""
+    minutes, seconds = divmod(max(seconds, 0.0), 60)
+    return f"{int(minutes)}:{seconds:04.1f}"
+
+
+class ChessClock:
+    """
+    Clocks of the players of a game
+
+    The clock of a player only changes when one of its moves is charged, so that the arena decides
+    which time is charged (wall-clock or CPU time, see ``TimeControl.cpu_time``).
+    """
+
+    def __init__(self, time_control: TimeControl, players: int):
+        """
+        :param time_control: The time control of the game
+        :param players: Number of players
+        """
+        self.time_control: TimeControl = time_control
+        self.times: List[float] = [time_control.base] * players
+        #   Moves charged in the game, and moves taken back which can be replayed
+        self.history: List[ClockMove] = []
+        self.undone: List[ClockMove] = []
+
+    def time_left(self, player: int) -> float:
+        return self.times[player]
+
+    def limit(self, player: int) -> float:
+        """
+        Get the time a player can think before running out of time
+        :param player: Index of the player
+        :return: The time left on its clock, plus the delay of the move
+        """
+        return max(self.times[player], 0.0) + self.time_control.delay
+
+    def suggested_budget(self, player: int) -> float:
+        """
+        Get a budget for the next move of a player, given as ``time_budget`` to the bots that do not
+        manage their time themselves
+        :param player: Index of the player
+        :return: A share of the time left, never more than ``limit``
+        """
+        share = self.times[player] / self.time_control.MOVES_TO_GO + self.time_control.increment
+        return min(share + self.time_control.delay, self.limit(player))
+
+    def charge(self, player: int, elapsed: float) -> bool:
+        """
+        Charge a move to a player's clock
+        :param player: Index of the player
+        :param elapsed: Time taken by the move, in seconds
+        :return: ``False`` if the player has run out of time
+        """
+        before = self.times[player]
+        after = before - max(elapsed - self.time_control.delay, 0.0)
+        if after >= 0:
+            after += self.time_control.increment
+
+        self.times[player] = after
+        self.history.append(ClockMove(player, before, after))
+        self.undone = []
+        return after >= 0
+
+    def undo(self):
+        """Give back the time of the last move charged"""
+        if len(self.history) == 0:
+            return
+        move = self.history.pop()
+        self.times[move.player] = move.before
+        self.undone.append(move)
+
+    def redo(self):
+        """Charge again the last move taken back"""
+        if len(self.undone) == 0:
+            return
+        move = self.undone.pop()
+        self.times[move.player] = move.after
+        self.history.append(move)
+
+    def state(self, player: int) -> dict:
+        """
+        Clock state given to the bots in their ``clock`` kwarg
+        :param player: Index of the player to move
+        :return: Its time left, the increment and delay, and the time left of every player (by turn index)
+        """
+        return {
+            "time_left": self.times[player],
+            "increment": self.time_control.increment,
+            "delay": self.time_control.delay,
+            "cpu_time": self.time_control.cpu_time,
+            "times_left": list(self.times),
+        }
@@ -1,13 +1,14 @@
+import numpy as np
 
+from AttackTables import AttackTables, AXIS_DIRECTIONS, DIAGONAL_DIRECTIONS
+from BoardEncoding import COLORS, PIECE_TYPES, decode_board, encode_board
 
-def check_player_defeated(player_color, board):
-    for x in range(board.shape[0]):
-        for y in range(board.shape[1]):
-            if board[x,y] == 'k'+player_color:
-                return False
-    return True
 
 def move_is_valid(player_order, move, board):
+    #   Encoded boards are checked through their legacy string view
+    if board.dtype == np.int8:
+        board = decode_board(board)
+
     player_color = player_order[1]
     player_team = int(player_order[0])
     other_teams = [int(e) for e in player_order[::3]]
@@ -28,41 +29,23 @@ def move_is_valid(player_order, move, board):
     def can_move_or_capture(pos):
         return is_free(pos) or team_at(pos) != player_team
 
-    def can_move_diagonally():
-        dx = end[0] - start[0]
-        dy = end[1] - start[1]
-
-        def stepto(end):
-            delta = 1 if end > 0 else -1
-            i = delta
-            while abs(i) < abs(end):
-                yield i
-                i += delta
-
-        if abs(dx) == abs(dy):  #   diagonal move
-            for x,y in zip(stepto(dx), stepto(dy)):
-                if not is_free((start[0]+x,start[1]+y)):
-                    return False
-            return can_move_or_capture(end)
-        else:   # Invalid bishop move (only diagonals)
+    def can_slide(between):
+        if between is None:   # Not on the same line
             return False
 
-    def can_move_along_axis():
-        dx = end[0] - start[0]
-        dy = end[1] - start[1]
+        while between:
+            low = between & -between
+            if not is_free(divmod(low.bit_length() - 1, width)):
+                return False
+            between ^= low
 
-        if (dx == 0) != (dy == 0):  #   along the axis movement one must be equals to 0
-            dst = dx+dy
-            delta = 1 if dst > 0 else -1
-            Xaxis,Yaxis = (delta,0) if dx != 0 else (0,delta)
+        return can_move_or_capture(end)
 
-            for i in range(1, abs(dst)):
-                if not is_free((start[0] + Xaxis * i, start[1] + Yaxis * i)):
-                    return False
+    def can_move_diagonally():
+        return can_slide(tables.between_diagonal.get((start_sq, end_sq)))
 
-            return can_move_or_capture(end)
-        else:   # Invalid bishop move (only diagonals)
-            return False
+    def can_move_along_axis():
+        return can_slide(tables.between_axis.get((start_sq, end_sq)))
 
 
     start, end = move
@@ -81,13 +64,14 @@ def move_is_valid(player_order, move, board):
         return False
 
     piece = board[start[0], start[1]]
+    piece_type = piece[0]
     
     #   Moving right color
-    if piece.color != player_color:
+    if piece[1] != player_color:
         return False
 
     #   check piece specific rules
-    if piece.type == 'p':
+    if piece_type == 'p':
         if end[0] != start[0] + 1: #    Pawn always move forward
             return False
 
@@ -99,30 +83,400 @@ def move_is_valid(player_order, move, board):
             return False
         
         #   Capture ?
-        print(team_at(end), "!=", player_team, "==", team_at(end) != player_team)
         return abs(end[1] - start[1]) == 1 and (not is_free(end)) and team_at(end) != player_team
-    elif piece.type == 'n':
-        dx = abs(end[0] - start[0])
-        dy = abs(end[1] - start[1])
 
-        if (dx == 1 and dy == 2) or (dx == 2 and dy == 1):
+    #   Precomputed geometry of this board shape
+    tables = AttackTables.get(board.shape)
+    width = board.shape[1]
+    start_sq = start[0] * width + start[1]
+    end_sq = end[0] * width + end[1]
+
+    if piece_type == 'n':
+        if tables.knight[start_sq] >> end_sq & 1:
             return can_move_or_capture(end)
         else: # invalid knight move
             return False
 
-    elif piece.type == 'b':
+    elif piece_type == 'b':
         return can_move_diagonally()
 
-    elif piece.type == 'r':
+    elif piece_type == 'r':
         return can_move_along_axis()
 
-    elif piece.type == "q":
+    elif piece_type == "q":
         return can_move_diagonally() != can_move_along_axis()
 
-    elif piece.type == "k":
-        dx = abs(end[0] - start[0])
-        dy = abs(end[1] - start[1])
-
-        return (-1 <= dx <= 1 and -1 <= dy <= 1) and can_move_or_capture(end)
+    elif piece_type == "k":
+        return bool(tables.king[start_sq] >> end_sq & 1) and can_move_or_capture(end)
 
     return False
+
+
+#   Bitboard move generation
+#
+#   Squares are numbered row by row (``y * width + x``) and a bitboard is a plain python
+#   int holding one bit per square, so boards of any shape (and with 'XX' holes) are supported.
+
+
+def parse_teams(player_order):
+    """
+    Build the color -> team table of a player sequence
+
+    :param player_order: The player sequence, e.g. ``"0w01b2"``
+    :return: A dict mapping each color of the sequence to its team
+    """
+    return {player_order[i + 1]: int(player_order[i]) for i in range(0, len(player_order) - 2, 3)}
+
+
+class Bitboards:
+    """Per-color and per-piece-type bitboards of a board position"""
+
+    def __init__(self, board):
+        cells = encode_board(board)
+        self.height, self.width = cells.shape
+        self.full = (1 << (self.height * self.width)) - 1
+
+        types = [0] * (len(PIECE_TYPES) + 1)
+        colors = [0] * len(COLORS)
+        self.holes = 0
+
+        flat = cells.reshape(-1)
+        squares = np.flatnonzero(flat)
+        for sq, code in zip(squares.tolist(), flat[squares].tolist()):
+            bit = 1 << sq
+            if code < 0:
+                self.holes |= bit
+            else:
+                types[code & 7] |= bit
+                colors[code >> 3] |= bit
+
+        self.types: dict[str, int] = {t: types[i + 1] for i, t in enumerate(PIECE_TYPES)}
+        self.colors: dict[str, int] = {COLORS[c]: bb for c, bb in enumerate(colors) if bb}
+        self.occupied = sum(colors)
+        self.empty = self.full & ~(self.occupied | self.holes)
+
+
+def _bits(bb: int):
+    """Iterate over the indices of the set bits of a bitboard"""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def generate_legal_moves(player_order, board):
+    """
+    Generate every valid move of the player to move
+
+    The board is in the orientation of the player to move (pawns move towards increasing rows),
+    exactly as for ``move_is_valid``. Moves from or onto holes (``XX``) are never generated, while
+    ``move_is_valid`` may raise ``ValueError`` on a move onto a hole; for every other move
+    ``move_is_valid`` is the reference, a move is returned if and only if it accepts it.
+
+    :param player_order: The full player sequence, starting with the player to move
+    :param board: The board, either encoded or as an array of ``Piece`` objects or piece strings
+    :return: A list of ``((start_y, start_x), (end_y, end_x))`` moves
+    """
+    bbs = Bitboards(board)
+    tables = AttackTables.get((bbs.height, bbs.width), bbs.holes)
+    width = bbs.width
+    player_color = player_order[1]
+    teams = parse_teams(player_order)
+    player_team = teams[player_color]
+
+    own = bbs.colors.get(player_color, 0)
+    allies = 0
+    for color, bb in bbs.colors.items():
+        if teams.get(color) == player_team:
+            allies |= bb
+    enemies = bbs.occupied & ~allies
+    targets = bbs.empty | enemies
+
+    moves = []
+
+    def add(start: int, ends: int):
+        for end in _bits(ends):
+            moves.append(((start // width, start % width), (end // width, end % width)))
+
+    #   Pawns: one square forward, or capture diagonally forward
+    for start in _bits(own & bbs.types["p"]):
+        add(start, (tables.pawn_push[start] & bbs.empty) | (tables.pawn_captures[start] & enemies))
+
+    #   Knights and kings jump to their target squares
+    for start in _bits(own & bbs.types["n"]):
+        add(start, tables.knight[start] & targets)
+
+    for start in _bits(own & bbs.types["k"]):
+        add(start, tables.king[start] & targets)
+
+    #   Sliders move along each ray up to (and including) the first piece met
+    sliders = (
+        (own & (bbs.types["b"] | bbs.types["q"]), DIAGONAL_DIRECTIONS),
+        (own & (bbs.types["r"] | bbs.types["q"]), AXIS_DIRECTIONS),
+    )
+    for pieces, directions in sliders:
+        for start in _bits(pieces):
+            for direction in directions:
+                rays = tables.rays[direction]
+                ray = rays[start]
+                blockers = ray & bbs.occupied
+                if blockers:
+                    if direction[0] * width + direction[1] > 0:
+                        blocker = (blockers & -blockers).bit_length() - 1
+                    else:
+                        blocker = blockers.bit_length() - 1
+                    ray &= ~rays[blocker]
+                add(start, ray & targets)
+
+    return moves
+
+
+#   Vectorized validation
+
+PIECE_CODES = {t: i + 1 for i, t in enumerate(PIECE_TYPES)}
+EMPTY, OWN, ALLY, ENEMY, HOLE = 0, 1, 2, 3, -1
+
+
+def _side_and_type_arrays(player_order, board):
+    """
+    Describe a board as two int8 arrays, as seen by the player to move
+
+    :param player_order: The full player sequence, starting with the player to move
+    :param board: The board, either encoded or as an array of ``Piece`` objects or piece strings
+    :return: ``(sides, types)`` where ``sides`` holds ``EMPTY``, ``OWN``, ``ALLY``, ``ENEMY`` or ``HOLE``
+             and ``types`` the ``PIECE_CODES`` of the pieces (0 elsewhere)
+    """
+    cells = encode_board(board)
+    player_color = player_order[1]
+    teams = parse_teams(player_order)
+    player_team = teams[player_color]
+
+    #   Side of each color index
+    color_sides = np.full(len(COLORS), ENEMY, dtype=np.int8)
+    for color, team in teams.items():
+        if team == player_team and color in COLORS:
+            color_sides[COLORS.index(color)] = ALLY
+    color_sides[COLORS.index(player_color)] = OWN
+
+    pieces = cells > 0
+    sides = np.where(pieces, color_sides[cells >> 3], np.where(cells == HOLE, HOLE, EMPTY)).astype(np.int8)
+    types = np.where(pieces, cells & 7, 0).astype(np.int8)
+
+    return sides, types
+
+
+def move_is_valid_batch(player_order, moves, board):
+    """
+    Check many moves at once
+
+    Vectorized equivalent of ``move_is_valid``: bounds, ownership, piece pattern and path blocking
+    are evaluated with NumPy masks over the whole array of moves.
+
+    :param player_order: The full player sequence, starting with the player to move
+    :param moves: An integer array of shape ``(N, 2, 2)`` holding ``((start_y, start_x), (end_y, end_x))`` moves
+    :param board: The board (encoded or not), in the orientation of the player to move
+    :return: A boolean array of shape ``(N,)``, ``True`` where the move is valid
+    """
+    sides, types = _side_and_type_arrays(player_order, board)
+    moves = np.asarray(moves, dtype=np.int64).reshape(-1, 2, 2)
+    height, width = sides.shape
+
+    sy, sx = moves[:, 0, 0], moves[:, 0, 1]
+    ey, ex = moves[:, 1, 0], moves[:, 1, 1]
+
+    #   Check boundary condition (out of bounds moves are evaluated on square 0, then discarded)
+    valid = (
+        (sy >= 0) & (sy < height) & (sx >= 0) & (sx < width) &
+        (ey >= 0) & (ey < height) & (ex >= 0) & (ex < width)
+    )
+    sy, sx, ey, ex = (np.where(valid, v, 0) for v in (sy, sx, ey, ex))
+
+    #   Moving right color
+    valid &= sides[sy, sx] == OWN
+
+    piece = types[sy, sx]
+    end_side = sides[ey, ex]
+    end_free = end_side == EMPTY
+    can_move_or_capture = end_free | (end_side == ENEMY)
+
+    dy, dx = ey - sy, ex - sx
+    ady, adx = np.abs(dy), np.abs(dx)
+
+    #   Path blocking along diagonals and axes
+    diagonal = (ady == adx) & (ady != 0)
+    axis = (dy == 0) != (dx == 0)
+    line = diagonal | axis
+    dist = np.maximum(ady, adx)
+    step_y, step_x = np.sign(dy), np.sign(dx)
+
+    blocked = np.zeros(len(moves), dtype=bool)
+    for i in range(1, max(height, width) - 1):
+        on_path = line & (i < dist)
+        if not on_path.any():
+            break
+        py = np.where(on_path, sy + step_y * i, 0)
+        px = np.where(on_path, sx + step_x * i, 0)
+        blocked |= on_path & (sides[py, px] != EMPTY)
+    clear = line & ~blocked
+
+    #   Check piece specific rules
+    pawn = (dy == 1) & (((dx == 0) & end_free) | ((adx == 1) & (end_side == ENEMY)))
+    knight = ((ady == 1) & (adx == 2)) | ((ady == 2) & (adx == 1))
+    king = (ady <= 1) & (adx <= 1)
+
+    pattern = np.select(
+        [
+            piece == PIECE_CODES["p"],
+            piece == PIECE_CODES["n"],
+            piece == PIECE_CODES["b"],
+            piece == PIECE_CODES["r"],
+            piece == PIECE_CODES["q"],
+            piece == PIECE_CODES["k"],
+        ],
+        [
+            pawn,
+            knight & can_move_or_capture,
+            diagonal & clear & can_move_or_capture,
+            axis & clear & can_move_or_capture,
+            clear & can_move_or_capture,
+            king & can_move_or_capture,
+        ],
+        False,
+    )
+
+    return valid & pattern
+
+
+#   Compiled rules
+
+#   Direction pawns move towards on the reference board, for each board orientation
+PAWN_DIRECTIONS = {0: (1, 0), 1: (0, -1), 2: (-1, 0), 3: (0, 1)}
+
+
+class RuleContext:
+    """
+    Rules of a game, compiled once from its full player sequence
+
+    Unlike ``move_is_valid``, which works on the board as seen by the player to move,
+    queries are made on the reference (unrotated) encoded board: each player's pawns move
+    in the direction given by its orientation in the player sequence.
+    """
+
+    def __init__(self, player_order: str):
+        """
+        :param player_order: The full player sequence, e.g. ``"0w01b2"``
+        """
+        self.player_order: str = player_order
+        self.colors: list[str] = [player_order[i + 1] for i in range(0, len(player_order) - 2, 3)]
+        self.teams: dict[str, int] = parse_teams(player_order)
+        self.orientations: dict[str, int] = {
+            player_order[i + 1]: int(player_order[i + 2]) for i in range(0, len(player_order) - 2, 3)
+        }
+        self.pawn_directions: dict[str, tuple[int, int]] = {
+            color: PAWN_DIRECTIONS[rot % 4] for color, rot in self.orientations.items()
+        }
+        self.allies: dict[str, frozenset[str]] = {
+            color: frozenset(c for c, t in self.teams.items() if t == team) for color, team in self.teams.items()
+        }
+        self.enemies: dict[str, frozenset[str]] = {
+            color: frozenset(c for c, t in self.teams.items() if t != team) for color, team in self.teams.items()
+        }
+
+        #   Side of every cell code (see BoardEncoding) for each player, HOLE wrapping around to the last entry
+        self.sides: dict[str, list[int]] = {}
+        for color in self.colors:
+            sides = [EMPTY] * (len(COLORS) << 3)
+            for code in range(1, len(sides) - 1):
+                other = COLORS[code >> 3]
+                if other == color:
+                    sides[code] = OWN
+                elif other in self.allies[color]:
+                    sides[code] = ALLY
+                else:
+                    sides[code] = ENEMY
+            sides[HOLE] = HOLE
+            self.sides[color] = sides
+
+        self.color_indices: dict[str, int] = {color: COLORS.index(color) for color in self.colors}
+
+    def sequence(self, color: str) -> str:
+        """
+        Get the full player sequence starting with the given player, as used by ``move_is_valid``
+        :param color: The player's color
+        """
+        i = 3 * self.colors.index(color)
+        return self.player_order[i:] + self.player_order[:i]
+
+    def is_enemy(self, color: str, other: str) -> bool:
+        """Check whether two colors are in different teams"""
+        return other in self.enemies[color]
+
+    def is_valid(self, color: str, move, board: np.ndarray) -> bool:
+        """
+        Check whether a move is valid
+
+        Gives the same answer as ``move_is_valid`` for the same move seen from the player's orientation
+
+        :param color: Color of the player to move
+        :param move: The move ``((start_y, start_x), (end_y, end_x))`` on the reference board
+        :param board: The encoded reference board
+        :return: ``True`` if the move is valid
+        """
+        (sy, sx), (ey, ex) = move
+        height, width = board.shape
+
+        #   Check boundary condition
+        if not (0 <= sy < height and 0 <= sx < width and 0 <= ey < height and 0 <= ex < width):
+            return False
+
+        #   Moving right color
+        code = int(board[sy, sx])
+        if code <= 0 or code >> 3 != self.color_indices[color]:
+            return False
+
+        end_side = self.sides[color][board[ey, ex]]
+        can_move_or_capture = end_side == EMPTY or end_side == ENEMY
+        piece = code & 7
+
+        #   Pawns move forward or capture diagonally forward, in the player's own direction
+        if piece == PIECE_CODES["p"]:
+            fy, fx = self.pawn_directions[color]
+            dy, dx = ey - sy, ex - sx
+            if dy * fy + dx * fx != 1:
+                return False
+
+            across = dy * fx + dx * fy
+            if across == 0:
+                return end_side == EMPTY
+            return (across == 1 or across == -1) and end_side == ENEMY
+
+        if not can_move_or_capture:
+            return False
+
+        tables = AttackTables.get(board.shape)
+        start_sq = sy * width + sx
+        end_sq = ey * width + ex
+
+        if piece == PIECE_CODES["n"]:
+            return bool(tables.knight[start_sq] >> end_sq & 1)
+
+        if piece == PIECE_CODES["k"]:
+            return bool(tables.king[start_sq] >> end_sq & 1)
+
+        between = None
+        if piece != PIECE_CODES["r"]:
+            between = tables.between_diagonal.get((start_sq, end_sq))
+        if between is None and piece != PIECE_CODES["b"]:
+            between = tables.between_axis.get((start_sq, end_sq))
+        if between is None:
+            return False
+
+        #   Sliders need a free path
+        while between:
+            low = between & -between
+            sq = low.bit_length() - 1
+            if board[sq // width, sq % width]:
+                return False
+            between ^= low
+
+        return True
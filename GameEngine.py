@@ -0,0 +1,437 @@
+#
+#   Headless game engine
+#
+#   Plays games between bots without any display: the board, the rules, the turn loop, the timeouts
+#   and the result only depend on NumPy and the standard library, so that games can be run by the
+#   thousand on servers (see play.py). The GUI (GameManager) is another frontend over the same
+#   Referee, adding piece sprites, Qt timers and widgets on top.
+#
+#   Bots run in worker processes (see BotRunner) and are handed the board exactly as in the GUI:
+#   in their player's orientation, encoded or as piece strings, with the same kwargs. Workers can be
+#   given resource limits (see Sandbox.py): a bot going over them forfeits the game.
+#
+
+import time
+from dataclasses import dataclass, field
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from BoardEncoding import PIECE_TYPES, Delta, decode_board, encode_board, make_move
+from BotRunner import BoardChannel, BotWorker, can_run_in_worker
+from Bots.ChessBotList import is_session_bot, run_bot
+from ChessClock import ChessClock, TimeControl
+from ChessRules import RuleContext
+from Orientation import Orientation
+from Sandbox import ResourceLimits
+
+KING = PIECE_TYPES.index("k") + 1
+PAWN = PIECE_TYPES.index("p") + 1
+
+
+class Referee:
+    """
+    Rules of a game seen from its players
+
+    Players are numbered in the order of the player sequence. Moves given by the players are in their
+    own orientation, the board itself is the encoded reference board.
+    """
+
+    def __init__(self, player_order: str, shape: Tuple[int, int]):
+        """
+        :param player_order: The full player sequence
+        :param shape: The ``(height, width)`` of the board
+        """
+        self.player_order: str = player_order.strip()
+        self.rules: RuleContext = RuleContext(self.player_order)
+        self.players: int = len(self.player_order) // 3
+
+        #   Player sequence as seen by each player (starting with itself), and its orientation
+        self.sequences: List[str] = [
+            self.player_order[3 * i:] + self.player_order[:3 * i] for i in range(self.players)
+        ]
+        self.orientations: List[Orientation] = [Orientation.get(shape, int(seq[2])) for seq in self.sequences]
+
+    def player_board(self, cells: np.ndarray, player: int, encoded: bool = True) -> np.ndarray:
+        """
+        Get a copy of the board in the orientation of a player
+        :param cells: The encoded reference board
+        :param player: Index of the player
+        :param encoded: If ``True``, the board is encoded, else an array of piece strings
+        :return: The oriented board
+        """
+        board = self.orientations[player].view(cells)
+        return board if encoded else decode_board(board)
+
+    def resolve_move(self, cells: np.ndarray, player: int, move) -> Optional[Tuple[Tuple[int, int], Tuple[int, int], Optional[str]]]:
+        """
+        Check a move of a player and find its effect on the reference board
+        :param cells: The encoded reference board
+        :param player: Index of the player
+        :param move: The move ``((start_y, start_x), (end_y, end_x))``, in the player's orientation
+        :return: The start and end of the move on the reference board and the promotion of the piece if any,
+                 or ``None`` if the move is invalid
+        """
+        try:
+            (start_y, start_x), (end_y, end_x) = move
+            start, end = (int(start_y), int(start_x)), (int(end_y), int(end_x))
+        except (TypeError, ValueError):
+            return None
+
+        orientation = self.orientations[player]
+        real_start = orientation.to_reference(start)
+        real_end = orientation.to_reference(end)
+        if not self.rules.is_valid(self.sequences[player][1], (real_start, real_end), cells):
+            return None
+
+        promotion = None
+        if cells[real_start] & 7 == PAWN and end[0] == orientation.oriented_shape[0] - 1:
+            promotion = "q"
+        return real_start, real_end, promotion
+
+    def has_won(self, cells: np.ndarray, player: int) -> bool:
+        """
+        Check whether a player has won, i.e. its king is the last one on the board
+        :param cells: The encoded reference board
+        :param player: Index of the player
+        """
+        kings = cells[(cells > 0) & (cells & 7 == KING)]
+        return bool(np.all(kings >> 3 == self.rules.color_indices[self.sequences[player][1]]))
+
+    def time_winner(self, loser: int) -> int:
+        """
+        Get the winner of a game lost on time
+        :param loser: Index of the player who ran out of time
+        :return: Index of the next player of another team
+        """
+        team = self.sequences[loser][0]
+        winner = (loser + 1) % self.players
+        while winner != loser and self.sequences[winner][0] == team:
+            winner = (winner + 1) % self.players
+        return winner
+
+
+class BotSpec(NamedTuple):
+    """A bot taking part in a game"""
+
+    name: str
+    func: object
+    #   Whether the bot gets the encoded board (see Bots/ChessBotList.ENCODED_BOARD_BOTS)
+    encoded: bool = False
+
+
+class TurnUsage(NamedTuple):
+    """Resources used by a bot for one turn"""
+
+    player: int
+    #   Wall-clock time of the turn, and CPU time of the bot if it returned, in seconds
+    elapsed: float
+    cpu_time: Optional[float]
+    #   Peak resident memory of the bot's worker during the turn, in bytes, None if not measured
+    peak_rss: Optional[int]
+
+
+@dataclass
+class GameResult:
+    #   Index of the winning player, None if no one won within the move limit
+    winner: Optional[int]
+    #   "king" (last king standing), "time" (the loser ran out of time), "limit" (the loser went over
+    #   its resource limits) or "moves" (move limit reached)
+    reason: str
+    #   Moves played, as (player, start, end) on the reference board
+    moves: List[Tuple[int, Tuple[int, int], Tuple[int, int]]] = field(default_factory=list)
+    #   Turns lost by each player to an invalid move, an error or a timeout
+    lost_turns: List[int] = field(default_factory=list)
+    duration: float = 0.0
+    #   Index of the player who forfeited, and why, e.g. "ran out of time"
+    loser: Optional[int] = None
+    details: str = ""
+    #   Resources used by the bots, turn by turn
+    usage: List[TurnUsage] = field(default_factory=list)
+
+    @property
+    def plies(self) -> int:
+        return len(self.moves)
+
+    def peak_rss(self, player: int) -> Optional[int]:
+        """Peak memory of a player's worker over the game, in bytes, None if it was never measured"""
+        peaks = [turn.peak_rss for turn in self.usage if turn.player == player and turn.peak_rss is not None]
+        return max(peaks, default=None)
+
+
+class GameEngine:
+    """
+    One game between bots, played in worker processes without any display
+
+    Workers and their board channel are passed in, so that they can be reused from game to game
+    (see MatchRunner).
+    """
+
+    #   Time allowed above the budget before a bot is stopped, as in the GUI
+    GRACE_RATIO = 0.05
+    OUT_OF_TIME = "ran out of time"
+    #   Size of a square handed to the bots, that of the GUI's square sprites (Data/assets/light_square.png)
+    TILE_SIZE = 64
+
+    def __init__(self, player_order: str, board, bots: List[BotSpec], workers: List[BotWorker],
+                 channel: BoardChannel, budget: float = 1.0, time_control: Optional[TimeControl] = None,
+                 game_id: int = 0):
+        """
+        :param player_order: The full player sequence
+        :param board: The board, either encoded or as an array of ``Piece`` objects or piece strings
+        :param bots: The bot of each player, in the order of the player sequence
+        :param workers: The worker process of each player
+        :param channel: Shared memory channel handing the board to the workers, large enough for the board
+        :param budget: Time budget per move in seconds, used without time control
+        :param time_control: Time control of the game, ``None`` for flat budgets per move
+        :param game_id: Identifier of the game, telling the workers' session bots to start over
+        """
+        self.cells: np.ndarray = encode_board(board).copy()
+        self.referee: Referee = Referee(player_order, self.cells.shape)
+        if len(bots) != self.referee.players:
+            raise ValueError(f"{self.referee.players} bots expected, got {len(bots)}")
+
+        self.bots: List[BotSpec] = bots
+        self.workers: List[BotWorker] = workers
+        self.channel: BoardChannel = channel
+        self.budget: float = budget
+        self.clock: Optional[ChessClock] = None if time_control is None else ChessClock(time_control, len(bots))
+        self.game_id: int = game_id
+        self.turn: int = 0
+        self.history: List[Delta] = []
+        self.usage: List[TurnUsage] = []
+
+    def play(self, max_moves: int = 200) -> GameResult:
+        """
+        Play the game until a player wins or the move limit is reached
+        :param max_moves: Maximum number of turns
+        :return: The result of the game
+        """
+        start = time.perf_counter()
+        result = GameResult(None, "moves", lost_turns=[0] * len(self.bots), usage=self.usage)
+
+        for i, bot in enumerate(self.bots):
+            if is_session_bot(bot.func):
+                self.workers[i].new_game(
+                    bot.func, self.game_id, self.referee.sequences[i], self.referee.player_board(self.cells, i, bot.encoded)
+                )
+
+        for _ in range(max_moves):
+            player = self.turn
+            move, forfeit = self.play_turn(player)
+
+            if forfeit is not None:
+                result.winner = self.referee.time_winner(player)
+                result.reason = "time" if forfeit == self.OUT_OF_TIME else "limit"
+                result.loser = player
+                result.details = forfeit
+                break
+
+            resolved = self.referee.resolve_move(self.cells, player, move)
+            if resolved is None:
+                result.lost_turns[player] += 1
+            else:
+                real_start, real_end, promotion = resolved
+                self.history.append(make_move(self.cells, (real_start, real_end), promotion))
+                result.moves.append((player, real_start, real_end))
+                self.notify_sessions(player, real_start, real_end)
+
+                if self.referee.has_won(self.cells, player):
+                    result.winner = player
+                    result.reason = "king"
+                    break
+
+            self.turn = (self.turn + 1) % len(self.bots)
+
+        result.duration = time.perf_counter() - start
+        return result
+
+    def play_turn(self, player: int):
+        """
+        Run the bot of a player for one turn
+
+        A bot overrunning its time is stopped, and its last reported move is played.
+        :param player: Index of the player
+        :return: The move of the bot, and why the player forfeits if it has run out of time on its clock
+                 or gone over its resource limits, else ``None``
+        """
+        bot = self.bots[player]
+        budget = limit = self.budget
+        clock_state = None
+        if self.clock is not None:
+            budget = self.clock.suggested_budget(player)
+            limit = self.clock.limit(player)
+            clock_state = self.clock.state(player)
+
+        #   Sessions see the whole player sequence, other bots only their own part, as in the GUI
+        sequence = self.referee.sequences[player]
+        if not is_session_bot(bot.func):
+            sequence = sequence[:3]
+
+        board = self.referee.player_board(self.cells, player)
+        move = (0, 0), (0, 0)
+        cpu_time = peak_rss = breach = None
+
+        if can_run_in_worker(bot.func):
+            worker = self.workers[player]
+            worker.wait_ready()
+
+            start = time.perf_counter()
+            deadline = start + limit * (1 + self.GRACE_RATIO)
+            self.channel.write(board)
+            worker.submit_turn(self.channel, bot.func, sequence, budget, bot.encoded, self.game_id,
+                               tile_width=self.TILE_SIZE, tile_height=self.TILE_SIZE, clock=clock_state)
+
+            finished = worker.poll()
+            while not finished:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                worker.connection.poll(remaining)
+                finished = worker.poll()
+
+            elapsed = time.perf_counter() - start
+            if not finished:
+                #   Out of time: the last reported move is played, if any
+                if worker.best_move is not None:
+                    move = worker.best_move
+                worker.kill()
+            else:
+                best_move = worker.best_move
+                status, value = worker.result()
+                cpu_time, peak_rss = worker.cpu_time, worker.peak_rss
+                if status == "move":
+                    move = value
+                elif status == "limit":
+                    breach = value
+                else:
+                    print(value)
+                    if best_move is not None:
+                        move = best_move
+        else:
+            #   Bots which cannot be sent to a worker run here, and cannot be stopped
+            bot_board = board if bot.encoded else decode_board(board)
+            func = bot.func.play if is_session_bot(bot.func) else bot.func
+            start, cpu_start = time.perf_counter(), time.process_time()
+            try:
+                move = run_bot(func, lambda best: None, sequence, bot_board, budget,
+                               tile_width=self.TILE_SIZE, tile_height=self.TILE_SIZE, clock=clock_state)
+            except Exception as e:
+                print(f"{bot.name} failed: {e!r}")
+            elapsed = time.perf_counter() - start
+            cpu_time = time.process_time() - cpu_start
+
+        self.usage.append(TurnUsage(player, elapsed, cpu_time, peak_rss))
+        if breach is not None:
+            return move, breach
+        if self.clock is None:
+            return move, None
+
+        if self.clock.time_control.cpu_time and cpu_time is not None:
+            elapsed = cpu_time
+        return move, None if self.clock.charge(player, elapsed) else self.OUT_OF_TIME
+
+    def notify_sessions(self, player: int, start: Tuple[int, int], end: Tuple[int, int]):
+        """
+        Tell the session bots of the other players about a move
+        :param player: Index of the player who moved
+        :param start: Coordinates of the moved piece on the board
+        :param end: Destination of the piece on the board
+        """
+        for i, bot in enumerate(self.bots):
+            if i == player or not is_session_bot(bot.func):
+                continue
+            orientation = self.referee.orientations[i]
+            self.workers[i].opponent_move(
+                self.game_id,
+                (orientation.to_oriented(start), orientation.to_oriented(end)),
+                self.referee.player_board(self.cells, i, bot.encoded),
+            )
+
+
+class MatchRunner:
+    """
+    Plays games one after the other, keeping warm worker processes between games
+
+        with MatchRunner() as runner:
+            result = runner.play_game(player_order, board, bots)
+
+    A worker only imports the module of the bot it plays, so that the imports of the other bots do not count
+    in its memory: each bot gets a worker which imported its module, kept for the next games.
+    """
+
+    def __init__(self, preload: Tuple[str, ...] = ()):
+        """
+        :param preload: Modules imported by every worker on start-up, besides the module of its bot
+        """
+        self.preload: Tuple[str, ...] = tuple(preload)
+        self.workers: List[BotWorker] = []
+        self.channel: Optional[BoardChannel] = None
+        self.games: int = 0
+
+    def play_game(self, player_order: str, board, bots: List[BotSpec], budget: float = 1.0,
+                  time_control: Optional[TimeControl] = None, max_moves: int = 200,
+                  limits: Optional[ResourceLimits] = None) -> GameResult:
+        """
+        Play a game
+        :param player_order: The full player sequence
+        :param board: The board, either encoded or as an array of ``Piece`` objects or piece strings
+        :param bots: The bot of each player, in the order of the player sequence
+        :param budget: Time budget per move in seconds, used without time control
+        :param time_control: Time control of the game, ``None`` for flat budgets per move
+        :param max_moves: Maximum number of turns
+        :param limits: Resource limits of the bots, ``None`` for no limits
+        :return: The result of the game
+        """
+        cells = encode_board(board)
+        channel = self.get_channel(cells)
+        if any(worker.limits != limits or worker.channel_name != channel.name for worker in self.workers):
+            #   Limits are set and the board channel mapped when the workers start
+            for worker in self.workers:
+                worker.close()
+            self.workers = []
+
+        spare = list(self.workers)
+        workers: List[BotWorker] = []
+        for bot in bots:
+            preload = (*self.preload, bot.func.__module__)
+            worker = next((worker for worker in spare if worker.preload == preload), None)
+            if worker is None:
+                worker = BotWorker(f"bot-worker-{len(self.workers)}", preload, limits, channel)
+                self.workers.append(worker)
+            else:
+                spare.remove(worker)
+            workers.append(worker)
+
+        self.games += 1
+        engine = GameEngine(
+            player_order, cells, bots, workers, channel, budget, time_control, self.games
+        )
+        return engine.play(max_moves)
+
+    def get_channel(self, cells: np.ndarray) -> BoardChannel:
+        """
+        Get the channel handing the board to the workers, large enough for the given board
+        :param cells: The encoded board
+        :return: The board channel
+        """
+        if self.channel is None or not self.channel.fits(cells):
+            if self.channel is not None:
+                self.channel.close()
+            self.channel = BoardChannel(max(BoardChannel.DEFAULT_CAPACITY, cells.size))
+        return self.channel
+
+    def close(self):
+        """Stop the workers and release the board channel"""
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+        if self.channel is not None:
+            self.channel.close()
+            self.channel = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
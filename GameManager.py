@@ -1,51 +1,39 @@
 from __future__ import annotations
 
-from typing import Optional, TYPE_CHECKING
+import time
+from typing import Dict, Optional, TYPE_CHECKING, Union
 
 import numpy as np
 from PyQt6.QtCore import QTimer
 from PyQt6.QtGui import QIcon
 
+from BoardEncoding import decode_board
 from BoardManager import BoardManager
+from BotRunner import BoardChannel, BotWorker, can_run_in_worker
 from BotWidget import BotWidget
-from ChessRules import move_is_valid
-from ParallelPlayer import ParallelTurn
+from Bots.ChessBotList import ENCODED_BOARD_BOTS, is_session_bot
+from ChessClock import ChessClock, TimeControl, format_time
+from ChessRules import RuleContext
+from GameEngine import Referee
+from Orientation import Orientation
+from ParallelPlayer import ParallelTurn, ProcessTurn
 from Piece import Piece
 from PieceManager import PieceManager
 from Player import Player
-from TournamentManager import TournamentManager
+from Sandbox import ResourceLimits, format_memory
+from TournamentManager import Tournament, TournamentManager
 
 if TYPE_CHECKING:
     from ChessArena import ChessArena
 
 
-def rotate_coordinates(
-    size: tuple[int, int], pt: tuple[int, int], rot: int
-) -> tuple[int, int]:
-    """
-    Rotate the given coordinates by the indicated angle
-    :param size: Size of the board in the current orientation
-    :param pt: Coordinates in the current orientation
-    :param rot: Number of 90° clockwise rotations to perform
-    :return: The rotated coordinates
-    """
-    rot = rot % 4
-    if rot == 0:
-        return pt
-
-    y, x = pt
-    y2 = size[0] - y - 1
-    x2 = size[1] - x - 1
-    if rot == 1:
-        return x, y2
-    if rot == 2:
-        return y2, x2
-    return x2, y
-
-
 class GameManager:
-    MIN_WAIT = 500
+    #   Minimum time a turn is shown before the next one starts, in ms. Turns end as soon as the bot
+    #   has returned its move once it is elapsed, 0 plays the moves as fast as the bots go
+    PRESENTATION_DELAY = 500
     GRACE_RATIO = 0.05
+    #   Run bots in worker processes (see BotRunner) rather than in threads of the GUI process
+    USE_WORKER_PROCESSES = True
 
     def __init__(self, arena: ChessArena):
         self.arena: ChessArena = arena
@@ -55,15 +43,32 @@ class GameManager:
         self.players: list[Player] = []
         self.turn: int = 0
         self.nbr_turn_to_play: int = 0
-        self.current_player: Optional[ParallelTurn] = None
+        self.current_player: Optional[Union[ParallelTurn, ProcessTurn]] = None
+        #   Worker process of each player, kept across turns and games
+        self.workers: Dict[int, BotWorker] = {}
+        #   Shared memory holding the board of the current turn, read by the workers
+        self.board_channel: Optional[BoardChannel] = None
+        #   Game last announced to the session bot of each player (see Bots/ChessBotList.ChessBotSession)
+        self.session_games: Dict[int, int] = {}
         self.current_player_next_move = None
         self.current_player_color = None
         self.current_player_board = None
+        self.referee: Optional[Referee] = None
+        #   Time control of the games outside tournaments, ``None`` for flat budgets per move (see ChessClock)
+        self.time_control: Optional[TimeControl] = None
+        self.clock: Optional[ChessClock] = None
+        #   Memory and CPU limits of the bots outside tournaments, ``None`` for no limits (see Sandbox)
+        self.resource_limits: Optional[ResourceLimits] = None
+        #   Peak memory of each player's worker over the game, in bytes
+        self.peak_rss: Dict[int, int] = {}
+        self.turn_start: float = 0.0
+        self.presentation_delay: int = self.PRESENTATION_DELAY
         self.player_finished: bool = False
         self.auto_playing: bool = False
         self.timeout = QTimer()
         self.timeout.timeout.connect(lambda: self.end_turn(forced=True))
         self.min_wait = QTimer()
+        self.min_wait.setSingleShot(True)
         self.min_wait.timeout.connect(self.end_if_finished)
 
     def start_tournament_mode(self, tournament_manager: TournamentManager):
@@ -77,6 +82,8 @@ class GameManager:
         """Reset the game"""
         self.players = []
         self.turn = 0
+        self.clock = None
+        self.peak_rss = {}
 
     def add_player(self, color: str, widget: BotWidget):
         """
@@ -102,6 +109,119 @@ class GameManager:
             self.turn * 3 : self.turn * 3 + 3
         ]
 
+    def get_player_sequence(self, index: int) -> str:
+        """
+        Get the full player sequence as seen by a player
+        :param index: Index of the player
+        :return: The player sequence, starting with the given player
+        """
+        return self.get_referee().sequences[index]
+
+    def get_player_board(self, index: int, encoded: bool) -> np.ndarray:
+        """
+        Get a copy of the board in the orientation of a player
+        :param index: Index of the player
+        :param encoded: If ``True``, the board is encoded, else an array of piece strings
+        :return: The oriented board
+        """
+        return self.get_referee().player_board(self.board_manager.cells, index, encoded)
+
+    def get_referee(self) -> Referee:
+        """
+        Get the referee of the current game (see GameEngine), built again when the board changes
+        :return: The game's referee
+        """
+        cells = self.board_manager.cells
+        if (
+            self.referee is None
+            or self.referee.player_order != self.board_manager.player_order.strip()
+            or self.referee.orientations[0].shape != cells.shape
+        ):
+            self.referee = Referee(self.board_manager.player_order, cells.shape)
+        return self.referee
+
+    def get_rules(self) -> RuleContext:
+        """
+        Get the rules of the current game
+        :return: The game's rule context
+        """
+        return self.get_referee().rules
+
+    def get_time_control(self) -> Optional[TimeControl]:
+        """Get the time control of the game, the tournament's one in tournament mode"""
+        if self.tournament_mode and self.tournament_manager.tournament is not None:
+            return self.tournament_manager.tournament.time_control
+        return self.time_control
+
+    def get_resource_limits(self) -> Optional[ResourceLimits]:
+        """Get the resource limits of the bots, the tournament's ones in tournament mode"""
+        if self.tournament_mode and self.tournament_manager.tournament is not None:
+            return self.tournament_manager.tournament.resource_limits
+        return self.resource_limits
+
+    def get_clock(self) -> Optional[ChessClock]:
+        """
+        Get the clocks of the game, starting them on the first turn
+        :return: The game's clocks, or ``None`` if it is played with flat budgets per move
+        """
+        time_control = self.get_time_control()
+        if time_control is None:
+            self.clock = None
+        elif self.clock is None or self.clock.time_control != time_control or len(self.clock.times) != len(self.players):
+            self.clock = ChessClock(time_control, len(self.players))
+        return self.clock
+
+    def charge_clock(self, forced: bool) -> bool:
+        """
+        Charge the time of the current turn to the player's clock
+
+        The time of a bot stops when it returns its move, not when the arena ends the turn.
+        :param forced: ``True`` if the turn is ended because the player took too long
+        :return: ``False`` if the player has run out of time
+        """
+        if self.clock is None:
+            return True
+
+        elapsed = time.perf_counter() - self.turn_start
+        if self.current_player is not None and not forced and self.current_player.elapsed is not None:
+            elapsed = self.current_player.elapsed
+            if self.clock.time_control.cpu_time and self.current_player.cpu_time is not None:
+                elapsed = self.current_player.cpu_time
+
+        return self.clock.charge(self.turn, elapsed)
+
+    def forfeit(self, reason: str):
+        """
+        End the game when the player to move forfeits: the next player of another team wins
+        :param reason: Why the player forfeits, e.g. ``"ran out of time"``
+        """
+        loser_name = PieceManager.COLOR_NAMES[self.players[self.turn].color]
+        winner = self.get_referee().time_winner(self.turn) % len(self.players)
+
+        print(f"{loser_name} {reason}")
+        self.arena.show_status(f"{loser_name} {reason}")
+
+        self.current_player_color = self.players[winner].color
+        self.game_end(PieceManager.COLOR_NAMES[self.current_player_color], False)
+
+    def describe_clock(self, player: int) -> str:
+        """
+        Describe the clock of a player for the history
+        :param player: Index of the player
+        :return: The time left, e.g. ``" (4:58.2)"``, or ``""`` without time control
+        """
+        if self.clock is None:
+            return ""
+        return f" ({format_time(self.clock.time_left(player))})"
+
+    def record_usage(self):
+        """Record the peak memory of the bot of the current turn, when it runs in a worker"""
+        peak_rss = self.current_player.peak_rss
+        if peak_rss is None:
+            return
+        self.peak_rss[self.turn] = max(self.peak_rss.get(self.turn, 0), peak_rss)
+        print(f"Player {self.turn}'s peak memory: {format_memory(peak_rss)}")
+
     def next(self) -> bool:
         """
         Start a new turn
@@ -115,9 +235,17 @@ class GameManager:
 
         self.update_start_button(playing=True)
 
-        board = self.board_manager.board
         player: Player = self.players[self.turn]
         budget: float = player.get_budget()
+        #   Time after which the turn is ended, the budget itself with flat budgets
+        limit: float = budget
+        clock_state = None
+        clock = self.get_clock()
+        if clock is not None:
+            budget = clock.suggested_budget(self.turn)
+            limit = clock.limit(self.turn)
+            clock_state = clock.state(self.turn)
+
         sequence: str = self.get_sequence()
         func_name, func = player.get_func()
         print(f"Player {self.turn}'s turn: {func_name} (budget: {budget:.2f}s)")
@@ -128,41 +256,153 @@ class GameManager:
         self.player_finished = False
 
         self.current_player_color = player.color
-        self.current_player_board = np.rot90(board, int(sequence[2]))
+        orientation = Orientation.get(self.board_manager.cells.shape, int(sequence[2]))
+        self.current_player_board = orientation.view(self.board_manager.cells)
+
+        self.turn_start = time.perf_counter()
 
         if func_name == "ManualMover":
             self.start_manual_turn(player)
 
-            budget_ms: int = int(budget * 1000 * (1 + self.GRACE_RATIO))
+            budget_ms: int = int(limit * 1000 * (1 + self.GRACE_RATIO))
             self.timeout.start(budget_ms)
 
-            if self.MIN_WAIT < budget_ms:
-                self.min_wait.start(self.MIN_WAIT)
-
             return True
 
-        self.current_player = ParallelTurn(
-            func,
-            sequence,
-            BoardManager.get_string_board(self.current_player_board),
-            budget,
-            tile_width,
-            tile_height,
-        )
+        #   Sessions see the whole player sequence, as in ChessBotSession.new_game
+        if is_session_bot(func):
+            sequence = self.get_sequence(full=True)
+
+        if self.USE_WORKER_PROCESSES and can_run_in_worker(func):
+            #   Encoded boards are handed over as read-only views of the shared board
+            self.current_player = ProcessTurn(
+                self.get_worker(self.turn, func),
+                self.get_board_channel(),
+                func,
+                sequence,
+                self.current_player_board,
+                budget,
+                tile_width,
+                tile_height,
+                encoded_board=func_name in ENCODED_BOARD_BOTS,
+                game=self.board_manager.game_id,
+                clock=clock_state,
+            )
+        else:
+            #   Bots get their own copy of the board, they may play moves in place on it (see BoardEncoding.make_move)
+            if func_name in ENCODED_BOARD_BOTS:
+                bot_board = self.current_player_board.copy()
+            else:
+                bot_board = decode_board(self.current_player_board)
+
+            #   Threads keep no state between turns, session bots play each turn with a fresh session
+            if is_session_bot(func):
+                func = func.play
+
+            self.current_player = ParallelTurn(
+                func,
+                sequence,
+                bot_board,
+                budget,
+                tile_width,
+                tile_height,
+                clock=clock_state,
+            )
+            self.current_player.setTerminationEnabled(True)
 
-        self.current_player.setTerminationEnabled(True)
         self.current_player.finished.connect(self.on_player_finished)
-        self.current_player.start()
 
         # Timer to call
         # self.timeout.singleShot(int(budget * 1000 * 1.05), lambda: self.end_turn(forced=True))
-        budget_ms: int = int(budget * 1000 * (1 + self.GRACE_RATIO))
-        self.timeout.start(budget_ms)
-        if self.MIN_WAIT < budget_ms:
-            self.min_wait.start(self.MIN_WAIT)
+        budget_ms: int = int(limit * 1000 * (1 + self.GRACE_RATIO))
+        if isinstance(self.current_player, ProcessTurn):
+            #   The bot's time runs from the hand-off, once its worker is ready
+            self.current_player.handed_off.connect(lambda: self.timeout.start(budget_ms))
+            self.current_player.start()
+        else:
+            self.current_player.start()
+            self.timeout.start(budget_ms)
 
         return True
 
+    def get_worker(self, index: int, func) -> BotWorker:
+        """
+        Get the worker process of a player, starting it if needed
+        :param index: Index of the player in the player sequence
+        :param func: The player's bot (see Player.get_func), only its module is imported by the worker, so that the
+                     other players' modules do not count in its memory
+        :return: The player's worker, with the module of the bot imported
+        """
+        worker = self.workers.get(index)
+        limits = self.get_resource_limits()
+        channel = self.get_board_channel()
+        modules = [func.__module__]
+        if worker is not None and (worker.limits != limits or worker.channel_name != channel.name):
+            #   Limits are set and the board channel mapped when the process starts
+            worker.close()
+            self.session_games.pop(index, None)
+            worker = None
+        if worker is None:
+            worker = BotWorker(f"bot-worker-{index}", modules, limits, channel)
+            self.workers[index] = worker
+        else:
+            worker.load(modules)
+        return worker
+
+    def start_sessions(self):
+        """Start the game of the players' session bots, so they can ponder before their first turn"""
+        game = self.board_manager.game_id
+        for i, player in enumerate(self.players):
+            func_name, func = player.get_func()
+            if not is_session_bot(func) or self.session_games.get(i) == game:
+                continue
+            self.get_worker(i, func).new_game(
+                func, game, self.get_player_sequence(i), self.get_player_board(i, func_name in ENCODED_BOARD_BOTS)
+            )
+            self.session_games[i] = game
+
+    def notify_sessions(self, start: tuple[int, int], end: tuple[int, int]):
+        """
+        Tell the session bots of the other players about the move just played
+        :param start: Coordinates of the moved piece on the board
+        :param end: Destination of the piece on the board
+        """
+        game = self.board_manager.game_id
+        for i, player in enumerate(self.players):
+            worker = self.workers.get(i)
+            if i == self.turn or worker is None or self.session_games.get(i) != game:
+                continue
+            func_name, func = player.get_func()
+            orientation = self.get_referee().orientations[i]
+            worker.opponent_move(
+                game,
+                (orientation.to_oriented(start), orientation.to_oriented(end)),
+                self.get_player_board(i, func_name in ENCODED_BOARD_BOTS),
+            )
+
+    def get_board_channel(self) -> BoardChannel:
+        """
+        Get the shared memory channel used to hand the board over to the workers, large enough for the current board
+        :return: The board channel
+        """
+        if self.board_channel is not None and not self.board_channel.fits(self.board_manager.cells):
+            self.board_channel.close()
+            self.board_channel = None
+        if self.board_channel is None:
+            self.board_channel = BoardChannel(max(BoardChannel.DEFAULT_CAPACITY, self.board_manager.cells.size))
+        return self.board_channel
+
+    def close_workers(self):
+        """Stop every worker process and release the board channel"""
+        for worker in self.workers.values():
+            worker.close()
+        self.workers = {}
+        self.session_games = {}
+
+        if self.board_channel is not None:
+            self.board_channel.close()
+            self.board_channel = None
+
     def start_manual_turn(self, player):
         for piece in self.board_manager.pieces:
             if piece.color == player.color:
@@ -184,13 +424,10 @@ class GameManager:
             return
 
         sequence = self.get_sequence()
-        rot = int(sequence[2])
-        board_shape = self.board_manager.board.shape
-        rotated_start_tile = rotate_coordinates(board_shape, start_tile, rot)
-        rotated_end_tile = rotate_coordinates(board_shape, end_tile, rot)
-        move = (rotated_start_tile, rotated_end_tile)
+        orientation = Orientation.get(self.board_manager.cells.shape, int(sequence[2]))
+        move = (orientation.to_oriented(start_tile), orientation.to_oriented(end_tile))
 
-        if not move_is_valid(self.get_sequence(True), move, self.current_player_board):
+        if not self.get_rules().is_valid(sequence[1], (start_tile, end_tile), self.board_manager.cells):
             piece.setPos(piece.old_pos)
             return
 
@@ -206,11 +443,18 @@ class GameManager:
 
 
     def on_player_finished(self):
-        """Callback called by the player when it has finished playing"""
+        """
+        Callback called by the player when it has finished playing
+
+        The turn ends once it has been shown for the presentation delay, right away if it already has.
+        The end is queued on the event loop rather than run from the player's signal.
+        """
         self.player_finished = True
+        shown_ms = (time.perf_counter() - self.turn_start) * 1000
+        self.min_wait.start(max(0, int(self.presentation_delay - shown_ms)))
 
     def end_if_finished(self):
-        """Callback called after a minimum waiting time to end the turn if the player has already finished playing"""
+        """Callback called after the presentation delay to end the turn if the player has finished playing"""
         if self.player_finished:
             self.end_turn()
 
@@ -231,6 +475,10 @@ class GameManager:
             self.min_wait.stop()
             self.timeout.stop()
 
+            if not self.charge_clock(forced=False):
+                self.forfeit("ran out of time")
+                return True
+
             self.apply_move()
 
             if self.check_game_end():
@@ -260,6 +508,18 @@ class GameManager:
 
         self.current_player.terminate()
         self.current_player.quit()
+        self.record_usage()
+
+        if self.current_player.breach is not None:
+            breach = self.current_player.breach
+            self.current_player = None
+            self.forfeit(breach)
+            return True
+
+        if not self.charge_clock(forced):
+            self.current_player = None
+            self.forfeit("ran out of time")
+            return True
 
         self.apply_move()
 
@@ -272,7 +532,9 @@ class GameManager:
 
         if self.auto_playing:
             self.nbr_turn_to_play -= 1
-            if self.nbr_turn_to_play <= 0:
+            if self.nbr_turn_to_play <= 0 and self.tournament_mode and self.tournament_manager.tournament.type in Tournament.ROUND_TYPES:
+                self.game_draw()
+            elif self.nbr_turn_to_play <= 0:
                 self.arena.show_message(f"No more moves to play in the budget", "End of moves budget")
                 self.stop()
             else:
@@ -306,6 +568,15 @@ class GameManager:
             return False
         self.auto_playing = True
         print(f"Starting auto-play for {self.nbr_turn_to_play} moves")
+
+        #   Start the bots' workers now, so they are ready by their first turn
+        if self.USE_WORKER_PROCESSES:
+            for i, player in enumerate(self.players):
+                func_name, func = player.get_func()
+                if func_name != "ManualMover" and can_run_in_worker(func):
+                    self.get_worker(i, func)
+            self.start_sessions()
+
         self.next()
         return True
 
@@ -354,11 +625,66 @@ class GameManager:
 
     def undo_move(self):
         """Undo the last move, if any"""
-        self.arena.show_message("This feature has not been implemented yet")
+        if self.auto_playing or self.current_player is not None:
+            self.arena.show_status("Stop the game before undoing moves")
+            return
+
+        delta = self.board_manager.undo()
+        if delta is None:
+            self.arena.show_status("No move to undo")
+            return
+
+        tile_width = self.arena.white_square.size().width()
+        tile_height = self.arena.white_square.size().width()
+
+        delta.piece.move(delta.start[0], delta.start[1], tile_width, tile_height)
+        if type(delta.captured_piece) is Piece:
+            self.arena.restore_piece(delta.captured_piece, delta.end)
+
+        self.arena.pop_move_from_history()
+        if len(self.players) != 0:
+            self.turn = (self.turn - 1) % len(self.players)
+        if self.clock is not None:
+            self.clock.undo()
 
     def redo_move(self):
         """Redo the next move, if any"""
-        self.arena.show_message("This feature has not been implemented yet")
+        if self.auto_playing or self.current_player is not None:
+            self.arena.show_status("Stop the game before redoing moves")
+            return
+
+        delta = self.board_manager.redo()
+        if delta is None:
+            self.arena.show_status("No move to redo")
+            return
+
+        tile_width = self.arena.white_square.size().width()
+        tile_height = self.arena.white_square.size().width()
+
+        if type(delta.captured_piece) is Piece:
+            self.arena.remove_piece(delta.captured_piece)
+        delta.piece.move(delta.end[0], delta.end[1], tile_width, tile_height)
+
+        if self.clock is not None:
+            self.clock.redo()
+        self.arena.push_move_to_history(
+            self.describe_move(delta.start, delta.end) + self.describe_clock(self.turn),
+            PieceManager.COLOR_NAMES[delta.piece.color],
+        )
+        if len(self.players) != 0:
+            self.turn = (self.turn + 1) % len(self.players)
+
+    def describe_move(self, start: tuple[int, int], end: tuple[int, int]) -> str:
+        """
+        Describe a move for the history
+        :param start: Coordinates of the moved piece on the board
+        :param end: Destination of the piece on the board
+        :return: The move description, e.g. ``"E2 -> E3"``
+        """
+        real_height, real_width = self.board_manager.board.shape
+        col1 = "ABCDEFGH"[real_width - 1 - start[1]]
+        col2 = "ABCDEFGH"[real_width - 1 - end[1]]
+        return f"{col1}{start[0] + 1} -> {col2}{end[0] + 1}"
 
     def apply_move(self) -> bool:
         """
@@ -370,22 +696,24 @@ class GameManager:
         )
 
         start, end = move
+        start, end = (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+        move = (start, end)
         color: str = self.current_player_color
         color_name: str = PieceManager.COLOR_NAMES[color]
-        board = self.current_player_board
 
         tile_width = self.arena.white_square.size().width()
         tile_height = self.arena.white_square.size().width()
 
-        start_piece = board[start[0], start[1]]
-
-        if not move_is_valid(self.get_sequence(True), move, board):
+        resolved = self.get_referee().resolve_move(self.board_manager.cells, self.turn, move)
+        if resolved is None:
             print(f"Invalid move from {start} to {end}")
             return False
+        real_start, real_end, promotion = resolved
 
-        end_piece = board[end[0], end[1]]
+        start_piece = self.board_manager.board[real_start]
+        end_piece = self.board_manager.board[real_end]
 
-        start_piece_and_col = f"{start_piece.type}{start_piece.color}"
+        start_piece_and_col = start_piece.string()
 
         print(
             f"{color_name} moved {PieceManager.get_piece_name(start_piece_and_col)} from {start} to {end}"
@@ -393,41 +721,26 @@ class GameManager:
 
         # Capture
         if end_piece != '':
-            end_piece_and_col = f"{end_piece.type}{end_piece.color}"
+            end_piece_and_col = end_piece.string()
 
             print(
                 f"{color_name} captured {PieceManager.get_piece_name(end_piece_and_col)}"
             )
 
         # Apply move
-        board[end[0], end[1]] = start_piece
-        board[start[0], start[1]] = ""
+        self.board_manager.apply_move(real_start, real_end, promotion)
 
         if type(end_piece) is Piece:
-            self.board_manager.pieces = [p for p in self.board_manager.pieces if p is not end_piece]
-
             self.arena.remove_piece(end_piece)
-        
-        # Promotion
-        if start_piece[0] == "p" and end[0] == board.shape[0] - 1:
-            PieceManager.upgrade_piece(board[end[0], end[1]], 'q')
 
-        sequence: str = self.get_sequence()
-        rot: int = int(sequence[2])
-        real_start = rotate_coordinates(board.shape, start, rot)
-        real_end = rotate_coordinates(board.shape, end, rot)
-        real_height, real_width = self.board_manager.board.shape
-        col1 = "ABCDEFGH"[real_width - 1 - real_start[1]]
-        col2 = "ABCDEFGH"[real_width - 1 - real_end[1]]
-        
         start_piece.move(real_end[0], real_end[1], tile_width, tile_height);
 
-        row1 = real_start[0] + 1
-        row2 = real_end[0] + 1
         self.arena.push_move_to_history(
-            f"{col1}{row1} -> {col2}{row2}", color_name
+            self.describe_move(real_start, real_end) + self.describe_clock(self.turn), color_name
         )
 
+        self.notify_sessions(real_start, real_end)
+
         return True
 
     def reload(self):
@@ -462,13 +775,10 @@ class GameManager:
         self.start()
 
     def check_game_end(self):
-        board = self.current_player_board
         current_color = self.current_player_color
-        for y in range(board.shape[0]):
-            for x in range(board.shape[1]):
-                piece = board[y, x]
-                if piece and piece[0] == "k" and piece[1] != current_color:
-                    return
+        for color in self.board_manager.available_colors:
+            if color != current_color and self.board_manager.has_king(color):
+                return
 
         color_name: str = PieceManager.COLOR_NAMES[current_color]
         print(f"color : {current_color}")
@@ -494,3 +804,16 @@ class GameManager:
 
         if self.tournament_mode and not self.tournament_manager.tournament.won:
             QTimer.singleShot(5000, self.reload_and_start)
+
+    def game_draw(self):
+        """End a round-robin or Swiss tournament match without winner, once the moves budget is used"""
+        self.stop()
+        tournament = self.tournament_manager.tournament
+
+        self.arena.show_timed_message(
+            f"{tournament.current.player1.name} and {tournament.current.player2.name} drew the match", "End of game"
+        )
+        tournament.set_draw_and_next()
+
+        if not tournament.won:
+            QTimer.singleShot(5000, self.reload_and_start)
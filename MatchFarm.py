@@ -0,0 +1,444 @@
+#
+#   Match farm: bulk games between bots on every core
+#
+#   Games are played by farm processes, each one running a GameEngine (and the worker processes of
+#   its bots) for one game at a time. The farm hands the games out as processes become free, only
+#   reading a bounded number of games ahead from the list of games to play, and streams the results
+#   back as games finish:
+#
+#       python MatchFarm.py --bot MyBot --opponent PawnMover --map default.brd --games 1000
+#
+#   A farm process crashing or overrunning the time allowed to a game is killed, with the bots it
+#   runs, and replaced by a fresh one: the game is reported as failed and the farm goes on. A bot
+#   going over its resource limits (see Sandbox.py) only loses its game. Two-player games are rated
+#   as they finish (see Ratings.py), unless --no-ratings is given.
+#
+
+import argparse
+import itertools
+import os
+import signal
+import sys
+import time
+import traceback
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection, wait
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from BoardEncoding import encode_board
+from BoardFile import find_board_file, read_board_file
+from BotRunner import BotWorker
+from Bots.ChessBotList import ENCODED_BOARD_BOTS, discover_chess_bots, get_chess_bot
+from ChessClock import TimeControl
+from GameEngine import BotSpec, GameResult, MatchRunner, Referee
+from Ratings import RatingStore
+from Sandbox import ResourceLimits, format_memory
+
+
+class GameJob(NamedTuple):
+    """A game to play"""
+
+    index: int
+    #   Board file or name in Data/maps
+    map: str
+    #   Bot names, in the order of the player sequence
+    bots: Tuple[str, ...]
+    budget: float = 1.0
+    time_control: Optional[TimeControl] = None
+    max_moves: int = 200
+    limits: Optional[ResourceLimits] = None
+
+
+class GameOutcome(NamedTuple):
+    """How a game went"""
+
+    job: GameJob
+    #   "done", or why the game has no result: "error" (raised), "crashed" (its process died)
+    #   or "timeout" (it took longer than the farm's game timeout)
+    status: str
+    result: Optional[GameResult] = None
+    #   Seats of the players on the winner's team
+    winners: Tuple[int, ...] = ()
+    message: str = ""
+
+
+def _farm_serve(connection: Connection, quiet: bool):
+    """Main loop of a farm process: play each game received, until the pipe is closed"""
+    #   The farm process and its bots form a process group, killed together (see MatchFarm.kill)
+    if hasattr(os, "setpgid"):
+        os.setpgid(0, 0)
+    if quiet:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+
+    discover_chess_bots()
+
+    boards: Dict[str, tuple] = {}
+    runner = MatchRunner()
+    try:
+        while True:
+            try:
+                job: GameJob = connection.recv()
+            except (EOFError, OSError):
+                return
+
+            try:
+                if job.map not in boards:
+                    loaded = read_board_file(find_board_file(job.map))
+                    if loaded is None:
+                        raise ValueError(f"Cannot read board '{job.map}'")
+                    boards[job.map] = loaded[0], encode_board(loaded[1]), Referee(loaded[0], loaded[1].shape)
+                player_order, board, referee = boards[job.map]
+
+                #   The farm releases the board channel if it has to kill this process
+                connection.send(("start", runner.get_channel(board).name))
+
+                funcs = [get_chess_bot(name) for name in job.bots]
+                bots = [BotSpec(name, func, name in ENCODED_BOARD_BOTS) for name, func in zip(job.bots, funcs)]
+                result = runner.play_game(
+                    player_order, board, bots, job.budget, job.time_control, job.max_moves, job.limits
+                )
+
+                winners = ()
+                if result.winner is not None:
+                    team = referee.sequences[result.winner][0]
+                    winners = tuple(i for i, seq in enumerate(referee.sequences) if seq[0] == team)
+                outcome = GameOutcome(job, "done", result, winners)
+            except Exception:
+                outcome = GameOutcome(job, "error", message=traceback.format_exc())
+
+            connection.send(outcome)
+    finally:
+        runner.close()
+
+
+class FarmProcess:
+    """A farm process and the game it is playing"""
+
+    def __init__(self, name: str, quiet: bool):
+        self.connection, child = BotWorker.CONTEXT.Pipe()
+        #   Not a daemon: it starts the worker processes of its bots
+        self.process = BotWorker.CONTEXT.Process(target=_farm_serve, args=(child, quiet), name=name)
+        self.process.start()
+        child.close()
+        self.job: Optional[GameJob] = None
+        self.started: float = 0.0
+        #   Shared memory blocks created by the process, released if it is killed
+        self.channels: set[str] = set()
+
+    def submit(self, job: GameJob):
+        self.connection.send(job)
+        self.job = job
+        self.started = time.monotonic()
+
+    def kill(self):
+        """Kill the process and the worker processes of its bots"""
+        if self.process.is_alive():
+            try:
+                if hasattr(os, "killpg"):
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                else:
+                    self.process.kill()
+            except OSError:
+                self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+        for name in self.channels:
+            try:
+                memory = shared_memory.SharedMemory(name=name)
+            except FileNotFoundError:
+                continue
+            memory.close()
+            memory.unlink()
+
+    def close(self):
+        """Let the process finish once it has no game left"""
+        self.connection.close()
+        self.process.join()
+
+
+class MatchFarm:
+    """
+    Plays games in parallel processes
+
+        farm = MatchFarm(jobs=8)
+        for outcome in farm.run(games):
+            print(outcome.status, outcome.result)
+    """
+
+    def __init__(self, jobs: Optional[int] = None, queue_size: Optional[int] = None,
+                 game_timeout: Optional[float] = None, quiet: bool = True):
+        """
+        :param jobs: Number of games played at the same time, the number of cores by default
+        :param queue_size: Number of games read ahead from the games to play, twice ``jobs`` by default
+        :param game_timeout: Time after which a game is stopped, in seconds. By default, twice the time
+                             its players may take with their budgets or clocks, plus a minute
+        :param quiet: Silence the output of the bots
+        """
+        self.jobs: int = jobs or os.cpu_count() or 1
+        self.queue_size: int = queue_size or 2 * self.jobs
+        self.game_timeout: Optional[float] = game_timeout
+        self.quiet: bool = quiet
+        self.spawned = itertools.count()
+
+    def timeout_of(self, job: GameJob) -> float:
+        if self.game_timeout is not None:
+            return self.game_timeout
+        if job.time_control is not None:
+            tc = job.time_control
+            game_time = len(job.bots) * (tc.base + job.max_moves * (tc.increment + tc.delay))
+        else:
+            game_time = job.max_moves * job.budget
+        return 2 * game_time + 60
+
+    def spawn(self) -> FarmProcess:
+        return FarmProcess(f"farm-{next(self.spawned)}", self.quiet)
+
+    def run(self, games: Iterable[Optional[GameJob]], timeout: Optional[float] = None) -> Iterator[Optional[GameOutcome]]:
+        """
+        Play games, yielding their outcomes as they finish (not in order)
+
+        The games to play can depend on the outcomes (e.g. the next matches of a tournament): ``games`` can
+        yield ``None`` when no game can be played until some of the games being played have finished,
+        it is read again after each outcome. The farm stops when no game is being played either.
+
+        :param games: The games to play, read as the farm goes
+        :param timeout: If given, ``None`` is yielded whenever no game has finished within this time, in
+                        seconds, so that the caller can do something else in the meantime (e.g. run a GUI)
+        """
+        games = iter(games)
+        pending: List[GameJob] = []
+        processes: List[FarmProcess] = []
+        exhausted = False
+
+        try:
+            while True:
+                #   Read ahead, up to the size of the queue
+                while not exhausted and len(pending) < self.queue_size:
+                    job = next(games, StopIteration)
+                    if job is StopIteration:
+                        exhausted = True
+                    elif job is None:
+                        break
+                    else:
+                        pending.append(job)
+
+                #   Hand the games out to the free processes, starting them as needed
+                for process in processes:
+                    if process.job is None and pending:
+                        process.submit(pending.pop(0))
+                while pending and len(processes) < self.jobs:
+                    process = self.spawn()
+                    process.submit(pending.pop(0))
+                    processes.append(process)
+
+                busy = [process for process in processes if process.job is not None]
+                if not busy:
+                    return
+
+                now = time.monotonic()
+                deadline = min(process.started + self.timeout_of(process.job) for process in busy)
+                wait_time = max(deadline - now, 0) if timeout is None else min(max(deadline - now, 0), timeout)
+                wait([process.connection for process in busy] + [process.process.sentinel for process in busy], wait_time)
+                finished = False
+
+                for i, process in enumerate(processes):
+                    if process.job is None:
+                        continue
+                    job = process.job
+
+                    outcome = None
+                    try:
+                        while outcome is None and process.connection.poll():
+                            message = process.connection.recv()
+                            if isinstance(message, GameOutcome):
+                                outcome = message
+                            else:
+                                #   ("start", channel name): the game starts now that the process is up
+                                process.started = time.monotonic()
+                                process.channels.add(message[1])
+                    except (EOFError, OSError):
+                        pass
+
+                    if outcome is not None:
+                        process.job = None
+                        finished = True
+                        yield outcome
+                        continue
+
+                    if not process.process.is_alive():
+                        status, message = "crashed", f"Farm process exited with code {process.process.exitcode}"
+                    elif time.monotonic() - process.started > self.timeout_of(job):
+                        status, message = "timeout", f"Game took longer than {self.timeout_of(job):g}s"
+                    else:
+                        continue
+
+                    process.kill()
+                    processes[i] = self.spawn()
+                    finished = True
+                    yield GameOutcome(job, status, message=message)
+
+                if timeout is not None and not finished:
+                    yield None
+        finally:
+            for process in processes:
+                if process.job is None:
+                    process.close()
+                else:
+                    process.kill()
+
+
+class FarmStats:
+    """Aggregate results of the games of a farm"""
+
+    def __init__(self):
+        self.start: float = time.monotonic()
+        self.games: int = 0
+        self.failed: int = 0
+        #   Wins, draws and losses of each bot
+        self.records: Dict[str, List[int]] = {}
+        #   Peak memory of each bot over the games, in bytes, and losses by going over resource limits
+        self.peak_rss: Dict[str, int] = {}
+        self.breaches: Dict[str, int] = {}
+
+    def add(self, outcome: GameOutcome):
+        self.games += 1
+        if outcome.status != "done":
+            self.failed += 1
+            return
+
+        for seat, name in enumerate(outcome.job.bots):
+            record = self.records.setdefault(name, [0, 0, 0])
+            if outcome.result.winner is None:
+                record[1] += 1
+            elif seat in outcome.winners:
+                record[0] += 1
+            else:
+                record[2] += 1
+
+            peak = outcome.result.peak_rss(seat)
+            if peak is not None:
+                self.peak_rss[name] = max(self.peak_rss.get(name, 0), peak)
+
+        if outcome.result.reason == "limit":
+            name = outcome.job.bots[outcome.result.loser]
+            self.breaches[name] = self.breaches.get(name, 0) + 1
+
+    @property
+    def games_per_minute(self) -> float:
+        return self.games * 60 / max(time.monotonic() - self.start, 1e-9)
+
+    def summary(self) -> str:
+        lines = [f"{self.games} game(s), {self.failed} failed, {self.games_per_minute:.1f} games/min"]
+        for name, (wins, draws, losses) in sorted(self.records.items()):
+            played = wins + draws + losses
+            line = f"  {name:<20} {wins:>6} W {draws:>6} D {losses:>6} L   score {(wins + draws / 2) / played:6.1%}"
+            if name in self.peak_rss:
+                line += f"   peak {format_memory(self.peak_rss[name])}"
+            if name in self.breaches:
+                line += f"   {self.breaches[name]} over limits"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def evaluation_games(bot: str, opponents: List[str], maps: List[str], games: int, budget: float,
+                     time_control: Optional[TimeControl], max_moves: int,
+                     limits: Optional[ResourceLimits] = None) -> Iterator[GameJob]:
+    """
+    Games of a bot against opponents, cycling through the maps, the opponents and the bot's seat
+    :return: The games, generated as they are read
+    """
+    players = {}
+    for index in range(games):
+        map_name = maps[index % len(maps)]
+        if map_name not in players:
+            loaded = read_board_file(find_board_file(map_name))
+            if loaded is None:
+                raise ValueError(f"Cannot read board '{map_name}'")
+            players[map_name] = len(loaded[0].strip()) // 3
+
+        count = players[map_name]
+        opponent = opponents[(index // len(maps)) % len(opponents)]
+        seat = (index // (len(maps) * len(opponents))) % count
+        bots = tuple(bot if i == seat else opponent for i in range(count))
+        yield GameJob(index, map_name, bots, budget, time_control, max_moves, limits)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Play bulk games between bots on every core")
+    parser.add_argument("--bot", required=True, help="Bot to evaluate")
+    parser.add_argument("--opponent", action="append", help="Opponent bot, can be repeated (default: the bot itself)")
+    parser.add_argument("--map", action="append", help="Board file or name in Data/maps, can be repeated (default: default.brd)")
+    parser.add_argument("--games", type=int, default=100, help="Number of games")
+    parser.add_argument("--jobs", type=int, help="Games played at the same time (default: number of cores)")
+    parser.add_argument("--queue", type=int, help="Games read ahead (default: twice the number of jobs)")
+    parser.add_argument("--budget", type=float, default=1.0, help="Time budget per move in seconds, without time control")
+    parser.add_argument("--time-control", help="Clock of each player, as base[+increment] in seconds (e.g. 300+2)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Delay of each move with a time control, in seconds")
+    parser.add_argument("--cpu-time", action="store_true", help="Charge bots with their CPU time instead of wall-clock time")
+    parser.add_argument("--max-moves", type=int, default=200, help="Moves after which a game is stopped without winner")
+    parser.add_argument("--memory-mb", type=int, help="Address space of each bot's worker, in megabytes")
+    parser.add_argument("--cpu-seconds", type=float, help="CPU time of each turn, in seconds")
+    parser.add_argument("--game-timeout", type=float, help="Time after which a game is stopped, in seconds")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the bots")
+    parser.add_argument("--report-every", type=int, default=50, help="Print the aggregate results every N games")
+    parser.add_argument("--no-ratings", action="store_true", help="Do not rate the games (see Ratings.py)")
+    args = parser.parse_args(argv)
+
+    available = discover_chess_bots()
+
+    opponents = args.opponent or [args.bot]
+    for name in [args.bot, *opponents]:
+        if name not in available:
+            print(f"Unknown bot '{name}', available bots: {', '.join(sorted(available))}")
+            return 2
+
+    time_control = None
+    if args.time_control:
+        time_control = TimeControl.parse(args.time_control, args.delay, args.cpu_time)
+
+    limits = None
+    if args.memory_mb is not None or args.cpu_seconds is not None:
+        try:
+            limits = ResourceLimits(args.memory_mb, args.cpu_seconds)
+        except ValueError as e:
+            parser.error(str(e))
+
+    games = evaluation_games(
+        args.bot, opponents, args.map or ["default.brd"], args.games, args.budget, time_control, args.max_moves, limits
+    )
+    farm = MatchFarm(args.jobs, args.queue, args.game_timeout, quiet=not args.verbose)
+    stats = FarmStats()
+    ratings = None if args.no_ratings else RatingStore()
+
+    for outcome in farm.run(games):
+        stats.add(outcome)
+        job = outcome.job
+        if outcome.status == "done" and ratings is not None:
+            ratings.record_game(job.bots, outcome.winners)
+        if outcome.status == "done":
+            result = outcome.result
+            if result.winner is None:
+                text = f"no winner after {result.plies} moves"
+            else:
+                text = f"{job.bots[result.winner]} wins by {result.reason} after {result.plies} moves"
+                if result.reason == "limit":
+                    text += f" ({job.bots[result.loser]} {result.details})"
+        else:
+            text = f"{outcome.status.upper()}: {outcome.message.strip().splitlines()[-1]}"
+        print(f"[{stats.games}/{args.games}] game {job.index} on {job.map} ({', '.join(job.bots)}): {text}")
+
+        if stats.games % args.report_every == 0 and stats.games != args.games:
+            print(stats.summary())
+
+    print(stats.summary())
+
+    if ratings is not None:
+        ratings.close()
+        print(", ".join(f"{name} {ratings.get(name).rating:.0f}" for name in dict.fromkeys([args.bot, *opponents])) + " (Glicko-2)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class Orientation:
+    """
+    Mapping between the reference board and the board as seen by a player
+
+    A player of orientation ``rot`` sees the reference board rotated ``rot`` times by 90°
+    (``np.rot90(board, rot)``), so that its pawns move towards increasing rows. Instead of rotating
+    boards and coordinates on every turn, both directions of the mapping are stored as index tables,
+    built once per board shape and orientation and shared through ``Orientation.get``.
+
+    Squares are numbered row by row (``y * width + x``) in their own frame.
+    """
+
+    CACHE: Dict[Tuple[Tuple[int, int], int], "Orientation"] = {}
+
+    #   Coordinates returned for points outside the board, which stay outside the board in every frame
+    OUTSIDE = (-1, -1)
+
+    def __init__(self, shape: Tuple[int, int], rot: int):
+        """
+        :param shape: The ``(height, width)`` of the reference board
+        :param rot: Number of 90° rotations from the reference board to the player's view
+        """
+        self.shape: Tuple[int, int] = shape
+        self.rot: int = rot % 4
+        self.oriented_shape: Tuple[int, int] = shape if self.rot % 2 == 0 else (shape[1], shape[0])
+
+        size = shape[0] * shape[1]
+        width = shape[1]
+        oriented_width = self.oriented_shape[1]
+
+        #   Forward table: reference square seen on each square of the oriented board
+        self.reference_squares: np.ndarray = np.rot90(np.arange(size).reshape(shape), self.rot).reshape(-1).copy()
+
+        #   Inverse table: oriented square of each square of the reference board
+        self.oriented_squares: np.ndarray = np.empty(size, dtype=self.reference_squares.dtype)
+        self.oriented_squares[self.reference_squares] = np.arange(size)
+
+        #   Same tables as coordinates, for scalar lookups
+        self._to_reference: list[Tuple[int, int]] = [divmod(sq, width) for sq in self.reference_squares.tolist()]
+        self._to_oriented: list[Tuple[int, int]] = [
+            divmod(sq, oriented_width) for sq in self.oriented_squares.tolist()
+        ]
+
+    @staticmethod
+    def get(shape: Tuple[int, int], rot: int) -> "Orientation":
+        """
+        Get the tables of a board shape and orientation, building them on first use
+
+        :param shape: The ``(height, width)`` of the reference board
+        :param rot: Number of 90° rotations from the reference board to the player's view
+        :return: The shared tables
+        """
+        key = (tuple(shape), rot % 4)
+        orientation = Orientation.CACHE.get(key)
+        if orientation is None:
+            orientation = Orientation(*key)
+            Orientation.CACHE[key] = orientation
+        return orientation
+
+    def to_reference(self, pt: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Map coordinates from the player's view to the reference board
+        :param pt: Coordinates on the oriented board
+        :return: Coordinates on the reference board, ``OUTSIDE`` if ``pt`` is outside the board
+        """
+        y, x = pt
+        height, width = self.oriented_shape
+        if not (0 <= y < height and 0 <= x < width):
+            return self.OUTSIDE
+        return self._to_reference[y * width + x]
+
+    def to_oriented(self, pt: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Map coordinates from the reference board to the player's view
+        :param pt: Coordinates on the reference board
+        :return: Coordinates on the oriented board, ``OUTSIDE`` if ``pt`` is outside the board
+        """
+        y, x = pt
+        height, width = self.shape
+        if not (0 <= y < height and 0 <= x < width):
+            return self.OUTSIDE
+        return self._to_oriented[y * width + x]
+
+    def view(self, board: np.ndarray) -> np.ndarray:
+        """
+        Build the board as seen by the player, without changing the reference board
+
+        :param board: The reference board (encoded or not)
+        :return: A new array holding the oriented board, equal to ``np.rot90(board, rot)``
+        """
+        return board.reshape(-1).take(self.reference_squares).reshape(self.oriented_shape)
+
+
+if __name__ == "__main__":
+    #   Round-trip check of every orientation on a range of board shapes
+    for height in range(1, 11):
+        for width in range(1, 11):
+            board = np.arange(height * width).reshape(height, width)
+            for rot in range(4):
+                orientation = Orientation.get((height, width), rot)
+                assert np.array_equal(orientation.view(board), np.rot90(board, rot))
+
+                oriented = orientation.view(board)
+                for y in range(height):
+                    for x in range(width):
+                        oy, ox = orientation.to_oriented((y, x))
+                        assert oriented[oy, ox] == board[y, x]
+                        assert orientation.to_reference((oy, ox)) == (y, x)
+
+                for pt in ((-1, 0), (0, -1), orientation.oriented_shape, (0, orientation.oriented_shape[1])):
+                    assert orientation.to_reference(pt) == Orientation.OUTSIDE
+                    assert orientation.to_oriented(pt if rot % 2 == 0 else pt[::-1]) == Orientation.OUTSIDE
+
+    print("Orientation tables ok")
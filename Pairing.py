@@ -0,0 +1,156 @@
+#
+#   Pairings of round-robin and Swiss tournaments
+#
+#   Round-robin: every player meets every other player once, following Berger tables: the last player
+#   stays on the first board and the others move by n/2 - 1 seats each round. Colors alternate, with
+#   at most one color played twice in a row, and a player ends with at most one white game more than
+#   black, or the other way around (``python Pairing.py`` checks it).
+#
+#   Swiss: a fixed number of rounds, each player meeting players with the same score. Each round is
+#   paired from the standings, score group by score group: the top half of the group meets the bottom
+#   half, a player being moved down to the next group if no opponent is left it has not met yet. Players
+#   left at the bottom take the players of a pair already made if they met each other. The player with
+#   the most black games gets white. With the opponents of each player kept in sets, a round
+#   is paired in close to linear time, for thousands of players.
+#
+#   Both only deal with player ids, the matches themselves are built by TournamentManager.
+#
+
+from itertools import groupby
+from typing import Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+Pair = Tuple[Hashable, Optional[Hashable]]
+
+
+def round_robin_rounds(players: Sequence[Hashable]) -> List[List[Pair]]:
+    """
+    Pair every player with every other, once
+    :param players: The player ids, in seeding order
+    :return: The pairs of each round, as ``(white, black)``, ``(player, None)`` for a bye
+    """
+    seats: List[Optional[Hashable]] = list(players)
+    if len(seats) % 2 == 1:
+        seats.append(None)
+    count = len(seats)
+    #   The last seat is fixed, a bye if the number of players is odd
+    fixed, seats = seats[-1], seats[:-1]
+    shift = count // 2 - 1
+
+    rounds = []
+    for r in range(count - 1):
+        #   First board: the fixed seat against the first seat, the fixed seat white every other round
+        white, black = (seats[0], fixed) if r % 2 == 0 else (fixed, seats[0])
+        pairs = [(white, black)]
+        for i in range(1, count // 2):
+            pairs.append((seats[i], seats[count - 1 - i]))
+
+        rounds.append([(black, None) if white is None else (white, black) for white, black in pairs])
+
+        if shift > 0:
+            seats = seats[-shift:] + seats[:-shift]
+
+    return rounds
+
+
+def swiss_pairings(ranked: Sequence[Hashable], scores: Dict[Hashable, float], opponents: Dict[Hashable, Set[Hashable]],
+                   colors: Dict[Hashable, int], byes: Set[Hashable]) -> Tuple[List[Pair], Optional[Hashable]]:
+    """
+    Pair the next round of a Swiss tournament
+    :param ranked: The player ids, from first to last in the standings
+    :param scores: Score of each player
+    :param opponents: Players each player has already met
+    :param colors: White games minus black games of each player
+    :param byes: Players who already had a bye
+    :return: The pairs, as ``(white, black)``, and the player getting a bye if the number of players is odd
+    """
+    ranked = list(ranked)
+
+    #   The bye goes to the lowest ranked player who has not had one yet
+    bye = None
+    if len(ranked) % 2 == 1:
+        index = next((i for i in range(len(ranked) - 1, -1, -1) if ranked[i] not in byes), len(ranked) - 1)
+        bye = ranked.pop(index)
+
+    pairs: List[Pair] = []
+    floaters: List[Hashable] = []
+    for _, group in groupby(ranked, key=lambda player: scores[player]):
+        group = floaters + list(group)
+        half = len(group) // 2
+        top, bottom = group[:half], group[half:]
+
+        floaters = []
+        taken = [False] * len(bottom)
+        first_free = 0
+        for player in top:
+            while first_free < len(bottom) and taken[first_free]:
+                first_free += 1
+            partner = next(
+                (j for j in range(first_free, len(bottom)) if not taken[j] and bottom[j] not in opponents[player]), None
+            )
+            if partner is None:
+                floaters.append(player)
+                continue
+            taken[partner] = True
+            pairs.append(_with_colors(player, bottom[partner], colors))
+        floaters += [player for j, player in enumerate(bottom) if not taken[j]]
+
+    #   Players left at the bottom meet each other, or exchange opponents with a pair already made
+    while len(floaters) > 1:
+        player = floaters.pop(0)
+        partner = next((j for j, other in enumerate(floaters) if other not in opponents[player]), None)
+        if partner is not None:
+            pairs.append(_with_colors(player, floaters.pop(partner), colors))
+            continue
+        pairs += _exchange(player, floaters.pop(0), pairs, opponents, colors)
+
+    return pairs, bye
+
+
+def _exchange(player: Hashable, other: Hashable, pairs: List[Pair], opponents: Dict[Hashable, Set[Hashable]],
+              colors: Dict[Hashable, int]) -> List[Pair]:
+    """
+    Pair two players who already met by breaking up the lowest pair they can both take a player from
+    :return: The new pairs, the pair broken up is removed from ``pairs``
+    """
+    for i in range(len(pairs) - 1, -1, -1):
+        first, second = pairs[i]
+        for a, b in ((first, second), (second, first)):
+            if a not in opponents[player] and b not in opponents[other]:
+                del pairs[i]
+                return [_with_colors(a, player, colors), _with_colors(b, other, colors)]
+
+    #   Every player met them both, they meet again
+    return [_with_colors(player, other, colors)]
+
+
+def _with_colors(player: Hashable, other: Hashable, colors: Dict[Hashable, int]) -> Pair:
+    """Give white to the player with the most black games, to the higher ranked one if even"""
+    if colors.get(other, 0) < colors.get(player, 0):
+        return other, player
+    return player, other
+
+
+if __name__ == "__main__":
+    #   Every player meets every other once, one game per round, and colors stay balanced
+    #   (the second game of a color played twice in a row makes the balance reach 2 for a round)
+    for count in range(1, 41):
+        players = list(range(count))
+        rounds = round_robin_rounds(players)
+        balance = dict.fromkeys(players, 0)
+        met = set()
+
+        for pairs in rounds:
+            assert sorted(p for pair in pairs for p in pair if p is not None) == players
+            for white, black in pairs:
+                if black is None:
+                    continue
+                assert frozenset((white, black)) not in met
+                met.add(frozenset((white, black)))
+                balance[white] += 1
+                balance[black] -= 1
+                assert abs(balance[white]) <= 2 and abs(balance[black]) <= 2, (count, white, black)
+
+        assert len(met) == count * (count - 1) // 2
+        assert all(abs(value) <= 1 for value in balance.values()), count
+
+    print("Round-robin pairings ok")
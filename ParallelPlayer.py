@@ -1,17 +1,24 @@
+import sys
+import time
+
 import numpy as np
 from PyQt6 import QtCore
 
+from BotRunner import BoardChannel, BotWorker
+from Bots.ChessBotList import run_bot
+
 
 class ParallelTurn(QtCore.QThread):
     """ Thread wrapper """
 
-    def __init__(self, ai_func, player_sequence, board, time_budget, tile_width, tile_height):
+    def __init__(self, ai_func, player_sequence, board, time_budget, tile_width, tile_height, clock=None):
         super().__init__()
 
         self.ai_func = ai_func
         self.board = board
         self.player_sequence = player_sequence
         self.time_budget = time_budget
+        self.clock = clock
 
         self.team = int(player_sequence[0])
         self.color = player_sequence[1]
@@ -22,11 +29,192 @@ class ParallelTurn(QtCore.QThread):
 
         self.next_move = ((0,0), (0,0))
 
+        #   Wall-clock and CPU time taken by the bot, once it has returned
+        self.elapsed = None
+        self.cpu_time = None
+
+        #   Resource limits only apply to worker processes (see ProcessTurn)
+        self.peak_rss = None
+        self.breach = None
+
+    def report_best(self, move):
+        """Keep the best move found so far by the bot, played if the thread is terminated"""
+        self.next_move = move
+
     def run(self):
-        self.next_move = self.ai_func(self.player_sequence,
-                            np.copy(self.board),
-                            self.time_budget,
-                            tile_width=self.tile_width,
-                            tile_height=self.tile_height)
-        
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        self.next_move = run_bot(self.ai_func,
+                                 self.report_best,
+                                 self.player_sequence,
+                                 np.copy(self.board),
+                                 self.time_budget,
+                                 tile_width=self.tile_width,
+                                 tile_height=self.tile_height,
+                                 clock=self.clock)
+        self.cpu_time = time.thread_time() - cpu_start
+        self.elapsed = time.perf_counter() - start
+
+
+class ProcessTurn(QtCore.QObject):
+    """ Worker process wrapper, with the same interface as ParallelTurn
+
+    The board is handed to the worker through a shared memory channel: it has to be encoded
+    (see BoardEncoding), string boards are decoded by the worker for the bots expecting them.
+    """
+
+    finished = QtCore.pyqtSignal()
+    #   Emitted once the turn is handed over to the worker, from which the bot's time runs
+    handed_off = QtCore.pyqtSignal()
+
+    #   Interval at which the pipe is polled where it cannot be watched (Windows pipes are not sockets)
+    POLL_INTERVAL_MS = 5
+
+    def __init__(self, worker: BotWorker, channel: BoardChannel, ai_func, player_sequence, board, time_budget,
+                 tile_width, tile_height, encoded_board=False, game=0, clock=None):
+        super().__init__()
+
+        self.worker = worker
+        self.game = game
+        self.channel = channel
+        self.encoded_board = encoded_board
+        self.ai_func = ai_func
+        self.board = board
+        self.player_sequence = player_sequence
+        self.time_budget = time_budget
+        self.clock = clock
+
+        self.team = int(player_sequence[0])
+        self.color = player_sequence[1]
+        self.board_orientation = int(player_sequence[2])
+
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+
+        self._next_move = ((0,0), (0,0))
+        self.done = False
+        self.watcher = None
+
+        #   Wall-clock time taken by the bot, from the hand-off to the reception of its move
+        self.start_time = 0.0
+        self.elapsed = None
+
+        #   Time taken to hand the turn over to the worker (writing the board and sending the request), in seconds
+        self.handoff_time = 0.0
+
+        #   Why the bot forfeits, if it went over the resource limits of its worker (see Sandbox.py)
+        self.breach = None
+
+    @property
+    def next_move(self):
+        """The move of the bot, or the last one it reported if it has not returned yet"""
+        self._collect()
+        if not self.done and self.worker.best_move is not None:
+            return self.worker.best_move
+        return self._next_move
+
+    @property
+    def cpu_time(self):
+        """CPU time used by the bot, once it has returned"""
+        return self.worker.cpu_time if self.done else None
+
+    @property
+    def peak_rss(self):
+        """Peak resident memory of the worker during the turn, in bytes, once the bot has returned"""
+        return self.worker.peak_rss if self.done else None
+
+    def start(self):
+        #   A worker still starting up (e.g. started again after being killed) is watched until it is ready,
+        #   rather than waited for, so that the event loop keeps running
+        if not self.worker.wait_ready(0):
+            self.watcher = self._watch(self._hand_off_when_ready)
+            return
+
+        self._hand_off()
+
+    def _hand_off_when_ready(self):
+        if self.done:
+            return
+
+        if not self.worker.wait_ready(0):
+            if not self.worker.is_alive():
+                #   Died while starting up: started again, on a new pipe
+                self._stop_watching()
+                self.worker.start()
+                self.watcher = self._watch(self._hand_off_when_ready)
+            return
+
+        self._stop_watching()
+        self._hand_off()
+
+    def _hand_off(self):
+        """Write the board in the channel and send the turn to the worker"""
+        start = self.start_time = time.perf_counter()
+        self.channel.write(self.board)
+        self.worker.submit_turn(self.channel,
+                                self.ai_func,
+                                self.player_sequence,
+                                self.time_budget,
+                                self.encoded_board,
+                                self.game,
+                                tile_width=self.tile_width,
+                                tile_height=self.tile_height,
+                                clock=self.clock)
+        self.handoff_time = time.perf_counter() - start
+
+        self.watcher = self._watch(self._collect)
+        self.handed_off.emit()
+
+    def _watch(self, slot):
+        """Call ``slot`` whenever the worker's pipe is readable"""
+        if sys.platform == "win32":
+            watcher = QtCore.QTimer()
+            watcher.timeout.connect(slot)
+            watcher.start(self.POLL_INTERVAL_MS)
+        else:
+            watcher = QtCore.QSocketNotifier(self.worker.fileno(), QtCore.QSocketNotifier.Type.Read)
+            watcher.activated.connect(slot)
+        return watcher
+
+    def _collect(self):
+        """Read the move once the worker has replied"""
+        if self.done or not self.worker.poll():
+            return
+
+        self._stop_watching()
+        self.elapsed = time.perf_counter() - self.start_time
+        best_move = self.worker.best_move
+        status, value = self.worker.result()
+        if status == "move":
+            self._next_move = value
+        elif status == "limit":
+            self.breach = value
+        else:
+            print(value)
+            if best_move is not None:
+                self._next_move = best_move
+
+        self.done = True
+        self.finished.emit()
+
+    def _stop_watching(self):
+        if self.watcher is not None:
+            if isinstance(self.watcher, QtCore.QTimer):
+                self.watcher.stop()
+            else:
+                self.watcher.setEnabled(False)
+            self.watcher.deleteLater()
+            self.watcher = None
+
+    def terminate(self):
+        """Kill the worker if the bot is still running (a fresh worker is started for the next turns)"""
+        if self.done:
+            return
+
+        self._stop_watching()
+        self.done = True
+        #   A worker still starting up has no turn to stop
+        if self.worker.busy:
+            self.worker.kill()
 
+    def quit(self):
+        pass
@@ -0,0 +1,278 @@
+#
+#   Perft: move generation counts and speed of the rules
+#
+#   Counts the leaf nodes of the game tree up to a given depth on the boards of Data/maps,
+#   with every available implementation of the rules, and compares them to the stored
+#   reference counts. Run it after changing ChessRules to catch both rule regressions
+#   (wrong counts) and speed regressions (nodes per second):
+#
+#       python Perft.py                         # every map, up to its default depth
+#       python Perft.py -d 3 cross.brd          # a single map, up to depth 3
+#       python Perft.py -r generate_legal_moves # a single implementation
+#
+#   Moves follow the arena: a pawn reaching the last row is promoted to a queen, the game ends
+#   when the player to move has captured the last king of its opponents, and a player without
+#   any valid move passes its turn.
+#
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from BoardEncoding import EMPTY, decode_board, encode_board
+from BoardFile import find_board_file, read_board_file
+from ChessRules import PIECE_CODES, RuleContext, generate_legal_moves, move_is_valid, move_is_valid_batch
+from Orientation import Orientation
+
+#   Leaf counts for depths 1, 2, ... of the maps in Data/maps
+REFERENCE_COUNTS: Dict[str, tuple[int, ...]] = {
+    "default.brd": (12, 144, 2124, 31329, 560756),
+    "default.fen": (12, 144, 2124, 31329, 560756),
+    "pawn_race.brd": (6, 35, 225, 1466, 9623, 62206, 405963, 2630676),
+    "cross.brd": (5, 25, 135, 675, 5058, 31282, 222113),
+}
+
+#   Depth run by default for each map
+DEFAULT_DEPTHS: Dict[str, int] = {
+    "default.brd": 4,
+    "default.fen": 4,
+    "pawn_race.brd": 6,
+    "cross.brd": 5,
+}
+
+
+class PerftPosition:
+    """
+    Game position explored by perft
+
+    The encoded reference board is updated in place when making and unmaking moves, and moves are
+    given as pairs of reference square indices (``y * width + x``), whatever the implementation used
+    to find them.
+    """
+
+    def __init__(self, player_order: str, board):
+        """
+        :param player_order: The full player sequence
+        :param board: The board, either encoded or as an array of ``Piece`` objects or piece strings
+        """
+        self.player_order: str = player_order.strip()
+        self.rules: RuleContext = RuleContext(self.player_order)
+        self.cells: np.ndarray = encode_board(board).copy()
+        self.flat: np.ndarray = self.cells.reshape(-1)
+
+        height, width = self.cells.shape
+        squares = np.arange(height * width).reshape(self.cells.shape)
+
+        self.colors: list[str] = self.rules.colors
+        self.sequences: list[str] = [self.rules.sequence(color) for color in self.colors]
+        self.orientations: list[Orientation] = [
+            Orientation.get(self.cells.shape, self.rules.orientations[color]) for color in self.colors
+        ]
+
+        #   Squares where the pawns of each player are promoted
+        self.last_rows: list[np.ndarray] = []
+        for color in self.colors:
+            fy, fx = self.rules.pawn_directions[color]
+            ys, xs = np.divmod(squares.reshape(-1), width)
+            self.last_rows.append(~((0 <= ys + fy) & (ys + fy < height) & (0 <= xs + fx) & (xs + fx < width)))
+
+    def own_squares(self, turn: int) -> np.ndarray:
+        """Reference squares of the pieces of the player of the given turn"""
+        return np.flatnonzero((self.flat > 0) & (self.flat >> 3 == self.rules.color_indices[self.colors[turn]]))
+
+    def make(self, turn: int, start: int, end: int) -> tuple[int, int]:
+        """
+        Play a move
+
+        :return: The moved and captured codes, to give back to ``unmake``
+        """
+        code = int(self.flat[start])
+        captured = int(self.flat[end])
+        if code & 7 == PIECE_CODES["p"] and self.last_rows[turn][end]:
+            self.flat[end] = code & ~7 | PIECE_CODES["q"]
+        else:
+            self.flat[end] = code
+        self.flat[start] = EMPTY
+        return code, captured
+
+    def unmake(self, start: int, end: int, undo: tuple[int, int]):
+        """Take back a move played with ``make``"""
+        self.flat[start], self.flat[end] = undo
+
+    def game_over(self, turn: int, captured: int) -> bool:
+        """Check whether a move capturing the given code has ended the game"""
+        if captured <= 0 or captured & 7 != PIECE_CODES["k"]:
+            return False
+
+        kings = self.flat[(self.flat > 0) & (self.flat & 7 == PIECE_CODES["k"])]
+        return bool(np.all(kings >> 3 == self.rules.color_indices[self.colors[turn]]))
+
+
+#   Implementations of the rules
+#
+#   Each one lists the valid moves of the player of the given turn,
+#   as ``(start, end)`` pairs of reference squares.
+
+def generated_moves(position: PerftPosition, turn: int) -> list[tuple[int, int]]:
+    """``generate_legal_moves`` on the oriented board"""
+    orientation = position.orientations[turn]
+    board = orientation.view(position.cells)
+    squares = orientation.reference_squares
+    width = board.shape[1]
+    return [
+        (int(squares[sy * width + sx]), int(squares[ey * width + ex]))
+        for (sy, sx), (ey, ex) in generate_legal_moves(position.sequences[turn], board)
+    ]
+
+
+def batch_moves(position: PerftPosition, turn: int) -> list[tuple[int, int]]:
+    """``move_is_valid_batch`` on every move of the player's pieces, on the oriented board"""
+    orientation = position.orientations[turn]
+    board = orientation.view(position.cells)
+    squares = orientation.reference_squares
+    height, width = board.shape
+
+    starts = orientation.oriented_squares[position.own_squares(turn)]
+    ends = np.arange(height * width)
+    starts, ends = np.repeat(starts, len(ends)), np.tile(ends, len(starts))
+    moves = np.stack([starts // width, starts % width, ends // width, ends % width], axis=1).reshape(-1, 2, 2)
+
+    valid = move_is_valid_batch(position.sequences[turn], moves, board)
+    return list(zip(squares[starts[valid]].tolist(), squares[ends[valid]].tolist()))
+
+
+def context_moves(position: PerftPosition, turn: int) -> list[tuple[int, int]]:
+    """``RuleContext.is_valid`` on every move of the player's pieces, on the reference board"""
+    color = position.colors[turn]
+    width = position.cells.shape[1]
+    is_valid = position.rules.is_valid
+    moves = []
+    for start in position.own_squares(turn).tolist():
+        start_pos = divmod(start, width)
+        for end in range(len(position.flat)):
+            if is_valid(color, (start_pos, divmod(end, width)), position.cells):
+                moves.append((start, end))
+    return moves
+
+
+def scalar_moves(position: PerftPosition, turn: int) -> list[tuple[int, int]]:
+    """``move_is_valid`` on every move of the player's pieces, on the oriented string board"""
+    orientation = position.orientations[turn]
+    board = decode_board(orientation.view(position.cells))
+    starts = [orientation.to_oriented(divmod(sq, position.cells.shape[1])) for sq in position.own_squares(turn).tolist()]
+    height, width = board.shape
+    targets = [(y, x) for y in range(height) for x in range(width) if board[y, x] != "XX"]
+
+    moves = []
+    for start in starts:
+        for end in targets:
+            if move_is_valid(position.sequences[turn], (start, end), board):
+                moves.append((int(orientation.reference_squares[start[0] * width + start[1]]),
+                              int(orientation.reference_squares[end[0] * width + end[1]])))
+    return moves
+
+
+IMPLEMENTATIONS: Dict[str, Callable[[PerftPosition, int], list[tuple[int, int]]]] = {
+    "generate_legal_moves": generated_moves,
+    "move_is_valid_batch": batch_moves,
+    "RuleContext": context_moves,
+    "move_is_valid": scalar_moves,
+}
+
+
+def perft(position: PerftPosition, depth: int, turn: int = 0, moves_of=generated_moves) -> int:
+    """
+    Count the leaf nodes of the game tree
+
+    :param position: The position to explore, left unchanged
+    :param depth: Number of plies to play
+    :param turn: Index of the player to move in the player sequence
+    :param moves_of: Implementation of the rules listing the valid moves
+    :return: The number of positions reached after ``depth`` plies (or earlier, if the game ended)
+    """
+    if depth == 0:
+        return 1
+
+    next_turn = (turn + 1) % len(position.colors)
+    moves = moves_of(position, turn)
+    if not moves:
+        return perft(position, depth - 1, next_turn, moves_of)
+
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for start, end in moves:
+        undo = position.make(turn, start, end)
+        if position.game_over(turn, undo[1]):
+            nodes += 1
+        else:
+            nodes += perft(position, depth - 1, next_turn, moves_of)
+        position.unmake(start, end, undo)
+
+    return nodes
+
+
+def load_position(name: str) -> Optional[PerftPosition]:
+    """Load a board of Data/maps (or any board file) as a perft position"""
+    loaded = read_board_file(find_board_file(name))
+    if loaded is None:
+        return None
+    return PerftPosition(*loaded)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Count moves and measure the speed of the rules on board files")
+    parser.add_argument("maps", nargs="*", default=list(REFERENCE_COUNTS), help="Board files or names in Data/maps")
+    parser.add_argument("-d", "--depth", type=int, help="Maximum depth (default: depends on the map)")
+    parser.add_argument(
+        "-r", "--rules", action="append", choices=list(IMPLEMENTATIONS),
+        help="Implementation to run, can be repeated (default: all)",
+    )
+    parser.add_argument(
+        "-t", "--time-limit", type=float, default=10.0,
+        help="Skip deeper depths for an implementation once a depth took longer than this (seconds)",
+    )
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for name in args.maps:
+        position = load_position(name)
+        if position is None:
+            failures += 1
+            continue
+
+        key = os.path.basename(name)
+        reference = REFERENCE_COUNTS.get(key, ())
+        max_depth = args.depth or DEFAULT_DEPTHS.get(key, 3)
+        print(f"{key} ({position.player_order})")
+
+        for rules in args.rules or list(IMPLEMENTATIONS):
+            moves_of = IMPLEMENTATIONS[rules]
+            for depth in range(1, max_depth + 1):
+                t0 = time.perf_counter()
+                nodes = perft(position, depth, 0, moves_of)
+                elapsed = time.perf_counter() - t0
+
+                if depth <= len(reference):
+                    status = "ok" if nodes == reference[depth - 1] else f"MISMATCH (expected {reference[depth - 1]})"
+                    failures += nodes != reference[depth - 1]
+                else:
+                    status = "no reference"
+
+                print(
+                    f"  {rules:<22} depth {depth}: {nodes:>10} nodes  "
+                    f"{elapsed:8.3f}s  {nodes / max(elapsed, 1e-9):>12.0f} nodes/s  {status}"
+                )
+                if elapsed > args.time_limit:
+                    break
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
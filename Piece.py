@@ -14,6 +14,7 @@ class Piece(QGraphicsPixmapItem):
 
         self.type = piece_type
         self.color = color
+        self._string = f"{piece_type}{color}"
 
         self.target = QPointF()
         self.move_timer = QTimer()
@@ -132,11 +133,12 @@ class Piece(QGraphicsPixmapItem):
             self.setPos(pos.x() + dx / dist * step, pos.y() + dy / dist * step)
 
     def string(self):
-        return f"{self.type}{self.color}"
+        return self._string
 
     def upgrade(self, piece_type, new_pixmap):
         self.setPixmap(new_pixmap)
         self.type = piece_type
+        self._string = f"{piece_type}{self.color}"
 
         self._fragment()
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from BotWidget import BotWidget
+from Bots.ChessBotList import get_chess_bot
 
 
 class Player:
@@ -15,4 +16,6 @@ class Player:
         return self.widget.budgetValue.value()
 
     def get_func(self):
-        return self.widget.playerBot.currentText(), self.widget.playerBot.currentData()
+        """Get the name and function of the selected bot, importing its module on first use"""
+        name = self.widget.playerBot.currentText()
+        return name, get_chess_bot(name)
@@ -0,0 +1,361 @@
+#
+#   Ratings of the bots
+#
+#   Every rated game (a two-player game of a tournament, play.py or MatchFarm.py) updates the Elo and
+#   Glicko-2 ratings of its two bots right away, so that their strength can be followed across
+#   tournaments and bulk games without going through the games again:
+#
+#       python Ratings.py                           # leaderboard
+#       python Ratings.py --recompute --period 1000 # ratings computed again from every game
+#
+#   The ratings are kept in Data/ratings:
+#       - players.txt: the rated bots, one name per line, in the order they were first rated
+#       - games.bin: every game, 12 bytes each (white and black player index, score of white)
+#       - ratings.npz: the ratings after the first ``games_recorded`` games of games.bin, saved every SNAPSHOT_EVERY
+#         games and when the store is closed. Games recorded after it are rated again when the store is
+#         opened, so that an interrupted run loses nothing.
+#
+#   Games are rated in rating periods, every game of a period being rated against the ratings from
+#   before the period, for all players at once with numpy. A game rated as it is played is a period of
+#   its own. Going through the whole history again (``recompute``) with longer periods is much faster
+#   and is the usual way of rating with Glicko-2, though the ratings differ a little from the ones
+#   updated game by game. The rating deviation of the players without games in a period is left as is:
+#   periods are games rather than time.
+#
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+DEFAULT_DIRECTORY = os.path.join(os.path.abspath(os.path.dirname(__file__)), "Data", "ratings")
+PLAYERS_FILE = "players.txt"
+GAMES_FILE = "games.bin"
+SNAPSHOT_FILE = "ratings.npz"
+
+GAME_DTYPE = np.dtype([("white", "<i4"), ("black", "<i4"), ("score", "<f4")])
+
+#   Games rated between two snapshots of the ratings
+SNAPSHOT_EVERY = 100
+#   Games per rating period when recomputing the ratings
+DEFAULT_PERIOD = 1000
+
+INITIAL_ELO = 1500.0
+ELO_K_FACTOR = 32.0
+
+INITIAL_RATING = 1500.0
+INITIAL_RD = 350.0
+INITIAL_VOLATILITY = 0.06
+#   Constraint on the change of volatility, between 0.3 and 1.2 (see Glickman's paper)
+TAU = 0.5
+#   Conversion between the Glicko and Glicko-2 scales
+GLICKO2_SCALE = 173.7178
+VOLATILITY_EPSILON = 1e-6
+
+
+@dataclass
+class Rating:
+    name: str
+    elo: float = INITIAL_ELO
+    #   Glicko-2 rating, deviation and volatility, the rating and deviation on the Glicko scale
+    rating: float = INITIAL_RATING
+    rd: float = INITIAL_RD
+    volatility: float = INITIAL_VOLATILITY
+    games: int = 0
+
+    def export(self):
+        raw: dict = {}
+        raw["name"] = self.name
+        raw["elo"] = round(self.elo, 1)
+        raw["rating"] = round(self.rating, 1)
+        raw["rd"] = round(self.rd, 1)
+        raw["volatility"] = round(self.volatility, 6)
+        raw["games"] = self.games
+
+        return raw
+
+
+class RatingStore:
+    """
+    Elo and Glicko-2 ratings of the bots, updated as games are recorded
+
+        ratings = RatingStore()
+        ratings.record("MyBot", "PawnMover", 1.0)
+        print(ratings.get("MyBot").rating)
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY):
+        """
+        :param directory: Directory of the store, created on the first game recorded
+        """
+        self.directory: str = directory
+        self.names: List[str] = []
+        self.index: dict[str, int] = {}
+
+        self.elo = np.empty(0)
+        self.rating = np.empty(0)
+        self.rd = np.empty(0)
+        self.volatility = np.empty(0)
+        self.games = np.empty(0, dtype=np.int64)
+
+        #   Games in games.bin, and games included in the last snapshot
+        self.recorded: int = 0
+        self.saved: int = 0
+
+        self._load()
+
+    #   Storage
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.directory, file_name)
+
+    def _load(self):
+        if os.path.exists(self._path(PLAYERS_FILE)):
+            with open(self._path(PLAYERS_FILE), "r", encoding="utf-8") as file:
+                for line in file:
+                    self._add_player(line.rstrip("\n"))
+
+        if os.path.exists(self._path(GAMES_FILE)):
+            self.recorded = os.path.getsize(self._path(GAMES_FILE)) // GAME_DTYPE.itemsize
+
+        if os.path.exists(self._path(SNAPSHOT_FILE)):
+            try:
+                with np.load(self._path(SNAPSHOT_FILE)) as snapshot:
+                    saved = int(snapshot["games_recorded"])
+                    count = len(snapshot["elo"])
+                    if saved <= self.recorded and count <= len(self.names):
+                        self.elo[:count] = snapshot["elo"]
+                        self.rating[:count] = snapshot["rating"]
+                        self.rd[:count] = snapshot["rd"]
+                        self.volatility[:count] = snapshot["volatility"]
+                        self.games[:count] = snapshot["games"]
+                        self.saved = saved
+            except (OSError, KeyError, ValueError) as e:
+                print(f"Cannot read the ratings snapshot, the ratings are computed again: {e}")
+
+        #   Games recorded after the snapshot, a long history without snapshot being rated by periods
+        if self.recorded - self.saved > DEFAULT_PERIOD:
+            print(f"Rating {self.recorded - self.saved} games without snapshot, by periods of {DEFAULT_PERIOD} games")
+            self.recompute()
+        elif self.saved < self.recorded:
+            games = self._read_games(self.saved)
+            for k in range(len(games)):
+                self._rate_period(games["white"][k:k + 1], games["black"][k:k + 1], games["score"][k:k + 1].astype(float))
+            self.save()
+
+    def _read_games(self, start: int = 0) -> np.ndarray:
+        """Read the games recorded, from the ``start``-th one"""
+        if not os.path.exists(self._path(GAMES_FILE)):
+            return np.empty(0, dtype=GAME_DTYPE)
+        return np.fromfile(self._path(GAMES_FILE), dtype=GAME_DTYPE, count=self.recorded - start,
+                           offset=start * GAME_DTYPE.itemsize)
+
+    def save(self):
+        """Save a snapshot of the ratings, the games being saved as they are recorded"""
+        if self.recorded == 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = self._path(SNAPSHOT_FILE + ".tmp")
+        with open(temporary, "wb") as file:
+            np.savez(file, elo=self.elo, rating=self.rating, rd=self.rd, volatility=self.volatility,
+                     games=self.games, games_recorded=self.recorded)
+        os.replace(temporary, self._path(SNAPSHOT_FILE))
+        self.saved = self.recorded
+
+    def close(self):
+        if self.saved != self.recorded:
+            self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _add_player(self, name: str) -> int:
+        self.index[name] = len(self.names)
+        self.names.append(name)
+        self.elo = np.append(self.elo, INITIAL_ELO)
+        self.rating = np.append(self.rating, INITIAL_RATING)
+        self.rd = np.append(self.rd, INITIAL_RD)
+        self.volatility = np.append(self.volatility, INITIAL_VOLATILITY)
+        self.games = np.append(self.games, 0)
+        return self.index[name]
+
+    def _player(self, name: str) -> int:
+        """Get the index of a bot, rating it for the first time if new"""
+        index = self.index.get(name)
+        if index is not None:
+            return index
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(PLAYERS_FILE), "a", encoding="utf-8") as file:
+            file.write(name + "\n")
+        return self._add_player(name)
+
+    #   Rating
+
+    def record(self, white: str, black: str, score: float):
+        """
+        Record a game and update the ratings of its bots
+        :param white: Bot of the first player
+        :param black: Bot of the second player
+        :param score: Score of the first player: 1 for a win, 0.5 for a draw, 0 for a loss
+        """
+        game = np.array([(self._player(white), self._player(black), score)], dtype=GAME_DTYPE)
+        with open(self._path(GAMES_FILE), "ab") as file:
+            file.write(game.tobytes())
+        self.recorded += 1
+
+        self._rate_period(game["white"], game["black"], game["score"].astype(float))
+
+        if self.recorded - self.saved >= SNAPSHOT_EVERY:
+            self.save()
+
+    def record_game(self, bots: Sequence[str], winners: Sequence[int]):
+        """
+        Record a game from its result, games with more than two players are not rated
+        :param bots: Bots of the players, in the order of the player sequence
+        :param winners: Seats of the winners, none for a draw
+        """
+        if len(bots) != 2:
+            return
+        score = 0.5 if len(winners) != 1 else 1.0 if winners[0] == 0 else 0.0
+        self.record(bots[0], bots[1], score)
+
+    def recompute(self, period: int = DEFAULT_PERIOD):
+        """
+        Compute the ratings again from every game recorded
+        :param period: Games per rating period, 1 giving back the ratings updated game by game
+        """
+        count = len(self.names)
+        self.elo = np.full(count, INITIAL_ELO)
+        self.rating = np.full(count, INITIAL_RATING)
+        self.rd = np.full(count, INITIAL_RD)
+        self.volatility = np.full(count, INITIAL_VOLATILITY)
+        self.games = np.zeros(count, dtype=np.int64)
+
+        history = self._read_games()
+        white = history["white"].astype(np.intp)
+        black = history["black"].astype(np.intp)
+        score = history["score"].astype(float)
+        for start in range(0, len(history), period):
+            end = start + period
+            self._rate_period(white[start:end], black[start:end], score[start:end])
+
+        self.save()
+
+    def _rate_period(self, white: np.ndarray, black: np.ndarray, score: np.ndarray):
+        """Rate games played in the same rating period, against the ratings from before the period"""
+        count = len(self.names)
+
+        #   Elo: the changes of every game add up
+        expected = 1 / (1 + 10 ** ((self.elo[black] - self.elo[white]) / 400))
+        change = ELO_K_FACTOR * (score - expected)
+        self.elo += np.bincount(white, change, count) - np.bincount(black, change, count)
+
+        #   Glicko-2, each game being seen by both players
+        players = np.concatenate((white, black))
+        opponents = np.concatenate((black, white))
+        scores = np.concatenate((score, 1 - score))
+
+        mu = (self.rating - INITIAL_RATING) / GLICKO2_SCALE
+        phi = self.rd / GLICKO2_SCALE
+
+        g = 1 / np.sqrt(1 + 3 * phi[opponents] ** 2 / np.pi ** 2)
+        expected = 1 / (1 + np.exp(-g * (mu[players] - mu[opponents])))
+
+        games = np.bincount(players, minlength=count)
+        rated = np.flatnonzero(games)
+        #   Results far from the expected ones can leave no information at all in floating point
+        information = np.bincount(players, g * g * expected * (1 - expected), count)[rated]
+        variance = 1 / np.maximum(information, 1e-12)
+        improvement = np.bincount(players, g * (scores - expected), count)[rated]
+        delta = variance * improvement
+
+        volatility = _new_volatility(phi[rated], self.volatility[rated], variance, delta)
+        phi_star = np.sqrt(phi[rated] ** 2 + volatility ** 2)
+        new_phi = 1 / np.sqrt(1 / phi_star ** 2 + 1 / variance)
+
+        self.rating[rated] = INITIAL_RATING + GLICKO2_SCALE * (mu[rated] + new_phi ** 2 * improvement)
+        self.rd[rated] = np.minimum(GLICKO2_SCALE * new_phi, INITIAL_RD)
+        self.volatility[rated] = volatility
+        self.games += games
+
+    #   Queries
+
+    def get(self, name: str) -> Rating:
+        """Get the ratings of a bot, the initial ones if it has not been rated yet"""
+        index = self.index.get(name)
+        if index is None:
+            return Rating(name)
+        return Rating(name, float(self.elo[index]), float(self.rating[index]), float(self.rd[index]),
+                      float(self.volatility[index]), int(self.games[index]))
+
+    def leaderboard(self) -> List[Rating]:
+        """Get the ratings of every bot, from the highest Glicko-2 rating"""
+        return sorted((self.get(name) for name in self.names), key=lambda rating: -rating.rating)
+
+    def seed(self, names: Sequence[str]) -> List[str]:
+        """
+        Order bots from the highest Glicko-2 rating, e.g. to seed a tournament
+        :param names: The bots, bots with the same rating keeping their order
+        """
+        return sorted(names, key=lambda name: -self.get(name).rating)
+
+
+def _new_volatility(phi: np.ndarray, sigma: np.ndarray, variance: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    """New volatility of each player (step 5 of Glickman's Glicko-2 example), by the Illinois algorithm"""
+    a = np.log(sigma ** 2)
+    phi2 = phi ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta ** 2 - phi2 - variance - ex) / (2 * (phi2 + variance + ex) ** 2) - (x - a) / TAU ** 2
+
+    A = a
+    large = delta ** 2 > phi2 + variance
+    B = np.where(large, np.log(np.maximum(delta ** 2 - phi2 - variance, np.finfo(float).tiny)), a - TAU)
+    f_B = f(B)
+    below = ~large & (f_B < 0)
+    while below.any():
+        B = np.where(below, B - TAU, B)
+        f_B = f(B)
+        below &= f_B < 0
+
+    f_A = f(A)
+    active = np.abs(B - A) > VOLATILITY_EPSILON
+    while active.any():
+        C = A + (A - B) * f_A / (f_B - f_A)
+        f_C = f(C)
+        swap = active & (f_C * f_B <= 0)
+        A, f_A = np.where(swap, B, A), np.where(swap, f_B, np.where(active, f_A / 2, f_A))
+        B, f_B = np.where(active, C, B), np.where(active, f_C, f_B)
+        active &= np.abs(B - A) > VOLATILITY_EPSILON
+
+    return np.exp(A / 2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Show the ratings of the bots")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY, help="Directory of the ratings")
+    parser.add_argument("--recompute", action="store_true", help="Compute the ratings again from every game")
+    parser.add_argument("--period", type=int, default=DEFAULT_PERIOD, help="Games per rating period with --recompute")
+    args = parser.parse_args(argv)
+
+    with RatingStore(args.directory) as ratings:
+        if args.recompute:
+            ratings.recompute(args.period)
+
+        print(f"{ratings.recorded} games rated")
+        for rank, rating in enumerate(ratings.leaderboard(), 1):
+            print(f"{rank:>4}. {rating.name:<24} {rating.rating:7.1f} ± {2 * rating.rd:5.1f}  "
+                  f"Elo {rating.elo:7.1f}  {rating.games} games")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
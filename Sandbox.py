@@ -0,0 +1,184 @@
+#
+#   Resource limits of the bot workers
+#
+#   A tournament can cap the memory and the CPU time of the bots, so that a bot allocating without
+#   bound or spinning several threads cannot take the machine from the other players:
+#
+#       tournament:
+#         resource_limits: { memory_mb: 2048, cpu_seconds: 10 }
+#
+#   ``memory_mb`` caps the address space of each worker process (``RLIMIT_AS``), interpreter and
+#   preloaded modules included, and cannot be below MIN_MEMORY_MB. ``cpu_seconds`` caps the CPU time of each turn (``RLIMIT_CPU``,
+#   raised again between turns), which matters for bots using several cores within their budget.
+#   A bot going over a limit forfeits the game.
+#
+#   Limits rely on the ``resource`` module and are ignored where it is not available (Windows).
+#   The peak memory of each turn is measured either way.
+#
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MEGABYTE = 1024 * 1024
+
+#   Lowest memory limit accepted: a worker maps about 105 MB on start-up (interpreter, NumPy, rules)
+MIN_MEMORY_MB = 128
+
+
+@dataclass
+class ResourceLimits:
+    #   Address space of a worker process, in megabytes
+    memory_mb: Optional[int] = None
+    #   CPU time of a turn, in seconds
+    cpu_seconds: Optional[float] = None
+
+    def __post_init__(self):
+        if self.memory_mb is not None and self.memory_mb < MIN_MEMORY_MB:
+            raise ValueError(
+                f"Memory limit of {self.memory_mb} MB too low: a bot worker needs about {MIN_MEMORY_MB} MB "
+                f"of address space to start, before its bot allocates anything"
+            )
+
+    def export(self):
+        raw: dict = {}
+        raw["memory_mb"] = self.memory_mb
+        raw["cpu_seconds"] = self.cpu_seconds
+
+        return raw
+
+    @staticmethod
+    def from_dict(raw: Optional[dict]) -> Optional["ResourceLimits"]:
+        """
+        Read resource limits from a tournament file
+        :param raw: The ``resource_limits`` entry, if any
+        :return: The limits, or ``None`` if ``raw`` is empty (no limits)
+        """
+        if not raw:
+            return None
+
+        memory_mb = raw.get("memory_mb")
+        cpu_seconds = raw.get("cpu_seconds")
+        return ResourceLimits(
+            None if memory_mb is None else int(memory_mb),
+            None if cpu_seconds is None else float(cpu_seconds),
+        )
+
+    def describe(self) -> str:
+        """Short description, e.g. ``"2048 MB, 10 s CPU per turn"``"""
+        parts = []
+        if self.memory_mb is not None:
+            parts.append(f"{self.memory_mb} MB")
+        if self.cpu_seconds is not None:
+            parts.append(f"{self.cpu_seconds:g} s CPU per turn")
+        return ", ".join(parts) or "no limits"
+
+    def memory_breach(self) -> str:
+        return f"went over its memory limit of {self.memory_mb} MB"
+
+    def start_breach(self) -> str:
+        return f"went over its memory limit of {self.memory_mb} MB while starting up"
+
+    def cpu_breach(self) -> str:
+        return f"went over its CPU limit of {self.cpu_seconds:g} s per turn"
+
+
+def supported() -> bool:
+    """Check whether limits can be enforced on this platform"""
+    return resource is not None
+
+
+def apply_memory_limit(limits: Optional[ResourceLimits]) -> bool:
+    """
+    Cap the address space of the current process, called by a worker once its modules are imported
+    :return: ``False`` if the process already uses more than the limit, which is then not applied
+    """
+    if limits is None or limits.memory_mb is None or resource is None:
+        return True
+    size = limits.memory_mb * MEGABYTE
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        size = min(size, hard)
+    if address_space() >= size:
+        return False
+    resource.setrlimit(resource.RLIMIT_AS, (size, hard))
+    return True
+
+
+def address_space() -> int:
+    """
+    Get the address space of the current process
+    :return: The size in bytes, 0 if it cannot be measured (Linux only)
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def start_cpu_limit(limits: Optional[ResourceLimits]):
+    """
+    Cap the CPU time of the turn starting in the current process
+
+    ``RLIMIT_CPU`` counts the CPU time of the whole process, so the cap is the time already used plus
+    the limit. Going over it sends ``SIGXCPU``, which ends the process.
+    """
+    if limits is None or limits.cpu_seconds is None or resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used + limits.cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def end_cpu_limit(limits: Optional[ResourceLimits]):
+    """Lift the cap set by ``start_cpu_limit``, so that a session bot can ponder between turns"""
+    if limits is None or limits.cpu_seconds is None or resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def reset_peak_rss():
+    """Start measuring the peak memory of a turn (Linux only, elsewhere the peak is that of the process)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss() -> int:
+    """
+    Get the peak resident memory of the current process since ``reset_peak_rss``
+    :return: The peak in bytes, 0 if it cannot be measured
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    #   Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def format_memory(size: int) -> str:
+    """Format a memory size in megabytes"""
+    return f"{size / MEGABYTE:.1f} MB"
@@ -3,12 +3,15 @@
 
 import math
 import os
-from PyQt6.QtCore import QEvent, QLineF, QPointF, QRectF, Qt
+from typing import Iterable
+from PyQt6.QtCore import QEvent, QLineF, QPointF, QRectF, Qt, QTimer
 from PyQt6.QtGui import QColor, QPainter
 from PyQt6.QtWidgets import QFileDialog, QGraphicsView, QGraphicsItem, QGraphicsScene, QGraphicsSceneMouseEvent, QHBoxLayout, QPushButton, QStyleOptionGraphicsItem, QVBoxLayout, QWidget
 
 from Data.tournament import Ui_Tournament
+from Ratings import RatingStore
 from TournamentManager import Match, Player, Tournament, TournamentManager
+from TournamentScheduler import TournamentScheduler
 
 class MatchItem(QGraphicsItem):
     w_name = 160
@@ -127,7 +130,7 @@ class MatchItem(QGraphicsItem):
         painter.drawText(id_rect, flags, id)
 
         painter.setPen(s_color)
-        painter.drawText(s_rect, flags, '1' if win else '0')
+        painter.drawText(s_rect, flags, '1' if win else '½' if self.match.draw else '0')
 
         flags = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
 
@@ -156,6 +159,8 @@ class MatchItem(QGraphicsItem):
 class TournamentWindow(Ui_Tournament, QWidget):
     PROJECT_DIR = os.path.abspath(os.path.dirname(__file__))
     TOURNAMENTS_DIR = os.path.join(PROJECT_DIR, "Data", "tournaments")
+    #   Interval at which the results of the matches played in parallel are collected
+    SCHEDULER_INTERVAL_MS = 50
 
     def __init__(self, arena: QWidget):
         super().__init__()
@@ -182,6 +187,16 @@ class TournamentWindow(Ui_Tournament, QWidget):
         match_btn_layout.addWidget(self.replay_button)
         match_btn_layout.addWidget(self.inv_rep_button)
 
+        #   Headless play of every match left, in parallel (see TournamentScheduler)
+        self.play_all_button = QPushButton(self)
+        self.play_all_button.setText("Play all matches in parallel")
+        self.play_all_button.clicked.connect(self.play_all_matches)
+        match_btn_layout.addWidget(self.play_all_button)
+
+        self.scheduler_run = None
+        self.scheduler_timer = QTimer(self)
+        self.scheduler_timer.timeout.connect(self.step_scheduler)
+
         # Render for tournament
         self.tournament_scene = QGraphicsScene()
         self.tournamentView.setScene(self.tournament_scene)
@@ -197,11 +212,13 @@ class TournamentWindow(Ui_Tournament, QWidget):
         self.actionReset.triggered.connect(self.reset_tournament)
         self.actionExport.triggered.connect(self.export_tournament)
 
-        self.tournament_manager = TournamentManager()
+        self.tournament_manager = TournamentManager(RatingStore())
         self.tournament_manager.tournament.arena = self.arena
         self.tournament_manager.tournament.view = self
 
         self.gf_reset_item = None
+        #   Graphics item of each match, by id
+        self.match_items: dict[str, MatchItem] = {}
 
         self.line_margin = 10
         self.l_line = 30
@@ -220,8 +237,41 @@ class TournamentWindow(Ui_Tournament, QWidget):
         return super().eventFilter(source, event)
 
     def start_match(self):
+        if self.scheduler_run is not None:
+            print("Matches are being played in parallel")
+            return
+
         self.arena.game_manager.reload_and_start()
 
+    def play_all_matches(self):
+        """Play every match left without the board, in parallel, with the map and budget of the arena"""
+        if self.scheduler_run is not None:
+            print("Matches are already being played in parallel")
+            return
+
+        game_manager = self.arena.game_manager
+        map_name = game_manager.board_manager.path or "default.brd"
+        budget = game_manager.players[0].get_budget() if len(game_manager.players) > 0 else 1.0
+
+        try:
+            scheduler = TournamentScheduler(self.tournament_manager.tournament, map_name, budget)
+        except ValueError as e:
+            print(e)
+            return
+
+        self.scheduler_run = scheduler.run(timeout=0)
+        self.scheduler_timer.start(self.SCHEDULER_INTERVAL_MS)
+
+    def step_scheduler(self):
+        """Record the matches finished since the last step, the bracket is repainted as they are"""
+        try:
+            while next(self.scheduler_run) is not None:
+                pass
+        except StopIteration:
+            self.scheduler_timer.stop()
+            self.scheduler_run = None
+            print("All matches have been played")
+
     def replay_selected_match(self, inverted: bool):
         selected_items = self.tournament_scene.selectedItems()
         match_items = [item for item in selected_items if isinstance(item, MatchItem)]
@@ -291,8 +341,8 @@ class TournamentWindow(Ui_Tournament, QWidget):
         self.tournament_scene.addLine(QLineF(p7, p8)) #l6
 
     def draw_lngf(self, mat: MatchItem):
-        wm = mat.match.player1_from.item
-        lm = mat.match.player2_from.item
+        wm = self.match_items[mat.match.player1_from.id]
+        lm = self.match_items[mat.match.player2_from.id]
 
         x1 = mat.x() - self.line_margin
         x2 = lm.x() + lm.width + self.line_margin
@@ -340,10 +390,10 @@ class TournamentWindow(Ui_Tournament, QWidget):
 
             for j in range(0, len(matches), 2):
                 mat1 = matches[j]
-                mat2 = matches[j+1].item
-                mat3 = mat1.winner_to.item
+                mat2 = self.match_items[matches[j+1].id]
+                mat3 = self.match_items[mat1.winner_to.id]
 
-                self.draw_ln1(mat1.item, mat2, mat3)
+                self.draw_ln1(self.match_items[mat1.id], mat2, mat3)
 
         for i in range(len(lb.rounds) - 1):
             matches = lb.rounds[i].matches
@@ -352,17 +402,17 @@ class TournamentWindow(Ui_Tournament, QWidget):
                 mat1 = matches[j]
 
                 if j == len(matches) - 1 and len(matches) % 2 == 1:
-                    mat2 = mat1.winner_to.item
+                    mat2 = self.match_items[mat1.winner_to.id]
 
-                    self.draw_ln2(mat1.item, mat2)
+                    self.draw_ln2(self.match_items[mat1.id], mat2)
                     continue
                     
 
 
-                mat2 = matches[j+1].item
-                mat3 = mat1.winner_to.item
+                mat2 = self.match_items[matches[j+1].id]
+                mat3 = self.match_items[mat1.winner_to.id]
 
-                self.draw_ln1(mat1.item, mat2, mat3)
+                self.draw_ln1(self.match_items[mat1.id], mat2, mat3)
 
         
         gf1 = t.grand_finals.matches[0]
@@ -370,16 +420,21 @@ class TournamentWindow(Ui_Tournament, QWidget):
         if len(t.grand_finals.matches) == 2:
             gf2 = t.grand_finals.matches[1]
 
-            self.draw_ln2(gf1.item, gf2.item)
+            self.draw_ln2(self.match_items[gf1.id], self.match_items[gf2.id])
 
-        self.draw_lngf(gf1.item)
+        self.draw_lngf(self.match_items[gf1.id])
 
 
     def setup_view(self):
         self.tournament_scene.clear()
+        self.match_items.clear()
 
         t = self.tournament_manager.tournament
 
+        if t.type in Tournament.ROUND_TYPES:
+            self.setup_rounds_view()
+            return
+
         len_r1 = len(t.brackets["winner"].rounds[0].matches)
 
         self.x_spacing = MatchItem.width + 200 + max([0, len_r1-8]) * self.l_line/2
@@ -397,7 +452,7 @@ class TournamentWindow(Ui_Tournament, QWidget):
             for col, rnd in enumerate(wb.rounds):
                 for row, mat in enumerate(rnd.matches):
                     item = MatchItem(mat, self.tournament_manager.tournament)
-                    mat.item = item
+                    self.match_items[mat.id] = item
                     x = col * self.x_spacing
                     y = top_margin + row * y_spacing
                     item.setPos(x, y)
@@ -424,7 +479,7 @@ class TournamentWindow(Ui_Tournament, QWidget):
             for col, rnd in enumerate(lb.rounds):
                 for row, mat in enumerate(rnd.matches):
                     item = MatchItem(mat, self.tournament_manager.tournament)
-                    mat.item = item
+                    self.match_items[mat.id] = item
                     x = (col + 1) * self.x_spacing
                     y = top_margin + lb_vertical_offset + row * y_spacing
                     item.setPos(x, y)
@@ -447,7 +502,7 @@ class TournamentWindow(Ui_Tournament, QWidget):
             mat = gf.matches[i]
 
             gf_item = MatchItem(mat, self.tournament_manager.tournament)
-            mat.item = gf_item
+            self.match_items[mat.id] = gf_item
             gf_item.setPos(self.gf_x + self.x_offset_gf, self.gf_y)
             self.x_offset_gf += self.x_spacing
 
@@ -461,23 +516,49 @@ class TournamentWindow(Ui_Tournament, QWidget):
 
         self.tournament_scene.setSceneRect(self.tournament_scene.itemsBoundingRect())
 
+    def setup_rounds_view(self):
+        """Show a round-robin or Swiss tournament, a column per round"""
+        t = self.tournament_manager.tournament
+
+        x_spacing = MatchItem.width + 60
+        y_spacing = MatchItem.height + 40
+
+        top_margin = 100
+
+        for col, rnd in enumerate(t.brackets["main"].rounds):
+            for row, mat in enumerate(rnd.matches):
+                item = MatchItem(mat, t)
+                self.match_items[mat.id] = item
+                item.setPos(col * x_spacing, top_margin + row * y_spacing)
+                self.tournament_scene.addItem(item)
+
+        self.tournament_scene.setSceneRect(self.tournament_scene.itemsBoundingRect())
+
     def add_gf_match(self, mat: Match):
         self.gf_reset_item = MatchItem(mat, self.tournament_manager.tournament)
-        mat.item = self.gf_reset_item
+        self.match_items[mat.id] = self.gf_reset_item
         self.gf_reset_item.setPos(self.gf_x + self.x_offset_gf, self.gf_y)
         self.x_offset_gf += self.x_spacing
 
         self.tournament_scene.addItem(self.gf_reset_item)
 
-        self.draw_ln2(self.tournament_manager.tournament.grand_finals.matches[0].item, mat.item)
+        self.draw_ln2(self.match_items[self.tournament_manager.tournament.grand_finals.matches[0].id], self.match_items[mat.id])
 
         self.tournament_scene.setSceneRect(self.tournament_scene.itemsBoundingRect())
 
     def reset_gf(self):
         if self.gf_reset_item is not None:
             self.tournament_scene.removeItem(self.gf_reset_item)
+            del self.match_items[self.gf_reset_item.match.id]
             self.gf_reset_item = None
 
+    def repaint_matches(self, matches: Iterable[Match]):
+        """Repaint matches whose players or results changed"""
+        for mat in matches:
+            item = self.match_items.get(mat.id)
+            if item is not None:
+                item.update()
+
     def export_tournament(self):
         """Open the export file selector and save the board"""
         path, _ = QFileDialog.getSaveFileName(
@@ -0,0 +1,92 @@
+#
+#   Speed of the tournament model on large brackets
+#
+#   Generates a double elimination, plays part of its matches, and measures loading it back from its
+#   exported form (players and matches tables, links between matches, order of play) and exporting it
+#   again, which must take less than TARGET_SECONDS for 8192 players:
+#
+#       python TournamentBenchmark.py              # 8192 players, half the matches played
+#       python TournamentBenchmark.py -n 1000 --played 1
+#
+#   Reading and writing the YAML text is measured apart: it depends on the YAML library (much faster
+#   with libyaml, see YamlLoader in TournamentManager.py) rather than on the model.
+#
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+
+import yaml
+
+from TournamentManager import Tournament, YamlDumper, YamlLoader
+
+TARGET_SECONDS = 1.0
+
+
+def generate(players: int, played: float, seed: int = 0) -> Tournament:
+    """
+    Generate a double elimination
+    :param players: Number of players
+    :param played: Part of the matches played, in the order of play, with random winners
+    """
+    rng = random.Random(seed)
+    tournament = Tournament.from_txt(["Benchmark\n", ",".join(f"Bot{i + 1}" for i in range(players)) + "\n"], None)
+    tournament.autosave = False
+
+    to_play = int(played * sum(not mat.is_bye for mat in tournament.ordered_matches))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(to_play):
+            if tournament.won:
+                break
+            mat = tournament.current
+            tournament.set_winner_and_next(mat.player1 if rng.random() < 0.5 else mat.player2)
+
+    return tournament
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the speed of the tournament model on a large double elimination")
+    parser.add_argument("-n", "--players", type=int, default=8192, help="Number of players")
+    parser.add_argument("--played", type=float, default=0.5, help="Part of the matches played before the measure")
+    parser.add_argument("--repeat", type=int, default=3, help="Measures, the best one being kept")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    tournament = generate(args.players, args.played)
+    raw = tournament.export()
+    print(f"{args.players} players, {len(tournament.all_matches)} matches generated in {time.perf_counter() - t0:.2f}s")
+
+    best_load = best_export = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        loaded = Tournament.from_dict(raw, None)
+        t1 = time.perf_counter()
+        exported = loaded.export()
+        t2 = time.perf_counter()
+
+        best_load = min(best_load, t1 - t0)
+        best_export = min(best_export, t2 - t1)
+
+    if exported != raw:
+        print("MISMATCH: the tournament loaded back is exported differently")
+        return 1
+
+    total = best_load + best_export
+    status = "ok" if total < TARGET_SECONDS else f"TOO SLOW (target {TARGET_SECONDS:g}s)"
+    print(f"  load, link and order {best_load:.3f}s, export {best_export:.3f}s: {total:.3f}s {status}")
+
+    t0 = time.perf_counter()
+    text = yaml.dump(raw, Dumper=YamlDumper)
+    t1 = time.perf_counter()
+    yaml.load(text, Loader=YamlLoader)
+    t2 = time.perf_counter()
+    print(f"  YAML ({YamlLoader.__name__}): {len(text) / 1e6:.1f} MB written in {t1 - t0:.2f}s, read in {t2 - t1:.2f}s")
+
+    return 0 if total < TARGET_SECONDS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
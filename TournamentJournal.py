@@ -0,0 +1,162 @@
+#
+#   Journal of the results of a tournament
+#
+#   Saving a tournament means exporting the whole YAML document, which gets long with large brackets.
+#   Instead, results are appended to a journal next to a base YAML export, one line per entry:
+#
+#       {"seq": 12, "op": "win", "match": "W7", "winner": 3}
+#       {"seq": 13, "op": "draw", "match": "R2M4"}
+#       {"seq": 14, "op": "replay", "match": "W7", "inverted": true}
+#       {"seq": 15, "op": "gf_reset"}
+#       {"seq": 16, "op": "reset"}
+#
+#   Each entry is written to the file right away, and flushed to the disk (fsync) every FSYNC_EVERY
+#   entries or FSYNC_SECONDS seconds, so that a crash of the program loses nothing and a power loss at
+#   most the last entries. Loading the base replays its journal; compacting writes the base again with
+#   every entry folded in, and empties the journal. The base records the sequence number of the last
+#   entry it contains, entries up to it being skipped if the program stopped while compacting.
+#
+#   A line cut short by a crash is dropped when the journal is opened.
+#
+
+import json
+import os
+import time
+from typing import List, Optional
+
+JOURNAL_EXTENSION = ".journal"
+
+
+class TournamentJournal:
+    """
+    Append-only journal of the results of a tournament, next to its base YAML export
+
+        journal = TournamentJournal("Data/tournaments/18-10-2026/cup.yaml")
+        for entry in journal.read(after=0):
+            ...
+        journal.append({"op": "win", "match": "W1", "winner": 1})
+    """
+
+    #   Entries, or seconds, after which the journal is flushed to the disk
+    FSYNC_EVERY = 32
+    FSYNC_SECONDS = 1.0
+
+    def __init__(self, base_path: str):
+        """
+        :param base_path: The base YAML export, the journal being the same path followed by ``.journal``
+        """
+        self.base_path: str = base_path
+        self.path: str = TournamentJournal.path_for(base_path)
+        #   Sequence number of the last entry written
+        self.sequence: int = 0
+
+        self.file = None
+        self.pending: int = 0
+        self.last_sync: float = time.monotonic()
+
+    @staticmethod
+    def path_for(base_path: str) -> str:
+        return base_path + JOURNAL_EXTENSION
+
+    def read(self, after: int = 0) -> List[dict]:
+        """
+        Read the entries of the journal, dropping a last line cut short
+        :param after: Sequence number of the last entry already in the base
+        :return: The entries after it
+        """
+        entries: List[dict] = []
+        if not os.path.exists(self.path):
+            self.sequence = max(self.sequence, after)
+            return entries
+
+        valid_size = 0
+        complete = True
+        with open(self.path, "rb") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                    seq = entry["seq"]
+                except (ValueError, KeyError, TypeError):
+                    break
+                valid_size += len(line)
+                complete = line.endswith(b"\n")
+                self.sequence = max(self.sequence, seq)
+                if seq > after:
+                    entries.append(entry)
+
+        if valid_size < os.path.getsize(self.path):
+            print(f"Dropping the end of '{self.path}', cut short")
+            with open(self.path, "r+b") as file:
+                file.truncate(valid_size)
+
+        #   The last entry was written without its end of line
+        if not complete:
+            with open(self.path, "ab") as file:
+                file.write(b"\n")
+
+        self.sequence = max(self.sequence, after)
+        return entries
+
+    def append(self, entry: dict):
+        """Write an entry at the end of the journal, its sequence number being added"""
+        if self.file is None:
+            directory = os.path.dirname(self.path)
+            if directory != "":
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+
+        self.sequence += 1
+        self.file.write(json.dumps({"seq": self.sequence, **entry}, separators=(",", ":")) + "\n")
+        self.file.flush()
+        self.pending += 1
+
+        if self.pending >= self.FSYNC_EVERY or time.monotonic() - self.last_sync >= self.FSYNC_SECONDS:
+            self.sync()
+
+    def sync(self):
+        """Flush the entries written to the disk"""
+        if self.file is not None and self.pending > 0:
+            os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def write_base(self, text: str):
+        """
+        Write the base export, with every entry folded in, and empty the journal
+        :param text: The YAML export, recording the sequence number of the last entry (``journal_sequence``)
+        """
+        self.sync()
+
+        directory = os.path.dirname(self.base_path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.base_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.base_path)
+
+        if self.file is not None:
+            self.file.truncate(0)
+        elif os.path.exists(self.path):
+            os.truncate(self.path, 0)
+
+    def close(self, remove: bool = False):
+        """
+        Close the journal
+        :param remove: Remove the journal file, once folded into the base
+        """
+        self.sync()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def open_existing(base_path: str) -> Optional["TournamentJournal"]:
+        """Get the journal of a base export, ``None`` if it has none"""
+        if not os.path.exists(TournamentJournal.path_for(base_path)):
+            return None
+        return TournamentJournal(base_path)
@@ -1,14 +1,43 @@
-from dataclasses import dataclass
+#
+#   Tournament model
+#
+#   The model does not depend on Qt: the tournament window (see Tournament.py) keeps the graphics items
+#   of the matches and is told which matches to repaint. Players and matches are kept in tables indexed
+#   by id, so that loading, linking and ordering a tournament take linear time, and the dataclasses use
+#   slots, a 8192-player double elimination having about 16k matches (``python TournamentBenchmark.py``).
+#
+#   Results are saved by appending them to a journal next to a YAML export (see TournamentJournal.py),
+#   folded back into the export when the tournament is won or closed, and replayed when it is loaded.
+#
+
+from __future__ import annotations
+
+import contextlib
+from dataclasses import dataclass, field
 from datetime import datetime
+import io
 import math
-from typing import Self
-from PyQt6.QtWidgets import QGraphicsItem, QWidget
+import re
+from typing import TYPE_CHECKING, Optional, Self
 import yaml
 import os
 
-from BotWidget import BotWidget
+from ChessClock import TimeControl
+from Pairing import round_robin_rounds, swiss_pairings
+from Ratings import RatingStore
+from Sandbox import ResourceLimits
+from TournamentJournal import TournamentJournal
 
-@dataclass
+if TYPE_CHECKING:
+    from PyQt6.QtWidgets import QWidget
+
+    from BotWidget import BotWidget
+
+#   C implementations of the YAML loader and dumper, much faster on large tournaments, if available
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+@dataclass(slots=True)
 class Player:
     id: int
     name: str
@@ -20,19 +49,8 @@ class Player:
 
         return raw
 
-@dataclass
-class Round:
-    ...
-
-@dataclass
-class Bracket:
-    ...
-
-@dataclass
-class TournamentManager:
-    ...
-
-@dataclass
+#   Matches compare by identity, comparing their fields would go through every match they are linked to
+@dataclass(slots=True, eq=False)
 class Match:
     id: str
     player1: Player | None | int
@@ -54,9 +72,11 @@ class Match:
 
     is_grand_final: bool = False
 
+    #   Played without a winner, only in round-robin and Swiss tournaments
+    draw: bool = False
+
     order: int = 0
 
-    item: QGraphicsItem = None
     round: Round = None
     bracket: Bracket = None
 
@@ -83,9 +103,15 @@ class Match:
 
         raw["winner"] = self.winner.id if self.winner is not None else 0
         raw["bye"] = self.is_bye
+        if self.draw:
+            raw["draw"] = True
 
         return raw
 
+    @property
+    def played(self) -> bool:
+        return self.winner is not None or self.draw
+
     def get_player1_infos(self):
         if self.player1 is None:
             return '??', '?', False
@@ -120,6 +146,8 @@ class Match:
         return False
 
     def setWinner(self, player: Player):
+        self.draw = False
+
         if self.player1 is player:
             self.winner = self.player1
             self.loser = self.player2
@@ -128,31 +156,58 @@ class Match:
             self.winner = self.player2
             self.loser = self.player1
 
+    def setDraw(self):
+        self.winner = None
+        self.loser = None
+        self.draw = True
+
+
+    def reset(self) -> list[Match]:
+        """
+        Clear the result of the match and of every match downstream
+        :return: The matches cleared
+        """
+        return Match.reset_downstream([self])
 
-    def reset(self, complete: bool = False):
-        if self.player1_from is not None and not self.player1_from.is_bye:
-            self.player1 = None
+    @staticmethod
+    def reset_downstream(matches: list[Match]) -> list[Match]:
+        """
+        Clear the results of matches and of every match downstream, each one once, without recursion
+        :return: The matches cleared
+        """
+        cleared: list[Match] = []
+        seen: set[Match] = set()
+        stack: list[Match] = list(matches)
+
+        while stack:
+            mat = stack.pop()
+            if mat in seen:
+                continue
+            seen.add(mat)
 
-        if not self.is_bye:
-            self.winner = None
-            self.loser = None
+            if mat.player1_from is not None and not mat.player1_from.is_bye:
+                mat.player1 = None
 
-            if self.player2_from is not None and not self.player2_from.is_bye:
-                self.player2 = None
+            if not mat.is_bye:
+                mat.winner = None
+                mat.loser = None
+                mat.draw = False
 
-        if self.winner_to is not None:
-            self.winner_to.reset(complete)
+                if mat.player2_from is not None and not mat.player2_from.is_bye:
+                    mat.player2 = None
 
-        if self.loser_to is not None:
-            self.loser_to.reset(complete)
-        
-        if complete:
-            self.item = None
-        else:
-            self.item.update()
+            cleared.append(mat)
+
+            if mat.loser_to is not None:
+                stack.append(mat.loser_to)
+
+            if mat.winner_to is not None:
+                stack.append(mat.winner_to)
+
+        return cleared
 
 
-@dataclass
+@dataclass(slots=True)
 class GrandFinals:
     matches: list[Match]
     reset: bool
@@ -167,7 +222,7 @@ class GrandFinals:
 
         return raw
 
-@dataclass
+@dataclass(slots=True)
 class Round:
     id: int
     matches: list[Match]
@@ -183,7 +238,7 @@ class Round:
 
         return raw
 
-@dataclass
+@dataclass(slots=True)
 class Bracket:
     name: str
     rounds: list[Round]
@@ -197,8 +252,25 @@ class Bracket:
 
         return raw
 
-@dataclass
+@dataclass(slots=True)
+class Standing:
+    player: Player
+    #   1 per win or bye, 0.5 per draw
+    score: float = 0
+    #   Sum of the scores of the opponents, first tie-break
+    buchholz: float = 0
+    games: int = 0
+    #   Ids of the players already met
+    opponents: set[int] = None
+    #   White games minus black games
+    color_balance: int = 0
+    had_bye: bool = False
+
+@dataclass(slots=True)
 class Tournament:
+    #   Types played in rounds, every player playing once per round, rather than in brackets
+    ROUND_TYPES = ("round_robin", "swiss")
+
     name: str
     type: str
     brackets: dict[str, Bracket]
@@ -215,12 +287,36 @@ class Tournament:
     view: QWidget = None
     manager: TournamentManager = None
 
+    #   Time control of the matches, flat budgets per move if None
+    time_control: TimeControl | None = None
+    #   Memory and CPU limits of the bots, none if None
+    resource_limits: ResourceLimits | None = None
+    #   Journal the results in Data/tournaments if no journal is attached (see start_journal)
+    autosave: bool = True
+    #   Rounds of a Swiss tournament, paired one at a time as the previous one ends
+    rounds_total: int = 0
+    #   Ratings updated with the result of each match, none if None
+    ratings: RatingStore | None = None
+    #   Journal the results are appended to, none if None
+    journal: TournamentJournal | None = None
+
+    players_by_id: dict[int, Player] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.players_by_id = {player.id: player for player in self.players}
+
     def export(self):
         raw: Dict = {}
 
         raw["tournament"] = {}
         raw["tournament"]["name"] = self.name
         raw["tournament"]["type"] = self.type
+        if self.time_control is not None:
+            raw["tournament"]["time_control"] = self.time_control.export()
+        if self.resource_limits is not None:
+            raw["tournament"]["resource_limits"] = self.resource_limits.export()
+        if self.type == "swiss":
+            raw["tournament"]["rounds"] = self.rounds_total
 
         raw["players"] = []
 
@@ -232,12 +328,13 @@ class Tournament:
         for bracket in self.brackets:
             raw["brackets"][bracket] = self.brackets[bracket].export()
 
-        raw["grand_finals"] = self.grand_finals.export()
+        if self.type not in Tournament.ROUND_TYPES:
+            raw["grand_finals"] = self.grand_finals.export()
 
         return raw
     
     def replay(self, mat: Match, inverted: bool):
-        if mat.winner is None or mat.is_bye:
+        if not mat.played or mat.is_bye:
             return False
 
         if inverted:
@@ -257,19 +354,29 @@ class Tournament:
 
         mat.winner = None
         mat.loser = None
+        mat.draw = False
+
+        cleared: list[Match] = []
 
         if mat.winner_to is not None:
-            mat.winner_to.reset()
+            cleared += mat.winner_to.reset()
 
         if mat.loser_to is not None:
-            mat.loser_to.reset()
+            cleared += mat.loser_to.reset()
 
         self.last = self.current
         self.current = mat
 
-        mat.item.update()
+        self.repaint(mat, *cleared)
+
+        self._journal("replay", match=mat.id, inverted=inverted)
 
         return True
+
+    def repaint(self, *matches: Match):
+        """Repaint matches in the tournament window, if shown"""
+        if self.view is not None:
+            self.view.repaint_matches(matches)
     
     def set_bots(self):
         players = self.arena.game_manager.players
@@ -280,116 +387,371 @@ class Tournament:
         widget1.playerBot.setCurrentText(self.current.player1.name)
         widget2.playerBot.setCurrentText(self.current.player2.name)
 
-    def gf_reset(self):
-        mat = Match("GF2", self.current.player2, self.current.player1, None, None, "winner:GF1", "loser:GF1", self.current, self.current, is_grand_final=True)
+    def gf_reset(self, gf1: Match = None):
+        gf1 = gf1 or self.current
+        mat = Match("GF2", gf1.player2, gf1.player1, None, None, "winner:GF1", "loser:GF1", gf1, gf1, is_grand_final=True)
 
-        self.current.winner_to = mat
-        self.current.loser_to = mat
+        gf1.winner_to = mat
+        gf1.loser_to = mat
 
         self.all_matches[mat.id] = mat
         self.ordered_matches.append(mat)
         self.grand_finals.matches.append(mat)
 
-        self.view.add_gf_match(mat)
+        if self.view is not None:
+            self.view.add_gf_match(mat)
+
+        self._journal("gf_reset", match=gf1.id)
+
+    def check_tournament_win(self, mat: Match = None):
+        if self.type in Tournament.ROUND_TYPES:
+            #   The current match is the first one left to play
+            self.won = self.current.played and (self.type != "swiss" or len(self.brackets["main"].rounds) >= self.rounds_total)
+            return
 
-    def check_tournament_win(self):
-        if self.current.is_grand_final and ( ( self.current.id == "GF2" and self.current.winner is not None ) or self.current.winner is self.current.player1 ):
+        mat = mat or self.current
+        if mat.is_grand_final and ( ( mat.id == "GF2" and mat.winner is not None ) or mat.winner is mat.player1 ):
             self.won = True
         
-    def set_winner_and_next(self, player: Player):
-        self.current.setWinner(player)
+    def set_winner_and_next(self, player: Player, mat: Match = None):
+        """
+        Record the winner of a match, give the players of the next matches and move on to the next match to play
+        :param player: The winner
+        :param mat: The match, the current one by default. Matches played in parallel (see TournamentScheduler)
+                    can finish in any order, the current match stays the first one left in the order of play
+        """
+        mat = mat or self.current
+        mat.setWinner(player)
+
+        if mat.is_grand_final and self.grand_finals.reset and len(self.grand_finals.matches) < 2 and mat.winner is mat.player2:
+            self.gf_reset(mat)
+
+        self._next_match(mat)
+        self._journal("win", match=mat.id, winner=player.id)
 
-        if self.current.is_grand_final and self.grand_finals.reset and len(self.grand_finals.matches) < 2 and self.current.winner is self.current.player2:
-            self.gf_reset()
+        print(f"Match {self.last.id} has been won by {player.name}. Current match is now {self.current.id}")
 
-        self.check_tournament_win()
-        
-        idx = self.ordered_matches.index(self.current) + 1
+    def set_draw_and_next(self, mat: Match = None):
+        """
+        Record a draw and move on to the next match to play, in round-robin and Swiss tournaments
+        :param mat: The match, the current one by default
+        """
+        mat = mat or self.current
+        mat.setDraw()
 
-        if self.current.winner_to is not None:
-            Tournament._get_loser_and_link_players(self.current.winner_to)
-            self.current.winner_to.item.update()
+        self._next_match(mat)
+        self._journal("draw", match=mat.id)
 
-        if self.current.loser_to is not None:
-            Tournament._get_loser_and_link_players(self.current.loser_to)
-            self.current.loser_to.item.update()
+        print(f"Match {self.last.id} is a draw. Current match is now {self.current.id}")
 
+    def _next_match(self, mat: Match):
+        """Rate the match, give the players of the next matches, pair the next Swiss round and move on to the next match to play"""
+        if self.ratings is not None:
+            score = 0.5 if mat.draw else 1.0 if mat.winner is mat.player1 else 0.0
+            self.ratings.record(mat.player1.name, mat.player2.name, score)
 
-        self.last = self.current
+        if mat.winner_to is not None:
+            Tournament._get_loser_and_link_players(mat.winner_to)
+            self.repaint(mat.winner_to)
 
-        while idx < len(self.ordered_matches):
-            mat = self.ordered_matches[idx]
+        if mat.loser_to is not None:
+            Tournament._get_loser_and_link_players(mat.loser_to)
+            self.repaint(mat.loser_to)
 
-            if mat.is_bye or mat.winner is not None:
-                idx += 1
-                continue
 
-            self.current = mat
-            break
+        self.last = mat
+
+        if mat is self.current:
+            #   Only byes come before a match in the order of play without being counted in its order
+            idx = self.ordered_matches.index(self.current, self.current.order) + 1
+
+            while idx < len(self.ordered_matches):
+                next_mat = self.ordered_matches[idx]
+
+                if next_mat.is_bye or next_mat.played:
+                    idx += 1
+                    continue
+
+                self.current = next_mat
+                break
+
+        if self.type == "swiss" and self.current.played and len(self.brackets["main"].rounds) < self.rounds_total:
+            self.current = self.pair_swiss_round()
+
+        self.check_tournament_win(mat)
         
         if self.current.player1 is None or self.current.player2 is None:
             Tournament._get_loser_and_link_players(self.current)
 
-        self.current.item.update()
-        self.last.item.update()
-
-        self.set_bots()
-
-        current_date = datetime.today().strftime('%d-%m-%Y')
-        export_path = f"./Data/tournaments/{current_date}"
+        self.repaint(self.current, self.last)
+
+        if self.arena is not None:
+            self.set_bots()
+
+    def _journal(self, op: str, **values):
+        """
+        Append a result to the journal, starting one if autosave is on. The tournament being won, the journal is folded
+        into its base export
+        :param op: ``win``, ``draw``, ``replay``, ``gf_reset`` or ``reset``, see apply_journal
+        """
+        if self.journal is None:
+            if self.autosave:
+                #   The new base export already holds the result
+                self.start_journal()
+            return
+
+        self.journal.append({"op": op, **values})
+
+        if self.won:
+            self.compact_journal()
+
+    def start_journal(self, base_path: str = None):
+        """
+        Export the tournament and journal its results from now on
+        :param base_path: The export, ``Data/tournaments/<date>/<name>.yaml`` by default
+        """
+        if base_path is None:
+            current_date = datetime.today().strftime('%d-%m-%Y')
+            file_name = re.sub(r"[^\w\-]+", "_", self.name).strip("_") or "tournament"
+            base_path = os.path.join(TournamentManager.TOURNAMENT_DIRECTORY, current_date, f"{file_name}.yaml")
+
+        if self.journal is not None:
+            self.close_journal()
+
+        self.journal = TournamentJournal(base_path)
+        self.compact_journal()
+
+        print(f"Results of {self.name} are saved to '{base_path}'")
+
+    def compact_journal(self):
+        """Fold the journal into its base export"""
+        raw = self.export()
+        raw["tournament"]["journal_sequence"] = self.journal.sequence
+
+        self.journal.write_base(yaml.dump(raw, Dumper=YamlDumper))
+
+    def close_journal(self, remove: bool = False):
+        """
+        Fold the journal into its base export and detach it
+        :param remove: Remove the emptied journal, its base export being final
+        """
+        self.compact_journal()
+        self.journal.close(remove)
+        self.journal = None
+
+    def apply_journal(self, entries: list[dict]):
+        """
+        Replay the results of a journal, without rating them again nor journaling them
+        :param entries: The entries after the base export (see TournamentJournal.read)
+        """
+        journal, ratings, autosave = self.journal, self.ratings, self.autosave
+        self.journal, self.ratings, self.autosave = None, None, False
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for entry in entries:
+                    op = entry["op"]
+
+                    if op == "win":
+                        self.set_winner_and_next(self.players_by_id[entry["winner"]], self.all_matches[entry["match"]])
+                    elif op == "draw":
+                        self.set_draw_and_next(self.all_matches[entry["match"]])
+                    elif op == "replay":
+                        self.replay(self.all_matches[entry["match"]], entry["inverted"])
+                    elif op == "gf_reset":
+                        #   Also made by the win of the player coming from the loser bracket
+                        if "GF2" not in self.all_matches:
+                            self.gf_reset(self.all_matches[entry["match"]])
+                    elif op == "reset":
+                        self.reset()
+                    else:
+                        raise ValueError(f"Unknown journal entry '{op}'")
+        finally:
+            self.journal, self.ratings, self.autosave = journal, ratings, autosave
+
+    def standings(self) -> list[Standing]:
+        """
+        Standings of a round-robin or Swiss tournament
+        :return: The players by score, then Buchholz score, then seed
+        """
+        standings = {player.id: Standing(player, opponents=set()) for player in self.players}
+
+        for rnd in self.brackets["main"].rounds:
+            for mat in rnd.matches:
+                if mat.is_bye:
+                    standing = standings[mat.player1.id]
+                    standing.score += 1
+                    standing.had_bye = True
+                    continue
+
+                white, black = standings[mat.player1.id], standings[mat.player2.id]
+                white.opponents.add(black.player.id)
+                black.opponents.add(white.player.id)
+                white.color_balance += 1
+                black.color_balance -= 1
+
+                if mat.draw:
+                    white.score += 0.5
+                    black.score += 0.5
+                elif mat.winner is not None:
+                    standings[mat.winner.id].score += 1
+
+                if mat.played:
+                    white.games += 1
+                    black.games += 1
+
+        for standing in standings.values():
+            standing.buchholz = sum(standings[opponent].score for opponent in standing.opponents)
+
+        seeds = {player.id: i for i, player in enumerate(self.players)}
+        return sorted(standings.values(), key=lambda standing: (-standing.score, -standing.buchholz, seeds[standing.player.id]))
+
+    def get_winner(self) -> Player | None:
+        """Get the winner of the tournament, the standings leader in round-robin and Swiss tournaments"""
+        if not self.won:
+            return None
 
-        if not os.path.exists(export_path):
-            os.mkdir(export_path)
+        if self.type in Tournament.ROUND_TYPES:
+            return self.standings()[0].player
+
+        return self.grand_finals.matches[-1].winner
+
+    def pair_swiss_round(self) -> Match:
+        """
+        Pair the next round of a Swiss tournament from the standings (see Pairing.py) and add it to the matches
+        :return: The first match of the round to play
+        """
+        bracket = self.brackets["main"]
+        standings = self.standings()
+        players = self.players_by_id
+
+        pairs, bye = swiss_pairings(
+            [standing.player.id for standing in standings],
+            {standing.player.id: standing.score for standing in standings},
+            {standing.player.id: standing.opponents for standing in standings},
+            {standing.player.id: standing.color_balance for standing in standings},
+            {standing.player.id for standing in standings if standing.had_bye},
+        )
+        if bye is not None:
+            pairs.append((bye, None))
+
+        rnd = Tournament._new_round(bracket, [(players[white], players.get(black)) for white, black in pairs])
+        for mat in rnd.matches:
+            self.all_matches[mat.id] = mat
+
+        order = next((mat.order + 1 for mat in reversed(self.ordered_matches) if not mat.is_bye), 0)
+        for mat in rnd.matches:
+            if not mat.is_bye:
+                mat.order = order
+                order += 1
+            self.ordered_matches.append(mat)
 
-        self.manager.export(os.path.join(export_path, f"match_{self.current.order}.yaml"))
+        if self.view is not None:
+            self.view.setup_view()
 
-        print(f"Match {self.last.id} has been won by {player.name}. Current match is now {self.current.id}")
+        return rnd.matches[0]
 
     def reset(self):
         self.current = self.ordered_matches[0]
         self.last = None
         self.won = False
 
+        if self.journal is not None:
+            self.journal.append({"op": "reset"})
+
+        if self.type in Tournament.ROUND_TYPES:
+            self._reset_rounds()
+            return
+
         wb_rounds = self.brackets["winner"].rounds
+        downstream: list[Match] = []
         
         for mat in wb_rounds[0].matches:
             if not mat.is_bye:
                 mat.winner = None
                 mat.loser = None
 
-            mat.item = None
-            mat.winner_to.reset(True)
+            downstream.append(mat.winner_to)
 
             if mat.loser_to is not None:
-                mat.loser_to.reset(True)
+                downstream.append(mat.loser_to)
 
-        self.view.reset_gf()
-        
-        if len(self.grand_finals.matches) > 1:
-            del self.grand_finals.matches[1]
+        Match.reset_downstream(downstream)
 
+        if self.view is not None:
+            self.view.reset_gf()
+        
         gf_mat = self.grand_finals.matches[0]
 
+        if len(self.grand_finals.matches) > 1:
+            gf2 = self.grand_finals.matches.pop(1)
+            del self.all_matches[gf2.id]
+            self.ordered_matches.remove(gf2)
+            gf_mat.winner_to = None
+            gf_mat.loser_to = None
+
         gf_mat.player1 = None
         gf_mat.player2 = None
         gf_mat.winner = None
         gf_mat.loser = None
-        gf_mat.item = None
 
-        self.view.setup_view()
+        if self.view is not None:
+            self.view.setup_view()
+
+    def _reset_rounds(self):
+        bracket = self.brackets["main"]
+
+        #   Swiss rounds after the first one depend on the results
+        if self.type == "swiss":
+            for rnd in bracket.rounds[1:]:
+                for mat in rnd.matches:
+                    del self.all_matches[mat.id]
+            del bracket.rounds[1:]
+            self.ordered_matches = list(bracket.rounds[0].matches)
+
+        for mat in self.ordered_matches:
+            if not mat.is_bye:
+                mat.winner = None
+                mat.loser = None
+                mat.draw = False
+
+        _, self.current = Tournament._get_current_match(self.ordered_matches)
+
+        if self.view is not None:
+            self.view.setup_view()
 
 
     @staticmethod
-    def from_txt(data: list[str], manager: TournamentManager):
+    def from_txt(data: list[str], manager: TournamentManager, ratings: RatingStore = None):
+        """
+        Create a tournament from a text file: its name, the players separated by commas and optionally its type,
+        ``double_elimination`` (default), ``round_robin`` or ``swiss`` followed by the number of rounds
+        :param ratings: If given, the players are seeded by rating rather than in the order of the file
+        """
         name = data[0].strip()
 
         players_strings = data[1].strip().split(',')
+        if ratings is not None:
+            players_strings = ratings.seed([player.strip() for player in players_strings])
+
         players: list[Player] = []
 
         for i in range(len(players_strings)):
             player = players_strings[i]
             players.append(Player(i+1, player))
 
+        type_line = data[2].split() if len(data) > 2 else []
+
+        if len(type_line) > 0 and type_line[0] == "round_robin":
+            return Tournament._new_round_robin(name, players, manager)
+
+        if len(type_line) > 0 and type_line[0] == "swiss":
+            rounds = int(type_line[1]) if len(type_line) > 1 else math.ceil(math.log2(len(players)))
+            return Tournament._new_swiss(name, players, rounds, manager)
+
+        if len(type_line) > 0 and type_line[0] != "double_elimination":
+            raise ValueError(f"Unknown tournament type '{type_line[0]}'")
+
         n = len(players)
 
         min_exp = math.ceil(math.log2(n))
@@ -398,6 +760,9 @@ class Tournament:
 
         b = s - n
 
+        if ratings is not None:
+            players = Tournament._bracket_seeding(players, b)
+
         all_matches: dict[str, Match] = {}
 
         winner_bracket = Bracket("winner", [])
@@ -559,6 +924,57 @@ class Tournament:
 
         return Tournament(name, "double_elimination", brackets, players, gf, all_matches, ordered, current, last, manager=manager)
 
+    @staticmethod
+    def _bracket_seeding(players: list[Player], byes: int) -> list[Player]:
+        """
+        Place seeded players in the first round of a double elimination: the top seeds get the byes, the others
+        play the top half against the bottom half (first against last)
+        """
+        playing = players[byes:]
+        placed: list[Player] = []
+
+        for i in range(len(playing) // 2):
+            placed += [playing[i], playing[-1 - i]]
+
+        return placed + players[:byes]
+
+    @staticmethod
+    def _new_round(bracket: Bracket, pairs: list[tuple[Player, Player | None]]) -> Round:
+        """Add a round of a round-robin or Swiss tournament, ``None`` as player 2 being a bye, played last"""
+        rnd = Round(len(bracket.rounds) + 1, [], bracket=bracket)
+        bracket.rounds.append(rnd)
+
+        pairs = sorted(pairs, key=lambda pair: pair[1] is None)
+        for i, (player1, player2) in enumerate(pairs):
+            if player2 is None:
+                mat = Match(f"R{rnd.id}M{i + 1}", player1, 0, player1, None, "", "", None, None, is_bye=True, round=rnd, bracket=bracket)
+            else:
+                mat = Match(f"R{rnd.id}M{i + 1}", player1, player2, None, None, "", "", None, None, round=rnd, bracket=bracket)
+            rnd.matches.append(mat)
+
+        return rnd
+
+    @staticmethod
+    def _new_round_robin(name: str, players: list[Player], manager: TournamentManager):
+        bracket = Bracket("main", [])
+        for pairs in round_robin_rounds(players):
+            Tournament._new_round(bracket, pairs)
+
+        brackets = { "main": bracket }
+        all_matches = {mat.id: mat for rnd in bracket.rounds for mat in rnd.matches}
+        ordered = Tournament._compute_round_order(brackets)
+        last, current = Tournament._get_current_match(ordered)
+
+        return Tournament(name, "round_robin", brackets, players, GrandFinals([], False), all_matches, ordered, current, last, manager=manager)
+
+    @staticmethod
+    def _new_swiss(name: str, players: list[Player], rounds: int, manager: TournamentManager):
+        brackets = { "main": Bracket("main", []) }
+        tournament = Tournament(name, "swiss", brackets, players, GrandFinals([], False), {}, [], manager=manager, rounds_total=rounds)
+        tournament.current = tournament.pair_swiss_round()
+
+        return tournament
+
         
     #----------------------- YAML ----------------------    
     
@@ -577,6 +993,7 @@ class Tournament:
                 player["name"]
             ))
 
+        players_by_id: dict[int, Player] = {player.id: player for player in players}
         
         brackets_dict = raw["brackets"]
         brackets: dict[str, Bracket] = {}
@@ -590,25 +1007,31 @@ class Tournament:
                 matches_dict = r["matches"]
                 round = Round(r["round"], [], bracket=bracket)
 
-                matches = Tournament._get_matches_from_dict(matches_dict, players, all_matches, round, bracket)
+                matches = Tournament._get_matches_from_dict(matches_dict, players_by_id, all_matches, round, bracket)
 
                 round.matches = matches
 
                 bracket.rounds.append(round)
 
-        grand_finals_dict = raw["grand_finals"]
+        grand_finals_dict = raw.get("grand_finals") or { "matches": [], "reset": False }
 
-        grand_finals_matches = Tournament._get_matches_from_dict(grand_finals_dict["matches"], players, all_matches, gf=True)
+        grand_finals_matches = Tournament._get_matches_from_dict(grand_finals_dict["matches"], players_by_id, all_matches, gf=True)
         
         grand_finals = GrandFinals(grand_finals_matches, grand_finals_dict["reset"])
 
         Tournament._link_all_matches(all_matches)
 
-        ordered = Tournament._compute_match_order(all_matches, brackets, grand_finals)
+        if type in Tournament.ROUND_TYPES:
+            ordered = Tournament._compute_round_order(brackets)
+        else:
+            ordered = Tournament._compute_match_order(all_matches, brackets, grand_finals)
 
         last, current = Tournament._get_current_match(ordered)
 
         tournament = Tournament(name, type, brackets, players, grand_finals, all_matches, ordered, current, last, manager=manager)
+        tournament.time_control = TimeControl.from_dict(raw["tournament"].get("time_control"))
+        tournament.resource_limits = ResourceLimits.from_dict(raw["tournament"].get("resource_limits"))
+        tournament.rounds_total = raw["tournament"].get("rounds", 0)
         
         tournament.check_tournament_win()
 
@@ -616,16 +1039,14 @@ class Tournament:
 
 
     @staticmethod
-    def _get_player_from_dict(players: list[Player], id: int):
+    def _get_player_from_dict(players: dict[int, Player], id: int):
         if id == 0:
             return None
 
-        for player in players:
-            if player.id == id:
-                return player
+        return players.get(id)
 
     @staticmethod
-    def _get_match_from_dict(m: dict, players: list[Player], round: Round = None, bracket: Bracket = None, gf: bool = False):
+    def _get_match_from_dict(m: dict, players: dict[int, Player], round: Round = None, bracket: Bracket = None, gf: bool = False):
         if gf:
             return Match(m["id"], None, None, Tournament._get_player_from_dict(players, m["winner"]), None, m["player1_from"], m["player2_from"], None, None, is_grand_final=True)
 
@@ -633,7 +1054,7 @@ class Tournament:
             player1 = Tournament._get_player_from_dict(players, m["player1"])
             player2 = Tournament._get_player_from_dict(players, m["player2"]) if not m["bye"] else 0
 
-            return Match(m["id"], player1, player2, Tournament._get_player_from_dict(players, m["winner"]), None, "", "", None, None, is_bye=m["bye"], round=round, bracket=bracket)
+            return Match(m["id"], player1, player2, Tournament._get_player_from_dict(players, m["winner"]), None, "", "", None, None, is_bye=m["bye"], draw=m.get("draw", False), round=round, bracket=bracket)
 
         if not m["bye"]:
             return Match(m["id"], None, None, Tournament._get_player_from_dict(players, m["winner"]), None, m["player1_from"], m["player2_from"], None, None, round=round, bracket=bracket)
@@ -641,7 +1062,7 @@ class Tournament:
         return Match(m["id"], None, 0, Tournament._get_player_from_dict(players, m["winner"]), None, m["player1_from"], "", None, None, is_bye=True, round=round, bracket=bracket)
 
     @staticmethod
-    def _get_matches_from_dict(matches_dict: list[dict], players: list[Player], all_matches: dict[str, Match], round: Round = None, bracket: Bracket = None, gf: bool = False):
+    def _get_matches_from_dict(matches_dict: list[dict], players: dict[int, Player], all_matches: dict[str, Match], round: Round = None, bracket: Bracket = None, gf: bool = False):
         matches: list[Match] = []
 
         for m in matches_dict:
@@ -831,13 +1252,30 @@ class Tournament:
 
         return ordered
 
+    @staticmethod
+    def _compute_round_order(brackets: dict[str, Bracket]):
+        """Order of play of a round-robin or Swiss tournament, round by round"""
+        ordered: list[Match] = []
+
+        order = 0
+
+        for rnd in brackets["main"].rounds:
+            for mat in rnd.matches:
+                if not mat.is_bye:
+                    mat.order = order
+                    order += 1
+
+                ordered.append(mat)
+
+        return ordered
+
     @staticmethod
     def _get_current_match(matches: list[Match]):
         current = None
         last = None
 
         for idx, m in enumerate(matches):
-            if m.winner is None or idx == len(matches) - 1:
+            if not m.played or idx == len(matches) - 1:
                 current = m
                 
                 if idx > 0:
@@ -852,13 +1290,21 @@ class TournamentManager:
     TOURNAMENT_DIRECTORY = os.path.join(os.path.abspath(os.path.dirname(__file__)), "Data", "tournaments")
     DEFAULT_TOURNAMENT = os.path.join(TOURNAMENT_DIRECTORY, "tournament_setup.txt")
 
-    def __init__(self) -> None:
+    def __init__(self, ratings: RatingStore = None) -> None:
+        """
+        :param ratings: Ratings updated with the result of each match, and by which tournaments can be seeded
+        """
         self.tournament: Tournament = None 
         self.path: Optional[str] = None
+        self.ratings: RatingStore = ratings
         if os.path.exists(self.DEFAULT_TOURNAMENT):
             self.load_file(self.DEFAULT_TOURNAMENT)
 
-    def load_file(self, path):
+    def load_file(self, path, seed_by_rating: bool = False):
+        """
+        Load a tournament
+        :param seed_by_rating: Seed the players of a new tournament (.txt) by rating rather than in the order of the file
+        """
         if path.strip() == "":
             return False
 
@@ -876,16 +1322,31 @@ class TournamentManager:
             print(f"Unsupported extension '{ext}'")
             return False
 
+        if self.tournament is not None and self.tournament.journal is not None:
+            self.tournament.close_journal()
+
         if ext == ".yaml":
             with open(path, 'r') as f:
-                raw = yaml.load(f, Loader=yaml.SafeLoader)
+                raw = yaml.load(f, Loader=YamlLoader)
                 self.tournament = Tournament.from_dict(raw, self)
-            
+
+            #   Results saved after the export
+            journal = TournamentJournal.open_existing(path)
+            if journal is not None:
+                entries = journal.read(raw["tournament"].get("journal_sequence", 0))
+                self.tournament.apply_journal(entries)
+                self.tournament.journal = journal
+                self.tournament.compact_journal()
+
+                if len(entries) > 0:
+                    print(f"Recovered {len(entries)} results of {self.tournament.name} from '{journal.path}'")
 
         elif ext == ".txt":
             with open(path, 'r') as f:
                 data = f.readlines()
-                self.tournament = Tournament.from_txt(data, self)
+                self.tournament = Tournament.from_txt(data, self, self.ratings if seed_by_rating else None)
+
+        self.tournament.ratings = self.ratings
 
         return True
 
@@ -894,4 +1355,4 @@ class TournamentManager:
         raw = self.tournament.export()
         
         with open(path, 'w') as f:
-            yaml.dump(raw, f, yaml.SafeDumper)
+            yaml.dump(raw, f, YamlDumper)
@@ -0,0 +1,241 @@
+#
+#   Parallel tournament matches
+#
+#   A tournament is usually played one match at a time, in the order of TournamentManager. Most matches
+#   do not depend on each other though: every first round match can be played right away, and any other
+#   match as soon as the matches its players come from are over. The scheduler plays each match in a
+#   match farm (see MatchFarm.py) as soon as both its players are known, so that a tournament takes the
+#   time of its longest chain of matches rather than the time of all its matches:
+#
+#       python TournamentScheduler.py Data/tournaments/double_elimination.yaml --map default.brd --output played.yaml
+#
+#   Matches waiting for a free core are played longest chain first, so that the grand finals are not
+#   held up by matches nothing depends on. A match is one game between its players, player 1 playing
+#   white. A game without a winner (move limit, failed game) is played again with the colors swapped,
+#   and player 1 goes through if there is still no winner after MAX_ATTEMPTS games.
+#
+#   Round-robin and Swiss tournaments are played a round at a time: every match of a round at once, all
+#   the rounds of a round-robin, the next round of a Swiss tournament once it is paired. A game without
+#   a winner is a draw there, only failed games are played again, and are a draw after MAX_ATTEMPTS.
+#
+#   With --output, results are journaled next to the output as they come (see TournamentJournal.py): if
+#   the run is stopped, running the scheduler again on the output picks up where it stopped.
+#
+
+import argparse
+import heapq
+import itertools
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from BoardFile import find_board_file, read_board_file
+from GameEngine import Referee
+from MatchFarm import GameJob, GameOutcome, MatchFarm
+from Ratings import RatingStore
+from TournamentManager import Match, Player, Tournament, TournamentManager
+
+
+class TournamentScheduler:
+    """
+    Plays the matches of a tournament in parallel, recording the results as they come
+
+        scheduler = TournamentScheduler(tournament, "default.brd")
+        for mat in scheduler.run():
+            print(mat.id, mat.winner.name)
+    """
+
+    #   Games played for a match without a winner before its player 1 goes through
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, tournament: Tournament, map_name: str = "default.brd", budget: float = 1.0,
+                 max_moves: int = 200, farm: Optional[MatchFarm] = None):
+        """
+        :param tournament: The tournament, whose matches already played are kept
+        :param map_name: Board file or name in Data/maps of the games, for two players
+        :param budget: Time budget per move in seconds, used without time control
+        :param max_moves: Moves after which a game is stopped without winner
+        :param farm: The farm playing the games, one on every core by default
+        """
+        loaded = read_board_file(find_board_file(map_name))
+        if loaded is None:
+            raise ValueError(f"Cannot read board '{map_name}'")
+        if Referee(loaded[0], loaded[1].shape).players != 2:
+            raise ValueError(f"Tournament matches need a board for two players, '{map_name}' is for {loaded[0]}")
+
+        self.tournament: Tournament = tournament
+        self.map: str = map_name
+        self.budget: float = budget
+        self.max_moves: int = max_moves
+        self.farm: MatchFarm = farm or MatchFarm()
+
+        #   Match of each game being played, and whether its colors are swapped
+        self.running: Dict[int, Tuple[Match, bool]] = {}
+        self.attempts: Dict[str, int] = {}
+        self.job_ids = itertools.count()
+
+        #   Matches ready to be played, longest chain first: (-chain, order, id, swapped)
+        self.ready: List[Tuple[int, int, str, bool]] = []
+        self.queued: set[str] = set()
+        self.chains: Dict[str, int] = self._chain_lengths()
+
+        for mat in tournament.ordered_matches:
+            self._queue_if_ready(mat)
+        #   Swiss rounds are added as they are paired
+        self.known_matches = len(tournament.ordered_matches)
+
+    def _chain_lengths(self) -> Dict[str, int]:
+        """Length of the longest chain of matches starting with each match, up to the grand finals"""
+        chains: Dict[str, int] = {}
+        #   The order of play has every match after the matches its players come from
+        for mat in reversed(self.tournament.ordered_matches):
+            chains[mat.id] = 1 + max(
+                (chains.get(next_mat.id, 0) for next_mat in (mat.winner_to, mat.loser_to) if next_mat is not None),
+                default=0,
+            )
+        return chains
+
+    def _queue_if_ready(self, mat: Match, swapped: bool = False):
+        if mat.is_bye or mat.played or mat.id in self.queued:
+            return
+        if not isinstance(mat.player1, Player) or not isinstance(mat.player2, Player):
+            return
+        self.queued.add(mat.id)
+        heapq.heappush(self.ready, (-self.chains.get(mat.id, 1), mat.order, mat.id, swapped))
+
+    def _queue_next(self, mat: Match):
+        """Queue the matches waiting for the players of a match just played, going through the byes"""
+        stack = [next_mat for next_mat in (mat.winner_to, mat.loser_to) if next_mat is not None]
+        while stack:
+            next_mat = stack.pop()
+            Tournament._get_loser_and_link_players(next_mat)
+            if not next_mat.is_bye:
+                self._queue_if_ready(next_mat)
+            elif next_mat.winner is not None and next_mat.winner_to is not None:
+                stack.append(next_mat.winner_to)
+
+    def games(self) -> Iterator[Optional[GameJob]]:
+        """
+        Games of the matches ready to be played, ``None`` while the next ones wait for matches being played
+        (see MatchFarm.run)
+        """
+        tournament = self.tournament
+        while not tournament.won:
+            if len(self.ready) == 0:
+                if len(self.running) == 0:
+                    return
+                yield None
+                continue
+
+            _, _, match_id, swapped = heapq.heappop(self.ready)
+            mat = tournament.all_matches[match_id]
+            bots = (mat.player1.name, mat.player2.name)
+            if swapped:
+                bots = bots[::-1]
+
+            index = next(self.job_ids)
+            self.running[index] = mat, swapped
+            yield GameJob(index, self.map, bots, self.budget, tournament.time_control, self.max_moves,
+                          tournament.resource_limits)
+
+    def record(self, outcome: GameOutcome) -> Optional[Match]:
+        """
+        Record the outcome of a game in the tournament
+        :return: The match, if it has a winner or is a draw, ``None`` if it has to be played again
+        """
+        mat, swapped = self.running.pop(outcome.job.index)
+        self.queued.discard(mat.id)
+        tournament = self.tournament
+        draws = tournament.type in Tournament.ROUND_TYPES
+
+        if outcome.status == "done" and len(outcome.winners) > 0:
+            player1_won = (outcome.winners[0] == 0) != swapped
+            winner = mat.player1 if player1_won else mat.player2
+        elif outcome.status == "done" and draws:
+            winner = None
+        else:
+            if outcome.status != "done":
+                print(f"Game of match {mat.id} failed ({outcome.status}): {outcome.message.strip()}")
+            attempts = self.attempts[mat.id] = self.attempts.get(mat.id, 0) + 1
+            if attempts < self.MAX_ATTEMPTS:
+                self._queue_if_ready(mat, not swapped)
+                return None
+            winner = None if draws else mat.player1
+            if winner is not None:
+                print(f"No winner in match {mat.id} after {attempts} games, {winner.name} goes through")
+
+        if winner is None:
+            tournament.set_draw_and_next(mat)
+        else:
+            tournament.set_winner_and_next(winner, mat)
+        self._queue_next(mat)
+
+        for new_mat in tournament.ordered_matches[self.known_matches:]:
+            self._queue_if_ready(new_mat)
+        self.known_matches = len(tournament.ordered_matches)
+        return mat
+
+    def run(self, timeout: Optional[float] = None) -> Iterator[Optional[Match]]:
+        """
+        Play the matches left, until the tournament is won
+        :param timeout: If given, ``None`` is yielded whenever no match has finished within this time,
+                        in seconds (see MatchFarm.run)
+        :return: The matches, as they get a winner or end in a draw
+        """
+        for outcome in self.farm.run(self.games(), timeout):
+            if outcome is None:
+                yield None
+                continue
+
+            mat = self.record(outcome)
+            if mat is not None:
+                yield mat
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Play the matches of a tournament in parallel, without the GUI")
+    parser.add_argument("tournament", help="Tournament file (.yaml or .txt)")
+    parser.add_argument("--map", default="default.brd", help="Board file or name in Data/maps, for two players")
+    parser.add_argument("--jobs", type=int, help="Games played at the same time (default: number of cores)")
+    parser.add_argument("--budget", type=float, default=1.0, help="Time budget per move in seconds, without time control")
+    parser.add_argument("--max-moves", type=int, default=200, help="Moves after which a game is stopped without winner")
+    parser.add_argument("--output", help="File the played tournament is exported to (.yaml), its results saved as they come")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the bots")
+    parser.add_argument("--seed-by-rating", action="store_true", help="Seed the players of a .txt tournament by rating")
+    parser.add_argument("--no-ratings", action="store_true", help="Do not rate the matches (see Ratings.py)")
+    args = parser.parse_args(argv)
+
+    ratings = None if args.no_ratings else RatingStore()
+    manager = TournamentManager(ratings)
+    if not manager.load_file(args.tournament, args.seed_by_rating):
+        return 2
+    tournament = manager.tournament
+    tournament.autosave = False
+    if args.output and (tournament.journal is None or tournament.journal.base_path != args.output):
+        tournament.start_journal(args.output)
+
+    start = time.monotonic()
+    farm = MatchFarm(args.jobs, quiet=not args.verbose)
+    scheduler = TournamentScheduler(tournament, args.map, args.budget, args.max_moves, farm)
+    for _ in scheduler.run():
+        pass
+
+    if tournament.won:
+        winner = tournament.get_winner()
+        print(f"{tournament.name} won by {winner.name} in {time.monotonic() - start:.1f}s")
+    else:
+        print(f"{tournament.name} not finished")
+
+    if tournament.type in Tournament.ROUND_TYPES:
+        for rank, standing in enumerate(tournament.standings(), 1):
+            print(f"{rank:>4}. {standing.player.name:<24} {standing.score:>5g}  (Buchholz {standing.buchholz:g})")
+
+    if args.output:
+        tournament.close_journal(remove=True)
+    if ratings is not None:
+        ratings.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from BoardEncoding import CODES, COLORS, PIECE_TYPES, encode_board
+
+
+class ZobristKeys:
+    """
+    Random keys used to hash board positions
+
+    A position key is the XOR of the key of every (square, piece type, color) present on the board,
+    and of the key of the player to move (its index in the player sequence). Moving a piece only
+    changes a few terms, so keys can be updated incrementally instead of rehashing the board.
+
+    Keys are drawn from a fixed seed, so every process (arena and bots) uses the same keys
+    for a given board shape.
+    """
+
+    SEED = 0x15C4E55
+    MAX_PLAYERS = 8
+
+    CACHE: Dict[Tuple[int, int], "ZobristKeys"] = {}
+
+    def __init__(self, shape: Tuple[int, int]):
+        self.shape: Tuple[int, int] = shape
+        size = shape[0] * shape[1]
+
+        rng = np.random.default_rng([self.SEED, *shape])
+        n_pieces = len(PIECE_TYPES) * len(COLORS)
+        raw = rng.integers(0, 2**64, size=n_pieces * size + self.MAX_PLAYERS, dtype=np.uint64, endpoint=False)
+        raw = [int(k) for k in raw]
+
+        #   piece_keys[code][sq] is the key of the piece of the given code (see BoardEncoding)
+        #   on square ``sq`` (``y * width + x``)
+        self.piece_keys: Dict[int, list[int]] = {}
+        i = 0
+        for color in COLORS:
+            for piece_type in PIECE_TYPES:
+                self.piece_keys[CODES[piece_type + color]] = raw[i:i + size]
+                i += size
+
+        self.side_keys: list[int] = raw[i:]
+
+    @staticmethod
+    def get(shape: Tuple[int, int]) -> "ZobristKeys":
+        """
+        Get the keys of a board shape, drawing them on first use
+
+        :param shape: The ``(height, width)`` of the board
+        :return: The shared keys of this shape
+        """
+        keys = ZobristKeys.CACHE.get(shape)
+        if keys is None:
+            keys = ZobristKeys(shape)
+            ZobristKeys.CACHE[shape] = keys
+        return keys
+
+    def hash_board(self, board, turn: Optional[int] = None) -> int:
+        """
+        Compute the key of a position from scratch
+
+        :param board: The board, either encoded or as an array of ``Piece`` objects or piece strings
+        :param turn: Index of the player to move in the player sequence. If ``None``, the side to move is not hashed
+        :return: The position key
+        """
+        cells = encode_board(board).reshape(-1)
+        key = 0 if turn is None else self.side_keys[turn]
+        for sq in np.flatnonzero(cells > 0).tolist():
+            key ^= self.piece_keys[int(cells[sq])][sq]
+
+        return key
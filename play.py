@@ -0,0 +1,129 @@
+#
+#   Headless games between bots, from the command line
+#
+#       python play.py --map default.brd --white PawnMover --black PawnMover --games 100
+#       python play.py --map cross.brd --bot A --bot B --bot C --bot D --time-control 60+1 --cpu-time
+#
+#   No display is needed: games are played by the GameEngine, with the bots of the Bots package
+#   running in worker processes.
+#
+
+import argparse
+import sys
+from collections import Counter
+from typing import List, Optional
+
+from BoardFile import find_board_file, read_board_file
+from Bots.ChessBotList import ENCODED_BOARD_BOTS, chess_bot_names, discover_chess_bots, get_chess_bot
+from ChessClock import TimeControl
+from GameEngine import BotSpec, MatchRunner, Referee
+from Ratings import RatingStore
+from Sandbox import ResourceLimits, format_memory
+
+
+def assign_bots(referee: Referee, args) -> Optional[List[str]]:
+    """
+    Choose the bot of each player of the board
+    :return: The bot names, in the order of the player sequence, or ``None`` if some are missing
+    """
+    if args.bot:
+        names = args.bot
+    else:
+        by_color = {"w": args.white, "b": args.black}
+        names = [by_color.get(sequence[1]) for sequence in referee.sequences]
+
+    if len(names) != referee.players or None in names:
+        print(f"The board needs {referee.players} bots ({referee.player_order}), use --white/--black or --bot")
+        return None
+
+    available = chess_bot_names()
+    for name in names:
+        if name not in available:
+            print(f"Unknown bot '{name}', available bots: {', '.join(sorted(available))}")
+            return None
+    return names
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Play games between bots without the GUI")
+    parser.add_argument("--map", default="default.brd", help="Board file or name in Data/maps")
+    parser.add_argument("--white", help="Bot of the white player")
+    parser.add_argument("--black", help="Bot of the black player")
+    parser.add_argument(
+        "--bot", action="append",
+        help="Bot of the next player in the player sequence, repeated for each player (instead of --white/--black)",
+    )
+    parser.add_argument("--games", type=int, default=1, help="Number of games")
+    parser.add_argument("--budget", type=float, default=1.0, help="Time budget per move in seconds, without time control")
+    parser.add_argument("--time-control", help="Clock of each player, as base[+increment] in seconds (e.g. 300+2)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Delay of each move with a time control, in seconds")
+    parser.add_argument("--cpu-time", action="store_true", help="Charge bots with their CPU time instead of wall-clock time")
+    parser.add_argument("--max-moves", type=int, default=200, help="Moves after which a game is stopped without winner")
+    parser.add_argument("--memory-mb", type=int, help="Address space of each bot's worker, in megabytes")
+    parser.add_argument("--cpu-seconds", type=float, help="CPU time of each turn, in seconds")
+    parser.add_argument("--no-ratings", action="store_true", help="Do not rate the games (see Ratings.py)")
+    args = parser.parse_args(argv)
+
+    loaded = read_board_file(find_board_file(args.map))
+    if loaded is None:
+        return 2
+    player_order, board = loaded
+    referee = Referee(player_order, board.shape)
+
+    discover_chess_bots()
+    names = assign_bots(referee, args)
+    if names is None:
+        return 2
+    funcs = [get_chess_bot(name) for name in names]
+    bots = [BotSpec(name, func, name in ENCODED_BOARD_BOTS) for name, func in zip(names, funcs)]
+
+    time_control = None
+    if args.time_control:
+        time_control = TimeControl.parse(args.time_control, args.delay, args.cpu_time)
+
+    limits = None
+    if args.memory_mb is not None or args.cpu_seconds is not None:
+        try:
+            limits = ResourceLimits(args.memory_mb, args.cpu_seconds)
+        except ValueError as e:
+            parser.error(str(e))
+
+    ratings = None if args.no_ratings else RatingStore()
+
+    wins = Counter()
+    with MatchRunner() as runner:
+        for game in range(1, args.games + 1):
+            result = runner.play_game(player_order, board, bots, args.budget, time_control, args.max_moves, limits)
+            if ratings is not None:
+                ratings.record_game(names, () if result.winner is None else (result.winner,))
+
+            if result.winner is None:
+                outcome = "no winner"
+                wins[None] += 1
+            else:
+                sequence = referee.sequences[result.winner]
+                outcome = f"{names[result.winner]} ({sequence[1]}) wins by {result.reason}"
+                if result.reason == "limit":
+                    outcome += f" ({names[result.loser]} {result.details})"
+                wins[names[result.winner]] += 1
+            print(f"Game {game}: {outcome} after {result.plies} moves in {result.duration:.2f}s")
+
+            peaks = [result.peak_rss(i) for i in range(len(names))]
+            if any(peak is not None for peak in peaks):
+                print("  Peak memory: " + ", ".join(
+                    f"{name} {format_memory(peak)}" for name, peak in zip(names, peaks) if peak is not None
+                ))
+
+    print()
+    for name in dict.fromkeys(names):
+        print(f"{name}: {wins[name]} win(s)")
+    print(f"No winner: {wins[None]}")
+
+    if ratings is not None:
+        ratings.close()
+        print(", ".join(f"{name} {ratings.get(name).rating:.0f}" for name in dict.fromkeys(names)) + " (Glicko-2)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())